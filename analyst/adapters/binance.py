@@ -3,20 +3,33 @@ import hashlib
 import hmac
 import json
 import logging
+import random
 from copy import deepcopy
 from datetime import datetime, timedelta
 from logging import getLogger
-from time import sleep
-from typing import Dict, List, Optional
+from time import time
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
 from urllib.parse import urlencode
 
 import aiohttp
 import websockets
-from pandas import DataFrame, DatetimeIndex
+from pandas import DataFrame
 from pydantic import BaseModel, Field
 
+from analyst.adapters.klines import klines_to_dataframe
+from analyst.adapters.rate_limiter import WeightRateLimiter
+from analyst.adapters.single_flight import SingleFlight
+from analyst.adapters.stream_recorder import StreamRecorderAdapter
 from analyst.adapters.types import ParamsDict
-from analyst.crypto.exceptions import BinanceError, InvalidInterval, WrongDatetimeRange
+from analyst.crypto.exceptions import (
+    BinanceAPIError,
+    BinanceError,
+    BinanceIPBanned,
+    BinanceRateLimited,
+    BinanceServerError,
+    InvalidInterval,
+    WrongDatetimeRange,
+)
 
 logger = getLogger("adapters.binance")
 
@@ -54,8 +67,42 @@ class BinanceMetadata(BaseModel):
     server_time: datetime
 
 
+class BinanceConnectionMetrics(BaseModel):
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    reconnections: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    sessions_created: int = 0
+
+
 class BinanceAdapter:
     api_weight_threshold = 1150
+    api_weight_period = 60
+    api_endpoint_weights = {
+        ("GET", "/api/v3/account"): 10,
+        ("GET", "/api/v3/allOrders"): 10,
+        ("GET", "/api/v3/depth"): 1,
+        ("GET", "/api/v3/exchangeInfo"): 10,
+        ("GET", "/api/v3/klines"): 1,
+        ("GET", "/api/v3/order"): 2,
+        ("POST", "/api/v3/order"): 1,
+        ("DELETE", "/api/v3/order"): 1,
+        ("POST", "/api/v3/order/test"): 1,
+        ("POST", "/api/v3/order/cancelReplace"): 1,
+        ("GET", "/api/v3/ticker/bookTicker"): 2,
+        ("GET", "/api/v3/time"): 1,
+        ("POST", "/api/v3/userDataStream"): 1,
+        ("PUT", "/api/v3/userDataStream"): 1,
+        ("DELETE", "/api/v3/userDataStream"): 1,
+    }
+    api_open_orders_weight = 6
+    # Depth weight by limit upper bound
+    api_depth_weights = ((100, 1), (500, 5), (1000, 10), (5000, 50))
+    api_all_open_orders_weight = 80
+    api_klines_limit = 1000
     api_possible_intervals = [
         "1m",
         "3m",
@@ -74,73 +121,234 @@ class BinanceAdapter:
         "1M",
     ]
 
+    idempotent_methods = ("GET", "PUT", "DELETE")
+    # Too many requests, too many orders
+    api_rate_limited_codes = (-1003, -1015)
+
     def __init__(self, settings):
         self.settings = settings
 
-    async def get_session(self):
-        session = aiohttp.ClientSession()
-        session.headers.update({"X-MBX-APIKEY": self.settings.api_key})
+        self.metrics = BinanceConnectionMetrics()
+        self.weights = BinanceWeights()
+        self.rate_limiter = WeightRateLimiter(self.api_weight_threshold, period=self.api_weight_period)
+        self.single_flight = SingleFlight()
 
-        return session
+        self._session: Optional[aiohttp.ClientSession] = None
 
-    def _get_signature(self, params: ParamsDict):
-        return hmac.new(
-            self.settings.secret_key.encode("utf-8"),
-            urlencode(params).encode("utf-8"),
-            hashlib.sha256,
-        ).hexdigest()
+    def _get_trace_config(self) -> aiohttp.TraceConfig:
+        async def on_connection_create_end(*_args):
+            self.metrics.new_connections += 1
 
-    async def setup_weight(self):
-        metadata = await self.get_metadata()
+        async def on_connection_reuseconn(*_args):
+            self.metrics.reused_connections += 1
 
-        logger.debug(f"weight setup: {metadata.weights}")
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
 
-        self.weights = metadata.weights
-        self._next_weight_reset = None
+        return trace_config
 
-    async def add_weight(self, weight):
-        if (
-            self.weights + weight + 1
-        ).amount >= self.api_weight_threshold and not self._next_weight_reset:
-            metadata = await self.get_metadata()
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.settings.pool_size,
+            limit_per_host=self.settings.pool_size_per_host,
+            ttl_dns_cache=self.settings.dns_cache_ttl,
+            keepalive_timeout=self.settings.keepalive_timeout,
+        )
 
-            self.weights = metadata.weights
+        self.metrics.sessions_created += 1
 
-            if (self.weights + weight).amount >= self.api_weight_threshold:
-                binance_weight_reset_delta = (metadata.server_time + timedelta(minutes=1)).replace(
-                    second=0, microsecond=0
-                ) - metadata.server_time
+        logger.debug(f"create session: pool_size={self.settings.pool_size}")
 
-                self._next_weight_reset = datetime.now() + binance_weight_reset_delta
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers={"X-MBX-APIKEY": self.settings.api_key},
+            timeout=aiohttp.ClientTimeout(total=self.settings.request_timeout),
+            trace_configs=[self._get_trace_config()],
+        )
 
-        elif self._next_weight_reset:
-            to_wait = (self._next_weight_reset - datetime.now() + timedelta(seconds=2)).total_seconds()
+    async def setup(self):
+        await self.get_session()
 
-            self.weights.reset()
+    async def close(self):
+        if self._session and not self._session.closed:
+            logger.debug("close session")
 
-            logger.debug(f"weight threshold reached ({self.api_weight_threshold}), sleep and reset")
+            await self._session.close()
 
-            if to_wait > 0:
-                sleep(to_wait)
+        self._session = None
 
-            self._next_weight_reset = None
+    async def get_session(self) -> aiohttp.ClientSession:
+        if not self._session or self._session.closed:
+            self._session = self._create_session()
 
-        self.weights += weight
+        return self._session
 
-    async def get_account_info(self):
-        params = {"timestamp": datetime.now().strftime("%s000")}
+    def get_endpoint_weight(self, method: str, path: str) -> int:
+        return self.api_endpoint_weights.get((method, path), 1)
 
-        params["signature"] = self._get_signature(params)
+    def _update_weights(self, headers) -> None:
+        weights = {k.lower(): v for k, v in headers.items() if k.lower().startswith("x-mbx-used-weight")}
+
+        if not weights:
+            return
+
+        self.weights = BinanceWeights(**weights)
+
+        self.rate_limiter.sync(self.weights.amount_1m)
+
+    def _check_response(self, status: int, headers, data) -> None:
+        if status < 400 and data is not None:
+            return
+
+        code, msg, error_data = 0, "", None
+
+        if isinstance(data, dict):
+            code, msg, error_data = data.get("code", 0), data.get("msg", ""), data.get("data")
+
+        retry_after = float(headers.get("Retry-After", 0) or 0)
+
+        raise self.get_api_error(status, code, msg, retry_after, error_data)
 
-        await self.add_weight(10)
+    @classmethod
+    def get_api_error(
+        cls, status: int, code: int = 0, msg: str = "", retry_after: float = 0.0, data=None
+    ) -> BinanceAPIError:
+        if status == 418:
+            return BinanceIPBanned(status, code, msg, retry_after, data)
+        elif status == 429 or code in cls.api_rate_limited_codes:
+            return BinanceRateLimited(status, code, msg, retry_after, data)
+        elif status >= 500:
+            return BinanceServerError(status, code, msg, retry_after, data)
 
-        async with await self.get_session() as session:
-            response = await session.get(f"{self.settings.api_url}/api/v3/account", params=params)
+        return BinanceAPIError(status, code, msg, retry_after, data)
 
-            return await response.json()
+    def _get_backoff(self, attempt: int) -> float:
+        backoff = min(self.settings.retry_backoff_max, self.settings.retry_backoff * 2**attempt)
 
-    async def create_order(
+        return backoff * random.uniform(0.5, 1.0)
+
+    async def _fetch(
         self,
+        method: str,
+        path: str,
+        weight: Optional[int] = None,
+        params: Optional[ParamsDict] = None,
+        signed: bool = False,
+        **kwargs,
+    ):
+        url = f"{self.settings.api_url}{path}"
+
+        if weight is None:
+            weight = self.get_endpoint_weight(method, path)
+
+        # Rejected requests were never executed, anything else may have been
+        # for non idempotent ones (order creation) and must not be sent twice
+        is_idempotent = method in self.idempotent_methods
+
+        for attempt in range(self.settings.max_retries + 1):
+            session = await self.get_session()
+            is_last_attempt = attempt == self.settings.max_retries
+
+            try:
+                async with self.rate_limiter.consume(weight):
+                    # Signed once the budget is acquired, a retry may have waited past the recvWindow
+                    request_params = self._sign(params or {}) if signed else params
+
+                    async with session.request(method, url, params=request_params, **kwargs) as response:
+                        self.metrics.requests += 1
+
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError:
+                            data = None
+
+                self._update_weights(response.headers)
+                self._check_response(response.status, response.headers, data)
+
+                return data, response.headers
+
+            except BinanceRateLimited as exc:
+                self.metrics.rate_limited += 1
+
+                wait_time = exc.retry_after or self._get_backoff(attempt)
+
+                self.rate_limiter.pause(wait_time)
+
+                if is_last_attempt or wait_time > self.settings.max_retry_after:
+                    raise
+
+                logger.warning(f"{method} {path}: rate limited ({exc}), retrying in {wait_time:.2f}s")
+
+            except BinanceServerError as exc:
+                self.metrics.server_errors += 1
+
+                if is_last_attempt or not is_idempotent:
+                    raise
+
+                logger.warning(f"{method} {path}: server error ({exc}), retrying")
+
+                await asyncio.sleep(self._get_backoff(attempt))
+
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as exc:
+                if is_last_attempt or not is_idempotent:
+                    raise
+
+                logger.info(f"{method} {path}: connection lost ({exc!r}), reconnecting")
+
+                self.metrics.reconnections += 1
+
+            self.metrics.retries += 1
+
+        raise BinanceError(f"{method} {path}: no attempt left")
+
+    def _get_single_flight_key(
+        self, method: str, path: str, signed: bool = False, **kwargs
+    ) -> Optional[Hashable]:
+        scope = self.settings.single_flight_scope
+        params = kwargs.get("params") or {}
+
+        if scope == "none" or method != "GET" or set(kwargs) - {"params"}:
+            return None
+        elif signed and scope != "reads":
+            return None
+
+        return (method, path, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+    async def _request(self, method: str, path: str, signed: bool = False, **kwargs):
+        async def request():
+            data, _headers = await self._fetch(method, path, signed=signed, **kwargs)
+
+            return data
+
+        if key := self._get_single_flight_key(method, path, signed=signed, **kwargs):
+            return await self.single_flight.do(key, request)
+
+        return await request()
+
+    def _get_signature(self, params: ParamsDict):
+        return hmac.new(
+            self.settings.secret_key.encode("utf-8"),
+            urlencode(params).encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+
+    def _sign(self, params: ParamsDict) -> ParamsDict:
+        params = {**params, "timestamp": int(time() * 1000)}
+        params["signature"] = self._get_signature(params)
+
+        return params
+
+    async def setup_weight(self):
+        await self.get_metadata()
+
+        logger.debug(f"weight setup: {self.weights}")
+
+    async def get_account_info(self):
+        return await self._request("GET", "/api/v3/account", signed=True)
+
+    @staticmethod
+    def _get_order_params(
         symbol: str,
         side: str,
         type: str,
@@ -149,13 +357,11 @@ class BinanceAdapter:
         quote_quantity: float = 0.0,
         stop_price: float = 0.0,
         time_in_force: str = "",
-        real: bool = False,
-    ):
+    ) -> ParamsDict:
         params: ParamsDict = {
             "symbol": symbol,
             "side": side,
             "type": type,
-            "timestamp": datetime.now().strftime("%s000"),
         }
 
         if quantity:
@@ -173,17 +379,17 @@ class BinanceAdapter:
         if stop_price:
             params["stopPrice"] = stop_price
 
-        params["signature"] = self._get_signature(params)
+        # Returns the order state and its fills, no need to fetch it afterwards
+        params["newOrderRespType"] = "FULL"
 
-        await self.add_weight(1)
+        return params
 
-        async with await self.get_session() as session:
-            if not real:
-                response = await session.post(f"{self.settings.api_url}/api/v3/order/test", params=params)
-            else:
-                response = await session.post(f"{self.settings.api_url}/api/v3/order", params=params)
+    async def create_order(self, symbol: str, side: str, type: str, real: bool = False, **kwargs):
+        params = self._get_order_params(symbol, side, type, **kwargs)
 
-        json_data = await response.json()
+        json_data = await self._request(
+            "POST", "/api/v3/order" if real else "/api/v3/order/test", params=params, signed=True
+        )
 
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"create order: sending {json.dumps(params, indent=4)}")
@@ -191,73 +397,67 @@ class BinanceAdapter:
 
         return json_data
 
-    async def get_order(self, symbol: str, order_id: int):
-        params: ParamsDict = {
-            "symbol": symbol,
-            "orderId": order_id,
-            "timestamp": datetime.now().strftime("%s000"),
-        }
-        params["signature"] = self._get_signature(params)
-
-        await self.add_weight(2)
+    async def cancel_replace_order(
+        self,
+        symbol: str,
+        order_id: int,
+        side: str,
+        type: str,
+        mode: str = "STOP_ON_FAILURE",
+        **kwargs,
+    ):
+        params = self._get_order_params(symbol, side, type, **kwargs)
 
-        async with await self.get_session() as session:
-            response = await session.get(self.settings.api_url + "/api/v3/order", params=params)
+        params["cancelOrderId"] = order_id
+        params["cancelReplaceMode"] = mode
 
-        return await response.json()
+        json_data = await self._request("POST", "/api/v3/order/cancelReplace", params=params, signed=True)
 
-    async def list_orders(self, symbol: str):
-        params: ParamsDict = {"symbol": symbol, "timestamp": datetime.now().strftime("%s000")}
-        params["signature"] = self._get_signature(params)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"cancel replace order: sending {json.dumps(params, indent=4)}")
+            logger.debug(f"cancel replace order: get {json.dumps(json_data, indent=4)}")
 
-        await self.add_weight(10)
+        return json_data
 
-        async with await self.get_session() as session:
-            response = await session.get(self.settings.api_url + "/api/v3/allOrders", params=params)
+    async def get_order(self, symbol: str, order_id: int):
+        params: ParamsDict = {"symbol": symbol, "orderId": order_id}
 
-        return await response.json()
+        return await self._request("GET", "/api/v3/order", params=params, signed=True)
 
-    async def cancel_order(self, symbol: str, order_id: int):
-        params: ParamsDict = {
-            "symbol": symbol,
-            "orderId": order_id,
-            "timestamp": datetime.now().strftime("%s000"),
-        }
-        params["signature"] = self._get_signature(params)
+    async def list_orders(self, symbol: str):
+        params: ParamsDict = {"symbol": symbol}
 
-        await self.add_weight(1)
+        return await self._request("GET", "/api/v3/allOrders", params=params, signed=True)
 
-        async with await self.get_session() as session:
-            response = await session.delete(self.settings.api_url + "/api/v3/order", params=params)
+    async def list_open_orders(self, symbol: Optional[str] = None):
+        params: ParamsDict = {"symbol": symbol} if symbol else {}
 
-        return await response.json()
+        return await self._request(
+            "GET",
+            "/api/v3/openOrders",
+            params=params,
+            signed=True,
+            weight=self.api_open_orders_weight if symbol else self.api_all_open_orders_weight,
+        )
 
-    async def get_exchange_info(self):
-        await self.add_weight(10)
+    async def cancel_order(self, symbol: str, order_id: int):
+        params: ParamsDict = {"symbol": symbol, "orderId": order_id}
 
-        async with await self.get_session() as session:
-            response = await session.get(f"{self.settings.api_url}/api/v3/exchangeInfo")
+        return await self._request("DELETE", "/api/v3/order", params=params, signed=True)
 
-            return await response.json()
+    async def get_exchange_info(self):
+        return await self._request("GET", "/api/v3/exchangeInfo")
 
     async def get_metadata(self):
-        async with await self.get_session() as session:
-            response = await session.get(f"{self.settings.api_url}/api/v3/time")
-
-            data = await response.json()
+        data = await self._request("GET", "/api/v3/time")
 
         return BinanceMetadata(
             server_time=data.get("serverTime"),
-            weights={k: v for k, v in response.headers.items() if k.startswith("x-mbx-used")},
+            weights=self.weights,
         )
 
     async def get_prices(self) -> dict:
-        await self.add_weight(2)
-
-        async with await self.get_session() as session:
-            response = await session.get(f"{self.settings.api_url}/api/v3/ticker/bookTicker")
-
-            return await response.json()
+        return await self._request("GET", "/api/v3/ticker/bookTicker")
 
     #
     # User Data Streams methods
@@ -265,32 +465,13 @@ class BinanceAdapter:
     #
 
     async def request_listen_key(self) -> str:
-        await self.add_weight(1)
-
-        async with await self.get_session() as session:
-            response = await session.post(f"{self.settings.api_url}/api/v3/userDataStream")
-
-            return (await response.json())["listenKey"]
+        return (await self._request("POST", "/api/v3/userDataStream"))["listenKey"]
 
     async def keep_alive_listen_key(self, listen_key: str) -> str:
-        await self.add_weight(1)
-
-        async with await self.get_session() as session:
-            response = await session.put(
-                f"{self.settings.api_url}/api/v3/userDataStream", params={"listenKey": listen_key}
-            )
-
-            return await response.json()
+        return await self._request("PUT", "/api/v3/userDataStream", params={"listenKey": listen_key})
 
     async def close_listen_key(self, listen_key: str) -> str:
-        await self.add_weight(1)
-
-        async with await self.get_session() as session:
-            response = await session.delete(
-                f"{self.settings.api_url}/api/v3/userDataStream", params={"listenKey": listen_key}
-            )
-
-            return await response.json()
+        return await self._request("DELETE", "/api/v3/userDataStream", params={"listenKey": listen_key})
 
     def _get_shift_delta(self, interval: str) -> timedelta:
         unit_value, interval_unit = interval[:-1], interval[-1]
@@ -308,23 +489,112 @@ class BinanceAdapter:
 
         raise InvalidInterval(interval)
 
-    async def get_order_book(self, symbol: str):
-        async with await self.get_session() as session:
-            await self.add_weight(1)
+    @classmethod
+    def get_depth_weight(cls, limit: Optional[int] = None) -> int:
+        for max_limit, weight in cls.api_depth_weights:
+            if (limit or 100) <= max_limit:
+                return weight
 
-            response = await session.get(
-                f"{self.settings.api_url}/api/v3/depth", params={"symbol": symbol}
-            )
+        return cls.api_depth_weights[-1][1]
 
-            return await response.json()
+    async def get_order_book(self, symbol: str, limit: Optional[int] = None):
+        params: ParamsDict = {"symbol": symbol}
 
-    async def get_historical_klines(
+        if limit:
+            params["limit"] = limit
+
+        return await self._request(
+            "GET", "/api/v3/depth", params=params, weight=self.get_depth_weight(limit)
+        )
+
+    async def _get_klines_page(self, symbol: str, interval: str, start_time: int, end_time: int) -> List:
+        klines = await self._request(
+            "GET",
+            "/api/v3/klines",
+            params={
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": start_time,
+                "endTime": end_time,
+                "limit": self.api_klines_limit,
+            },
+        )
+
+        if not isinstance(klines, list):
+            raise BinanceError(klines)
+
+        return klines
+
+    async def _get_klines_window(
+        self, symbol: str, interval: str, start_time: int, end_time: int
+    ) -> List:
+        klines: List = []
+
+        while start_time <= end_time:
+            klines_part = await self._get_klines_page(symbol, interval, start_time, end_time)
+
+            klines += klines_part
+
+            if len(klines_part) < self.api_klines_limit:
+                break
+
+            start_time = klines_part[-1][0] + 1
+
+        return klines
+
+    def _get_klines_windows(self, interval: str, start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        page_span = self.get_interval_ms(interval) * self.api_klines_limit
+
+        return [
+            (window_start, min(window_start + page_span - 1, end_time))
+            for window_start in range(start_time, end_time + 1, page_span)
+        ]
+
+    async def get_klines_data(
         self,
         symbol: str,
-        interval: str = "1d",
-        start_datetime: datetime = datetime(2000, 1, 1),
-        end_datetime: datetime = datetime.now(),
-    ) -> DataFrame:
+        interval: str,
+        start_time: int,
+        end_time: int,
+        page_workers: Optional[int] = None,
+    ) -> List:
+        # The first page tells where the symbol history actually starts,
+        # the remaining windows are then known and fetched concurrently
+        klines = await self._get_klines_page(symbol, interval, start_time, end_time)
+
+        if len(klines) < self.api_klines_limit:
+            return klines
+
+        semaphore = asyncio.Semaphore(page_workers or self.settings.klines_page_workers)
+
+        async def fetch_window(window_start: int, window_end: int) -> List:
+            async with semaphore:
+                return await self._get_klines_window(symbol, interval, window_start, window_end)
+
+        pages = await asyncio.gather(
+            *[
+                fetch_window(window_start, window_end)
+                for window_start, window_end in self._get_klines_windows(
+                    interval, klines[-1][0] + 1, end_time
+                )
+            ]
+        )
+
+        for page in pages:
+            for kline in page:
+                if kline[0] > klines[-1][0]:
+                    klines.append(kline)
+
+        logger.debug(f"klines {symbol} {interval}: {len(klines)} klines in {len(pages) + 1} windows")
+
+        return klines
+
+    def get_interval_ms(self, interval: str) -> int:
+        return int(self._get_shift_delta(interval).total_seconds() * 1000)
+
+    def get_klines_time_range(
+        self, interval: str, start_datetime: datetime, end_datetime: datetime
+    ) -> Tuple[int, int]:
         if start_datetime < datetime(2000, 1, 1):
             raise WrongDatetimeRange(start_datetime)
         elif end_datetime < datetime(2000, 1, 1):
@@ -337,59 +607,23 @@ class BinanceAdapter:
         start_datetime -= shift_delta
         end_datetime -= shift_delta
 
-        klines = []
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "startTime": int(start_datetime.strftime("%s")) * 1000,
-            "endTime": int(end_datetime.strftime("%s")) * 1000,
-            "limit": 1000,
-        }
-
-        async with await self.get_session() as session:
-            while True:
-                await self.add_weight(1)
-
-                response = await session.get(f"{self.settings.api_url}/api/v3/klines", params=params)
-                klines_part = await response.json()
-
-                if klines_part == []:
-                    break
-
-                if not isinstance(klines_part, list):
-                    raise BinanceError(klines_part)
-
-                klines += klines_part
+        return int(start_datetime.strftime("%s")) * 1000, int(end_datetime.strftime("%s")) * 1000
 
-                if datetime.fromtimestamp((klines_part[-1][0]) / 1000) >= end_datetime:
-                    break
-
-                params["startTime"] = klines_part[-1][0] + 1000
+    async def get_historical_klines(
+        self,
+        symbol: str,
+        interval: str = "1d",
+        start_datetime: datetime = datetime(2000, 1, 1),
+        end_datetime: datetime = datetime.now(),
+        page_workers: Optional[int] = None,
+    ) -> DataFrame:
+        start_time, end_time = self.get_klines_time_range(interval, start_datetime, end_datetime)
 
-        df = DataFrame(
-            [
-                {
-                    "timestamp": datetime.fromtimestamp((kline_data[6] + 1) / 1000),
-                    "open": float(kline_data[1]),
-                    "high": float(kline_data[2]),
-                    "low": float(kline_data[3]),
-                    "close": float(kline_data[4]),
-                    "volumes": float(kline_data[5]),
-                    "trades": kline_data[8],
-                }
-                for kline_data in klines
-            ]
+        klines = await self.get_klines_data(
+            symbol, interval, start_time, end_time, page_workers=page_workers
         )
 
-        if not df.empty:
-            df["timestamp"] = DatetimeIndex(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-
-            if interval == "1d":
-                df = df.resample("D").mean()
-                df.index.freq = None
-
-        return df
+        return klines_to_dataframe(klines, interval)
 
 
 """ TODO remove if not used 09/2022
@@ -443,11 +677,21 @@ class Ticker(BaseModel):
 
 
 class BinanceWebSocketAdapter:
+    channel = "market"
+
     def __init__(self, settings):
         self.settings = settings
 
-    async def open(self, endpoint: str):
-        return await websockets.connect(endpoint)  # type: ignore
+        # Records the raw frames for later replays when set
+        self.recorder: Optional[StreamRecorderAdapter] = None
+
+    async def open(self, endpoint: str, keepalive: bool = True):
+        # Liveness is checked by protocol pings, a silent but healthy stream is not an error
+        return await websockets.connect(  # type: ignore
+            endpoint,
+            ping_interval=self.settings.ws_ping_interval if keepalive else None,
+            ping_timeout=self.settings.ws_ping_timeout,
+        )
 
     async def close(self, session):
         await session.close()
@@ -455,71 +699,20 @@ class BinanceWebSocketAdapter:
     async def send(self, session, data: dict):
         await session.send(json.dumps(data))
 
-    async def receive(self, session, timeout: Optional[int] = 1) -> Optional[Dict]:
-        try:
-            data = await asyncio.wait_for(session.recv(), timeout=timeout)
-
-            return json.loads(data)
-        except asyncio.TimeoutError:
-            return None
-
+    async def iterate(self, session) -> AsyncIterator[Dict]:
+        # Ends on a normal close, raises ConnectionClosed otherwise
+        async for data in session:
+            message = json.loads(data)
 
-class BinanceMarketWebSocketAdapter(BinanceWebSocketAdapter):
-    def __init__(self, *args, **kwargs):
-        super(BinanceMarketWebSocketAdapter, self).__init__(*args, **kwargs)
-
-        self.subscriptions = set()
-
-    async def open(self):
-        session = await super().open(self.settings.stream_url)
-
-        self.subscriptions = set()
-
-        return session
+            if self.recorder:
+                self.recorder.record(self.channel, data, message)
 
-    async def reopen(self):
-        current_subscriptions = self.subscriptions
-
-        session = await self.open()
-
-        await self.subscribe(session, current_subscriptions)
-
-        return session
-
-    async def close(self, session):
-        await super().close(session)
-
-        self.subscriptions = set()
-
-    async def request_subscriptions_list(self, session):
-        await self.send(session, {"method": "LIST_SUBSCRIPTIONS", "id": 3})
-
-    async def subscribe(self, session, streams: List[str]):
-        subscribe_to = []
-
-        for stream in streams:
-            if stream not in self.subscriptions and len(self.subscriptions) < 1000:
-                subscribe_to.append(stream)
-
-                self.subscriptions.add(stream)
-
-        if subscribe_to:
-            await self.send(session, {"method": "SUBSCRIBE", "params": subscribe_to, "id": 1})
-
-    async def unsubscribe(self, session, streams: List[str]):
-        unsubscribe_to = []
-
-        for stream in streams:
-            if stream in self.subscriptions:
-                unsubscribe_to.append(stream)
-
-                self.subscriptions.remove(stream)
-
-        if unsubscribe_to:
-            await self.send(session, {"method": "UNSUBSCRIBE", "params": unsubscribe_to, "id": 312})
+            yield message
 
 
 class BinanceUserDataWebSocketAdapter(BinanceWebSocketAdapter):
+    channel = "user_data"
+
     def __init__(self, *args, **kwargs):
         super(BinanceUserDataWebSocketAdapter, self).__init__(*args, **kwargs)
 
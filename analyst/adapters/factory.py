@@ -1,16 +1,23 @@
-from typing import Union
+from typing import Optional, Union
 
 from pydantic import BaseModel
 
-from analyst.adapters.binance import (
-    BinanceAdapter,
-    BinanceMarketWebSocketAdapter,
-    BinanceUserDataWebSocketAdapter,
-)
+from analyst.adapters.binance import BinanceAdapter, BinanceUserDataWebSocketAdapter
+from analyst.adapters.kline_store import KlineStoreAdapter
 from analyst.adapters.local_file import LocalFileAdapter
+from analyst.adapters.market_stream_pool import BinanceMarketStreamPool
 from analyst.adapters.mongo import MongoAdapter
+from analyst.adapters.order_websocket import BinanceOrderWebSocketAdapter
+from analyst.adapters.public_cache import PublicCacheAdapter
 from analyst.adapters.rabbitmq import RabbitMQAdapter
 from analyst.adapters.redis import RedisAdapter
+from analyst.adapters.redundant_market_stream import BinanceRedundantMarketStream
+from analyst.adapters.stream_recorder import (
+    ReplayMarketStream,
+    ReplayUserDataStream,
+    StreamRecorderAdapter,
+    StreamReplayer,
+)
 from analyst.settings import AppSettings
 
 CacheAdapter = Union[LocalFileAdapter, RedisAdapter]
@@ -18,9 +25,13 @@ CacheAdapter = Union[LocalFileAdapter, RedisAdapter]
 
 class Adapters(BaseModel):
     binance: BinanceAdapter
-    binance_market_websocket: BinanceMarketWebSocketAdapter
+    binance_market_websocket: Union[BinanceMarketStreamPool, BinanceRedundantMarketStream]
     binance_user_data_websocket: BinanceUserDataWebSocketAdapter
+    binance_orders_websocket: Optional[BinanceOrderWebSocketAdapter]
     cache: CacheAdapter
+    public_cache: Optional[PublicCacheAdapter]
+    kline_store: Optional[KlineStoreAdapter]
+    stream_recorder: Optional[StreamRecorderAdapter]
     mongo: MongoAdapter
     rabbitmq: RabbitMQAdapter
 
@@ -41,14 +52,79 @@ async def get_adapters(settings: AppSettings) -> Adapters:
     else:
         cache_adapter = LocalFileAdapter(dir_path=settings.file_cache_dir)
 
+    public_cache_adapter = None
+
+    if settings.use_public_cache:
+        if isinstance(cache_adapter, LocalFileAdapter) and not cache_adapter.dir_exists():
+            cache_adapter.create_dir()
+
+        public_cache_adapter = PublicCacheAdapter(
+            cache=cache_adapter,
+            ttls={
+                "exchange_info": settings.binance.exchange_info_cache_ttl,
+                "prices": settings.binance.prices_cache_ttl,
+            },
+        )
+
     binance_adapter = BinanceAdapter(settings=settings.binance)
+    await binance_adapter.setup()
     await binance_adapter.setup_weight()
 
+    market_websocket_adapter: Union[BinanceMarketStreamPool, BinanceRedundantMarketStream]
+
+    if settings.binance.market_stream_urls:
+        market_websocket_adapter = BinanceRedundantMarketStream(settings=settings.binance)
+    else:
+        market_websocket_adapter = BinanceMarketStreamPool(settings=settings.binance)
+
+    user_data_websocket_adapter = BinanceUserDataWebSocketAdapter(settings=settings.binance)
+
+    orders_websocket_adapter = None
+
+    if settings.binance.order_transport == "websocket":
+        orders_websocket_adapter = BinanceOrderWebSocketAdapter(
+            settings=settings.binance, rate_limiter=binance_adapter.rate_limiter
+        )
+
+    stream_recorder = None
+
+    if settings.record_streams:
+        stream_recorder = StreamRecorderAdapter(dir_path=settings.stream_records_dir)
+
+        market_websocket_adapter.recorder = user_data_websocket_adapter.recorder = stream_recorder
+
     return Adapters(
         binance=binance_adapter,
-        binance_market_websocket=BinanceMarketWebSocketAdapter(settings=settings.binance),
-        binance_user_data_websocket=BinanceUserDataWebSocketAdapter(settings=settings.binance),
+        binance_market_websocket=market_websocket_adapter,
+        binance_user_data_websocket=user_data_websocket_adapter,
+        binance_orders_websocket=orders_websocket_adapter,
         cache=cache_adapter,
+        public_cache=public_cache_adapter,
+        kline_store=KlineStoreAdapter(dir_path=settings.kline_store_dir)
+        if settings.use_kline_store
+        else None,
+        stream_recorder=stream_recorder,
         mongo=MongoAdapter(settings=settings.mongo),
         rabbitmq=RabbitMQAdapter(settings=settings.rabbitmq),
     )
+
+
+def get_replay_adapters(adapters: Adapters, replayer: StreamReplayer) -> Adapters:
+    # Streams are fed from a recording, REST calls still go through the given adapters
+    return adapters.copy(
+        update={
+            "binance_market_websocket": ReplayMarketStream(replayer),
+            "binance_user_data_websocket": ReplayUserDataStream(replayer),
+            "stream_recorder": None,
+        }
+    )
+
+
+async def close_adapters(adapters: Adapters) -> None:
+    await adapters.binance.close()
+
+    if adapters.binance_orders_websocket:
+        await adapters.binance_orders_websocket.close()
+
+    if adapters.stream_recorder:
+        adapters.stream_recorder.close()
@@ -0,0 +1,176 @@
+import json
+from logging import getLogger
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analyst.adapters.klines import KLINES_DTYPES, KlinesColumns, concat_columns, slice_columns
+
+logger = getLogger("adapters.kline_store")
+
+TimeRange = Tuple[int, int]
+
+
+def merge_ranges(ranges: List[TimeRange]) -> List[TimeRange]:
+    merged: List[TimeRange] = []
+
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def subtract_ranges(start: int, end: int, ranges: List[TimeRange]) -> List[TimeRange]:
+    missing = []
+
+    for range_start, range_end in merge_ranges(ranges):
+        if range_end < start:
+            continue
+        elif range_start > end:
+            break
+
+        if range_start > start:
+            missing.append((start, range_start - 1))
+
+        start = range_end + 1
+
+    if start <= end:
+        missing.append((start, end))
+
+    return missing
+
+
+class KlineStoreAdapter:
+    max_segments = 32
+
+    def __init__(self, dir_path: Path):
+        self.dir_path = Path(dir_path)
+
+        self._indexes: Dict[Tuple[str, str], dict] = {}
+
+    def _get_dir(self, symbol: str, interval: str) -> Path:
+        return self.dir_path / symbol / interval
+
+    def _get_index(self, symbol: str, interval: str) -> dict:
+        if index := self._indexes.get((symbol, interval)):
+            return index
+
+        index_path = self._get_dir(symbol, interval) / "index.json"
+
+        if index_path.exists():
+            index = json.loads(index_path.read_text())
+        else:
+            index = {"ranges": [], "segments": [], "next_segment": 0}
+
+        self._indexes[(symbol, interval)] = index
+
+        return index
+
+    def _save_index(self, symbol: str, interval: str, index: dict) -> None:
+        index_path = self._get_dir(symbol, interval) / "index.json"
+        tmp_path = index_path.with_suffix(".json.tmp")
+
+        tmp_path.write_text(json.dumps(index))
+        tmp_path.replace(index_path)
+
+        self._indexes[(symbol, interval)] = index
+
+    def _write_segment(self, symbol: str, interval: str, index: dict, columns: KlinesColumns) -> dict:
+        name = f"{index['next_segment']:06d}.npz"
+
+        np.savez(self._get_dir(symbol, interval) / name, **columns)
+
+        index["next_segment"] += 1
+
+        return {
+            "name": name,
+            "start": int(columns["open_time"][0]),
+            "end": int(columns["open_time"][-1]),
+            "count": len(columns["open_time"]),
+        }
+
+    def _read_segment(self, symbol: str, interval: str, segment: dict) -> KlinesColumns:
+        with np.load(self._get_dir(symbol, interval) / segment["name"]) as data:
+            return {name: data[name] for name in KLINES_DTYPES}
+
+    def get_ranges(self, symbol: str, interval: str) -> List[TimeRange]:
+        return [(start, end) for start, end in self._get_index(symbol, interval)["ranges"]]
+
+    def get_missing_ranges(
+        self, symbol: str, interval: str, start_time: int, end_time: int
+    ) -> List[TimeRange]:
+        return subtract_ranges(start_time, end_time, self.get_ranges(symbol, interval))
+
+    def append(
+        self, symbol: str, interval: str, columns: KlinesColumns, start_time: int, end_time: int
+    ) -> None:
+        if end_time < start_time:
+            return
+
+        self._get_dir(symbol, interval).mkdir(parents=True, exist_ok=True)
+
+        index = self._get_index(symbol, interval)
+
+        columns = slice_columns(columns, start_time, end_time)
+
+        if len(columns["open_time"]):
+            index["segments"].append(self._write_segment(symbol, interval, index, columns))
+
+        index["ranges"] = merge_ranges(self.get_ranges(symbol, interval) + [(start_time, end_time)])
+
+        if len(index["segments"]) > self.max_segments:
+            self._compact(symbol, interval, index)
+
+        self._save_index(symbol, interval, index)
+
+        logger.debug(
+            f"append {symbol} {interval}: {len(columns['open_time'])} klines, "
+            f"{len(index['ranges'])} ranges, {len(index['segments'])} segments"
+        )
+
+    def _compact(self, symbol: str, interval: str, index: dict) -> None:
+        old_segments = index["segments"]
+
+        columns = concat_columns(
+            [self._read_segment(symbol, interval, segment) for segment in old_segments]
+        )
+
+        index["segments"] = [self._write_segment(symbol, interval, index, columns)]
+
+        for segment in old_segments:
+            (self._get_dir(symbol, interval) / segment["name"]).unlink()
+
+        logger.debug(f"compact {symbol} {interval}: {len(old_segments)} segments merged")
+
+    def read(
+        self, symbol: str, interval: str, start_time: int, end_time: Optional[int] = None
+    ) -> KlinesColumns:
+        index = self._get_index(symbol, interval)
+
+        if end_time is None:
+            end_time = np.iinfo(np.int64).max
+
+        columns = concat_columns(
+            [
+                self._read_segment(symbol, interval, segment)
+                for segment in index["segments"]
+                if segment["end"] >= start_time and segment["start"] <= end_time
+            ]
+        )
+
+        return slice_columns(columns, start_time, end_time)
+
+    def delete(self, symbol: str, interval: str) -> None:
+        klines_dir = self._get_dir(symbol, interval)
+
+        if klines_dir.exists():
+            for path in klines_dir.iterdir():
+                path.unlink()
+
+            klines_dir.rmdir()
+
+        self._indexes.pop((symbol, interval), None)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+from pandas import DataFrame, DatetimeIndex
+
+KlinesColumns = Dict[str, np.ndarray]
+
+HOUR_MS = 3600 * 1000
+
+KLINES_DTYPES = {
+    "open_time": np.int64,
+    "close_time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volumes": np.float64,
+    "trades": np.int64,
+}
+KLINES_FIELDS = {
+    "open_time": 0,
+    "open": 1,
+    "high": 2,
+    "low": 3,
+    "close": 4,
+    "volumes": 5,
+    "close_time": 6,
+    "trades": 8,
+}
+DATAFRAME_COLUMNS = ("open", "high", "low", "close", "volumes", "trades")
+
+
+def empty_klines_columns() -> KlinesColumns:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in KLINES_DTYPES.items()}
+
+
+def klines_to_columns(klines: List) -> KlinesColumns:
+    if not klines:
+        return empty_klines_columns()
+
+    fields = np.array(klines, dtype=object)
+
+    return {name: fields[:, KLINES_FIELDS[name]].astype(dtype) for name, dtype in KLINES_DTYPES.items()}
+
+
+def concat_columns(columns_list: List[KlinesColumns]) -> KlinesColumns:
+    columns_list = [columns for columns in columns_list if len(columns["open_time"])]
+
+    if not columns_list:
+        return empty_klines_columns()
+    elif len(columns_list) == 1:
+        return columns_list[0]
+
+    concatenated = {
+        name: np.concatenate([columns[name] for columns in columns_list]) for name in KLINES_DTYPES
+    }
+
+    # Keeps the first occurrence of each open time in its sorted position
+    _, unique_index = np.unique(concatenated["open_time"], return_index=True)
+
+    return {name: column[unique_index] for name, column in concatenated.items()}
+
+
+def slice_columns(columns: KlinesColumns, start_time: int, end_time: int) -> KlinesColumns:
+    start_index = np.searchsorted(columns["open_time"], start_time, side="left")
+    end_index = np.searchsorted(columns["open_time"], end_time, side="right")
+
+    return {name: column[start_index:end_index] for name, column in columns.items()}
+
+
+def get_local_utc_offset_ms(timestamp: int) -> int:
+    utc_offset = datetime.fromtimestamp(timestamp).astimezone().utcoffset() or timedelta()
+
+    return int(utc_offset.total_seconds()) * 1000
+
+
+def epoch_ms_to_local_datetime64(epoch_ms: np.ndarray) -> np.ndarray:
+    # Same naive local time as datetime.fromtimestamp, the UTC offset is only
+    # resolved once per distinct hour since DST transitions happen on the hour
+    hours, hours_index = np.unique(epoch_ms // HOUR_MS, return_inverse=True)
+
+    offsets_ms = np.array([get_local_utc_offset_ms(int(hour) * 3600) for hour in hours], dtype=np.int64)
+
+    return (epoch_ms + offsets_ms[hours_index]).astype("datetime64[ms]")
+
+
+def columns_to_dataframe(columns: KlinesColumns, interval: str) -> DataFrame:
+    if not len(columns["close_time"]):
+        return DataFrame()
+
+    index = DatetimeIndex(epoch_ms_to_local_datetime64(columns["close_time"] + 1), name="timestamp")
+
+    df = DataFrame({name: columns[name] for name in DATAFRAME_COLUMNS}, index=index, copy=False)
+
+    if interval == "1d":
+        df = df.resample("D").mean()
+        df.index.freq = None
+
+    return df
+
+
+def klines_to_dataframe(klines: List, interval: str) -> DataFrame:
+    return columns_to_dataframe(klines_to_columns(klines), interval)
@@ -0,0 +1,561 @@
+import asyncio
+import random
+from collections import Counter, defaultdict
+from logging import getLogger
+from math import ceil
+from time import monotonic
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from pydantic import BaseModel
+from websockets.exceptions import ConnectionClosed, WebSocketException
+
+from analyst.adapters.binance import BinanceWebSocketAdapter
+from analyst.adapters.rate_limiter import WeightRateLimiter
+from analyst.adapters.stream_queue import StreamQueue
+
+if TYPE_CHECKING:
+    from analyst.adapters.redundant_market_stream import MarketStreamDeduplicator
+
+logger = getLogger("adapters.market_stream_pool")
+
+
+class MarketStreamPoolMetrics(BaseModel):
+    connections: int = 0
+    reopens: int = 0
+    moved_streams: int = 0
+    dropped_streams: int = 0
+    control_frames: int = 0
+    acknowledged: int = 0
+    request_errors: int = 0
+    request_timeouts: int = 0
+    stalls: int = 0
+    missed_pongs: int = 0
+    stale_streams: int = 0
+    recovered_streams: int = 0
+
+
+class MarketStreamShard:
+    def __init__(self, index: int, limiter: WeightRateLimiter):
+        self.index = index
+        self.session = None
+        self.subscriptions: Set[str] = set()
+        self.reader: Optional[asyncio.Task] = None
+        self.closing = False
+
+        # Subscription changes not sent yet, and control requests waiting for their response
+        self.to_subscribe: Set[str] = set()
+        self.to_unsubscribe: Set[str] = set()
+        self.requests: Dict[int, asyncio.Future] = {}
+
+        # Budget of control frames of the connection
+        self.limiter = limiter
+        self.flush_lock = asyncio.Lock()
+        self.open_lock = asyncio.Lock()
+
+        # Feed health: last message of the connection and of each of its streams, ping round trip
+        self.connected_at = 0.0
+        self.last_pong_at = 0.0
+        self.stream_times: Dict[str, float] = {}
+        self.rtt: Optional[float] = None
+
+    @property
+    def load(self) -> int:
+        return len(self.subscriptions)
+
+
+def get_stream_type(stream: str) -> str:
+    # "ethbtc@depth20@100ms" is a "depth" stream, "!bookTicker" a "bookTicker" one
+    name = stream.split("@")[1] if "@" in stream else stream.lstrip("!")
+
+    return name.split("_")[0].rstrip("0123456789")
+
+
+class BinanceMarketStreamPool(BinanceWebSocketAdapter):
+    def __init__(self, settings):
+        super().__init__(settings)
+
+        self.shards: List[MarketStreamShard] = []
+        self.next_shard_index = 0
+
+        # Streams are shared by strategies, they are unsubscribed when nobody uses them anymore
+        self.references: Counter = Counter()
+        self.next_request_id = 1
+
+        self.opened = False
+        self.on_reopen: Optional[Callable[[], Awaitable]] = None
+        self.on_stale: Optional[Callable[[str, bool], Any]] = None
+        self.monitor: Optional[asyncio.Task] = None
+
+        # Streams without a message for longer than the threshold of their type
+        self.stale_streams: Set[str] = set()
+        self._stale_after: Dict[str, Optional[float]] = {}
+
+        self._queue: Optional[StreamQueue] = None
+
+        # Set when the pool is one of several redundant feeds, only the first delivery of an event is kept
+        self.deduplicator: Optional["MarketStreamDeduplicator"] = None
+        self.feed_index = 0
+
+        self.metrics = MarketStreamPoolMetrics()
+
+    @property
+    def queue(self) -> StreamQueue:
+        # Created lazily to be bound to the running loop
+        if self._queue is None:
+            self._queue = StreamQueue(
+                maxsize=self.settings.market_queue_size, policy=self.settings.market_queue_policy
+            )
+
+        return self._queue
+
+    @queue.setter
+    def queue(self, queue: StreamQueue) -> None:
+        self._queue = queue
+
+    @property
+    def subscriptions(self) -> Set[str]:
+        return set().union(*(shard.subscriptions for shard in self.shards))
+
+    def get_shard(self, stream: str) -> Optional[MarketStreamShard]:
+        for shard in self.shards:
+            if stream in shard.subscriptions:
+                return shard
+
+        return None
+
+    def _get_target_shards_count(self, streams_count: int) -> int:
+        return min(
+            max(
+                self.settings.market_min_connections,
+                ceil(streams_count / self.settings.market_streams_per_connection),
+            ),
+            self.settings.market_max_connections,
+        )
+
+    def _create_shard(self) -> MarketStreamShard:
+        # Evenly spaced, a full bucket burst on top of its refill would go over the limit within a second
+        shard = MarketStreamShard(
+            self.next_shard_index,
+            WeightRateLimiter(1, period=1.0 / self.settings.market_control_messages_per_second),
+        )
+        self.next_shard_index += 1
+
+        self.shards.append(shard)
+
+        return shard
+
+    #
+    # Connections
+    #
+
+    async def _connect(self, shard: MarketStreamShard) -> None:
+        # Pinged by the monitor through the control limiter rather than by the library keepalive
+        shard.session = await super().open(self.settings.stream_url, keepalive=False)
+        shard.connected_at = shard.last_pong_at = monotonic()
+
+        self.metrics.connections += 1
+
+        # Requests of the previous connection won't be answered, the whole set is replayed instead
+        self._resolve_requests(shard)
+
+        shard.to_subscribe.clear()
+        shard.to_unsubscribe.clear()
+
+        if shard.subscriptions:
+            await shard.limiter.acquire()
+            await self._request(shard, "SUBSCRIBE", sorted(shard.subscriptions), wait=False)
+
+        logger.info(f"shard {shard.index}: connected with {shard.load} streams")
+
+    def _get_backoff(self, attempt: int) -> float:
+        backoff = min(
+            self.settings.market_reconnect_backoff_max,
+            self.settings.market_reconnect_backoff * 2**attempt,
+        )
+
+        return backoff * random.uniform(0.5, 1.0)
+
+    async def _reconnect(self, shard: MarketStreamShard) -> None:
+        attempt = 0
+
+        # The first attempt is immediate, the next ones back off from a few milliseconds
+        while True:
+            try:
+                await self._connect(shard)
+            except (OSError, asyncio.TimeoutError, WebSocketException) as exc:
+                logger.info(f"shard {shard.index}: unable to reconnect ({exc})")
+
+                await asyncio.sleep(self._get_backoff(attempt))
+                attempt += 1
+
+                continue
+
+            self.metrics.reopens += 1
+
+            if self.on_reopen:
+                await self.on_reopen()
+
+            return
+
+    async def _read(self, shard: MarketStreamShard) -> None:
+        while True:
+            try:
+                # Message rate and queue depth are counted by the queue
+                async for data in self.iterate(shard.session):
+                    now = monotonic()
+
+                    if "stream" not in data and "id" in data:
+                        self._on_response(shard, data)
+                    else:
+                        stream = data.get("stream")
+                        shard.stream_times[stream] = now
+
+                        if stream in self.stale_streams:
+                            self._set_stale(stream, False)
+
+                        if self.deduplicator and not self.deduplicator.accept(self.feed_index, data):
+                            continue
+
+                        await self.queue.put(data)
+            except ConnectionClosed:
+                pass
+
+            if shard.closing:
+                return
+
+            logger.info(f"shard {shard.index}: connection closed")
+
+            # Only this shard goes down, the others keep streaming meanwhile
+            await self._reconnect(shard)
+
+    #
+    # Feed health
+    #
+
+    def _get_stale_after(self, stream: str) -> Optional[float]:
+        if stream not in self._stale_after:
+            self._stale_after[stream] = self.settings.market_stale_after.get(get_stream_type(stream))
+
+        return self._stale_after[stream]
+
+    def _set_stale(self, stream: str, stale: bool) -> None:
+        if stale:
+            self.stale_streams.add(stream)
+            self.metrics.stale_streams += 1
+
+            logger.warning(f"{stream}: stale")
+        else:
+            self.stale_streams.discard(stream)
+            self.metrics.recovered_streams += 1
+
+            logger.info(f"{stream}: recovered")
+
+        if self.on_stale:
+            self.on_stale(stream, stale)
+
+    async def _ping(self, shard: MarketStreamShard) -> None:
+        # Pings count in the control messages limit of the connection
+        await shard.limiter.acquire()
+
+        started_at = monotonic()
+
+        try:
+            pong_waiter = await shard.session.ping()
+
+            await asyncio.wait_for(pong_waiter, timeout=self.settings.market_health_check_interval)
+        except asyncio.TimeoutError:
+            self.metrics.missed_pongs += 1
+        except ConnectionClosed:
+            pass
+        else:
+            shard.last_pong_at = monotonic()
+            shard.rtt = shard.last_pong_at - started_at
+
+    def _check_shard(self, shard: MarketStreamShard, now: float) -> None:
+        stale_after = self.settings.market_connection_stale_after
+
+        if now - shard.last_pong_at > stale_after:
+            logger.warning(f"shard {shard.index}: no pong for {stale_after}s, reconnecting")
+
+            self.metrics.stalls += 1
+
+            # The reader gets the connection closed and reconnects right away
+            shard.session.transport.abort()
+
+        # Illiquid streams go quiet normally, only their own silence makes them stale
+        for stream in shard.subscriptions - self.stale_streams:
+            if (stream_stale_after := self._get_stale_after(stream)) is None:
+                continue
+
+            if now - shard.stream_times.get(stream, shard.connected_at) > stream_stale_after:
+                self._set_stale(stream, True)
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.market_health_check_interval)
+
+            # Shards being closed or already reconnecting are left alone
+            shards = [shard for shard in self.shards if shard.session and shard.session.open]
+
+            await asyncio.gather(*[self._ping(shard) for shard in shards])
+
+            now = monotonic()
+
+            for shard in shards:
+                if shard.session and shard.session.open and not shard.closing:
+                    self._check_shard(shard, now)
+
+    def _on_response(self, shard: MarketStreamShard, data: dict) -> None:
+        future = shard.requests.pop(data["id"], None)
+
+        if future and not future.done():
+            future.set_result(data)
+
+    def _resolve_requests(self, shard: MarketStreamShard) -> None:
+        for future in shard.requests.values():
+            if not future.done():
+                future.set_result(None)
+
+        shard.requests.clear()
+
+    async def _request(self, shard: MarketStreamShard, method: str, params: List[str], wait: bool = True):
+        request_id = self.next_request_id
+        self.next_request_id += 1
+
+        future = shard.requests[request_id] = asyncio.get_running_loop().create_future()
+
+        try:
+            await self.send(shard.session, {"method": method, "params": params, "id": request_id})
+        except ConnectionClosed:
+            shard.requests.pop(request_id, None)
+
+            # The shard subscribes to its whole set again once reconnected
+            logger.info(f"shard {shard.index}: connection closed, {method} deferred")
+
+            return
+
+        self.metrics.control_frames += 1
+
+        if not wait:
+            return
+
+        try:
+            response = await asyncio.wait_for(future, timeout=self.settings.market_request_timeout)
+        except asyncio.TimeoutError:
+            shard.requests.pop(request_id, None)
+
+            self.metrics.request_timeouts += 1
+
+            logger.warning(f"shard {shard.index}: {method} request {request_id} not acknowledged")
+
+            return
+
+        # Superseded by a reconnection or a close
+        if response is None:
+            return
+
+        if "result" in response:
+            self.metrics.acknowledged += 1
+        else:
+            self.metrics.request_errors += 1
+
+            logger.warning(f"shard {shard.index}: {method} request {request_id} failed: {response}")
+
+    async def _flush(self, shard: MarketStreamShard) -> None:
+        async with shard.flush_lock:
+            while shard.session and (shard.to_unsubscribe or shard.to_subscribe):
+                await shard.limiter.acquire()
+
+                # Changes queued while waiting for the budget are sent in the same frame
+                if shard.to_unsubscribe:
+                    method, streams = "UNSUBSCRIBE", shard.to_unsubscribe
+                    shard.to_unsubscribe = set()
+                else:
+                    method, streams = "SUBSCRIBE", shard.to_subscribe
+                    shard.to_subscribe = set()
+
+                await self._request(shard, method, sorted(streams))
+
+    async def _open_shard(self, shard: MarketStreamShard) -> None:
+        # Concurrent subscriptions may pick a shard being opened, their streams go with its connection
+        async with shard.open_lock:
+            if shard.session:
+                return
+
+            await self._connect(shard)
+
+            shard.reader = asyncio.create_task(self._read(shard))
+
+    async def _close_shard(self, shard: MarketStreamShard) -> None:
+        shard.closing = True
+
+        # The reader keeps draining pending messages until the server acknowledges the close
+        if shard.session:
+            await super().close(shard.session)
+            shard.session = None
+
+        if shard.reader:
+            shard.reader.cancel()
+            shard.reader = None
+
+        self._resolve_requests(shard)
+
+        logger.info(f"shard {shard.index}: closed")
+
+    async def open(self):
+        self.opened = True
+
+        while len(self.shards) < self.settings.market_min_connections:
+            self._create_shard()
+
+        await asyncio.gather(*[self._open_shard(shard) for shard in self.shards if not shard.session])
+
+        if self.monitor is None:
+            self.monitor = asyncio.create_task(self._monitor())
+
+    async def close(self):
+        self.opened = False
+
+        if self.monitor:
+            self.monitor.cancel()
+            self.monitor = None
+
+        for shard in self.shards:
+            await self._close_shard(shard)
+
+        self.shards = []
+
+    #
+    # Subscriptions
+    #
+
+    async def _subscribe_shard(self, shard: MarketStreamShard, streams: List[str]) -> None:
+        if shard.session:
+            shard.to_subscribe.update(streams)
+            shard.to_unsubscribe.difference_update(streams)
+
+            await self._flush(shard)
+        elif self.opened:
+            await self._open_shard(shard)
+
+    def _assign(self, streams: Iterable[str]) -> Dict[MarketStreamShard, List[str]]:
+        assignments: Dict[MarketStreamShard, List[str]] = defaultdict(list)
+
+        for stream in streams:
+            shard = min(self.shards, key=lambda shard: shard.load)
+
+            if shard.load >= self.settings.market_streams_per_connection:
+                logger.warning(f"subscribe {stream}: all connections are full, dropping it")
+
+                self.metrics.dropped_streams += 1
+                self.references.pop(stream, None)
+
+                continue
+
+            shard.subscriptions.add(stream)
+            assignments[shard].append(stream)
+
+            # Staleness is counted from the subscription until the first message
+            shard.stream_times[stream] = monotonic()
+
+        return assignments
+
+    async def subscribe(self, streams: Iterable[str]):
+        # Each occurrence is a reference, a stream used by two strategies is listed twice
+        new_streams = []
+
+        for stream in streams:
+            self.references[stream] += 1
+
+            if self.references[stream] == 1:
+                new_streams.append(stream)
+
+        if not new_streams:
+            return
+
+        target_count = self._get_target_shards_count(len(self.subscriptions) + len(new_streams))
+
+        while len(self.shards) < target_count:
+            self._create_shard()
+
+        await asyncio.gather(
+            *[
+                self._subscribe_shard(shard, shard_streams)
+                for shard, shard_streams in self._assign(new_streams).items()
+            ]
+        )
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        removals: Dict[MarketStreamShard, List[str]] = defaultdict(list)
+
+        for stream in streams:
+            if not self.references[stream]:
+                continue
+
+            self.references[stream] -= 1
+
+            if self.references[stream]:
+                continue
+
+            del self.references[stream]
+
+            if shard := self.get_shard(stream):
+                shard.subscriptions.remove(stream)
+                shard.stream_times.pop(stream, None)
+                removals[shard].append(stream)
+
+            self.stale_streams.discard(stream)
+
+        for shard, shard_streams in removals.items():
+            shard.to_unsubscribe.update(shard_streams)
+            shard.to_subscribe.difference_update(shard_streams)
+
+        await asyncio.gather(*[self._flush(shard) for shard in removals])
+
+        await self.rebalance()
+
+    async def rebalance(self):
+        target_count = self._get_target_shards_count(len(self.subscriptions))
+
+        # Drain the least loaded shards into the others, subscribing before closing to avoid gaps
+        while len(self.shards) > target_count:
+            shard = min(self.shards, key=lambda shard: shard.load)
+
+            self.shards.remove(shard)
+
+            streams = sorted(shard.subscriptions)
+
+            if streams:
+                logger.info(f"shard {shard.index}: moving {len(streams)} streams")
+
+                self.metrics.moved_streams += len(streams)
+
+                for other_shard, shard_streams in self._assign(streams).items():
+                    await self._subscribe_shard(other_shard, shard_streams)
+
+            await self._close_shard(shard)
+
+    async def listen(
+        self,
+        on_reopen: Optional[Callable[[], Awaitable]] = None,
+        on_stale: Optional[Callable[[str, bool], Any]] = None,
+    ) -> AsyncIterator[dict]:
+        self.on_reopen = on_reopen
+        self.on_stale = on_stale
+
+        if not self.opened:
+            await self.open()
+
+        while True:
+            yield await self.queue.get()
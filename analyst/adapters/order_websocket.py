@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from decimal import Decimal
+from logging import getLogger
+from time import time
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from pydantic import BaseModel
+from websockets.exceptions import ConnectionClosed
+
+from analyst.adapters.binance import (
+    BinanceAdapter,
+    BinanceWebSocketAdapter,
+    BinanceWebSocketConnectionClosed,
+)
+from analyst.adapters.rate_limiter import WeightRateLimiter
+from analyst.adapters.types import ParamsDict
+from analyst.crypto.exceptions import BinanceRateLimited
+
+logger = getLogger("adapters.order_websocket")
+
+
+class BinanceOrderWebSocketMetrics(BaseModel):
+    connections: int = 0
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    lost_requests: int = 0
+
+
+class BinanceOrderWebSocketAdapter(BinanceWebSocketAdapter):
+    channel = "orders"
+
+    # WebSocket API methods with the REST endpoint sharing their weight
+    api_methods = {
+        "order.place": ("POST", "/api/v3/order"),
+        "order.test": ("POST", "/api/v3/order/test"),
+        "order.cancel": ("DELETE", "/api/v3/order"),
+        "order.cancelReplace": ("POST", "/api/v3/order/cancelReplace"),
+    }
+
+    def __init__(self, settings, rate_limiter: Optional[WeightRateLimiter] = None):
+        super().__init__(settings)
+
+        # The weight budget is the same as the REST API one
+        self.rate_limiter = rate_limiter or WeightRateLimiter(
+            BinanceAdapter.api_weight_threshold, period=BinanceAdapter.api_weight_period
+        )
+
+        self.session = None
+        self.reader: Optional[asyncio.Task] = None
+
+        # Requests sent on the connection, answered in any order
+        self.requests: Dict[int, asyncio.Future] = {}
+        self.next_request_id = 1
+
+        self.metrics = BinanceOrderWebSocketMetrics()
+
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        return self._lock
+
+    #
+    # Connection
+    #
+
+    async def get_session(self):
+        # Opened on the first request and again on the next one after a disconnection
+        async with self.lock:
+            if self.session is None:
+                self.session = await self.open(self.settings.ws_api_url)
+                self.reader = asyncio.create_task(self._read(self.session))
+
+                self.metrics.connections += 1
+
+                logger.debug("connected")
+
+        return self.session
+
+    async def _read(self, session) -> None:
+        try:
+            async for data in self.iterate(session):
+                future = self.requests.pop(data.get("id"), None)
+
+                if future and not future.done():
+                    future.set_result(data)
+        except ConnectionClosed:
+            pass
+
+        if self.session is session:
+            self.session = None
+
+        if self.requests:
+            logger.warning(f"connection closed, {len(self.requests)} requests left unanswered")
+
+        # Orders may or may not have been placed, they are never sent again
+        for future in self.requests.values():
+            if not future.done():
+                future.set_exception(BinanceWebSocketConnectionClosed("connection closed"))
+
+        self.metrics.lost_requests += len(self.requests)
+        self.requests.clear()
+
+    async def close(self):
+        if self.session:
+            await super().close(self.session)
+
+        if self.reader:
+            await self.reader
+            self.reader = None
+
+    #
+    # Requests
+    #
+
+    def _get_signature(self, params: ParamsDict) -> str:
+        return hmac.new(
+            self.settings.secret_key.encode("utf-8"),
+            urlencode(sorted(params.items())).encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+
+    def _update_weights(self, rate_limits: List[dict]) -> None:
+        for rate_limit in rate_limits:
+            if rate_limit["rateLimitType"] == "REQUEST_WEIGHT" and rate_limit["interval"] == "MINUTE":
+                self.rate_limiter.sync(rate_limit["count"])
+
+    def _check_response(self, response: dict) -> None:
+        if response["status"] < 400:
+            return
+
+        self.metrics.errors += 1
+
+        error = response.get("error", {})
+        data = error.get("data")
+
+        retry_after = 0.0
+
+        # Epoch in milliseconds when rate limited
+        if isinstance(data, dict) and "retryAfter" in data:
+            retry_after = max(data["retryAfter"] / 1000 - time(), 0.0)
+
+        raise BinanceAdapter.get_api_error(
+            response["status"], error.get("code", 0), error.get("msg", ""), retry_after, data
+        )
+
+    async def _request(self, method: str, params: ParamsDict) -> dict:
+        params = {
+            name: str(value) if isinstance(value, (Decimal, float)) else value
+            for name, value in params.items()
+        }
+        params["apiKey"] = self.settings.api_key
+
+        request_id = self.next_request_id
+        self.next_request_id += 1
+
+        weight = BinanceAdapter.api_endpoint_weights[self.api_methods[method]]
+
+        async with self.rate_limiter.consume(weight):
+            # Signed once the budget is acquired, waiting for it may have outlasted the recvWindow
+            params["timestamp"] = int(time() * 1000)
+            params["signature"] = self._get_signature(params)
+
+            session = await self.get_session()
+
+            future = self.requests[request_id] = asyncio.get_running_loop().create_future()
+
+            try:
+                await self.send(session, {"id": request_id, "method": method, "params": params})
+
+                self.metrics.requests += 1
+
+                response = await asyncio.wait_for(future, timeout=self.settings.request_timeout)
+            except ConnectionClosed as exc:
+                self.requests.pop(request_id, None)
+
+                raise BinanceWebSocketConnectionClosed(f"{method}: connection closed") from exc
+            except asyncio.TimeoutError:
+                self.requests.pop(request_id, None)
+
+                self.metrics.timeouts += 1
+
+                raise
+
+        self._update_weights(response.get("rateLimits", []))
+
+        try:
+            self._check_response(response)
+        except BinanceRateLimited as exc:
+            self.rate_limiter.pause(exc.retry_after)
+
+            raise
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{method}: sending {json.dumps(params, indent=4)}")
+            logger.debug(f"{method}: get {json.dumps(response['result'], indent=4)}")
+
+        return response["result"]
+
+    async def create_order(self, symbol: str, side: str, type: str, real: bool = False, **kwargs):
+        params = BinanceAdapter._get_order_params(symbol, side, type, **kwargs)
+
+        return await self._request("order.place" if real else "order.test", params)
+
+    async def cancel_replace_order(
+        self,
+        symbol: str,
+        order_id: int,
+        side: str,
+        type: str,
+        mode: str = "STOP_ON_FAILURE",
+        **kwargs,
+    ):
+        params = BinanceAdapter._get_order_params(symbol, side, type, **kwargs)
+
+        params["cancelOrderId"] = order_id
+        params["cancelReplaceMode"] = mode
+
+        return await self._request("order.cancelReplace", params)
+
+    async def cancel_order(self, symbol: str, order_id: int):
+        params: ParamsDict = {"symbol": symbol, "orderId": order_id}
+
+        return await self._request("order.cancel", params)
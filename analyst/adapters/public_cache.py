@@ -0,0 +1,115 @@
+import asyncio
+from functools import partial
+from logging import getLogger
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from analyst.adapters.local_file import LocalFileAdapter
+from analyst.adapters.redis import RedisAdapter
+
+logger = getLogger("adapters.public_cache")
+
+CacheEntry = Tuple[float, Any]
+
+
+class PublicCacheMetrics(BaseModel):
+    hits: int = 0
+    memory_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+
+class PublicCacheAdapter:
+    namespace = "binance_public"
+
+    def __init__(self, cache: Union[LocalFileAdapter, RedisAdapter], ttls: Dict[str, float]):
+        self.cache = cache
+        self.ttls = ttls
+
+        self.metrics = PublicCacheMetrics()
+
+        self._memory: Dict[str, CacheEntry] = {}
+
+    def _get_key(self, name: str) -> str:
+        return f"{self.namespace}.{name}"
+
+    def _is_fresh(self, name: str, fetched_at: float) -> bool:
+        return time() - fetched_at < self.ttls.get(name, 0)
+
+    def _get_timestamp_key(self, name: str) -> str:
+        return f"{self.namespace}.{name}.fetched_at"
+
+    def _read_shared(self, name: str) -> Optional[CacheEntry]:
+        key = self._get_key(name)
+        timestamp_key = self._get_timestamp_key(name)
+
+        try:
+            # The fetch time is stored apart, an expired entry is never read nor decoded
+            if not self.cache.exists(timestamp_key):
+                return None
+
+            if not self._is_fresh(name, self.cache.read(timestamp_key)["fetched_at"]):
+                return None
+
+            if self.cache.exists(key):
+                entry = self.cache.read(key)
+
+                return entry["fetched_at"], entry["data"]
+        except Exception as exc:
+            self.metrics.errors += 1
+            logger.warning(f"could not read {key} from cache: {exc}")
+
+        return None
+
+    def _save_shared(self, name: str, entry: CacheEntry) -> None:
+        key = self._get_key(name)
+
+        try:
+            self.cache.save(key, {"fetched_at": entry[0], "data": entry[1]})
+            self.cache.save(self._get_timestamp_key(name), {"fetched_at": entry[0]})
+        except Exception as exc:
+            self.metrics.errors += 1
+            logger.warning(f"could not save {key} to cache: {exc}")
+
+    async def _run_in_thread(self, func: Callable, *args) -> Any:
+        # Exchange info weighs several megabytes, reading and writing it would block the loop
+        return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+    async def get(self, name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if (entry := self._memory.get(name)) and self._is_fresh(name, entry[0]):
+            self.metrics.hits += 1
+            self.metrics.memory_hits += 1
+
+            return entry[1]
+
+        # Another process (bot, notebook, script) may have refreshed it already
+        entry = await self._run_in_thread(self._read_shared, name)
+
+        if entry and self._is_fresh(name, entry[0]):
+            self.metrics.hits += 1
+            self.metrics.shared_hits += 1
+
+            self._memory[name] = entry
+
+            return entry[1]
+
+        self.metrics.misses += 1
+
+        logger.debug(f"{name} is missing or expired, fetching it")
+
+        entry = (time(), await fetch())
+
+        self._memory[name] = entry
+        await self._run_in_thread(self._save_shared, name, entry)
+
+        return entry[1]
+
+    def invalidate(self, name: str) -> None:
+        self._memory.pop(name, None)
+
+        for key in (self._get_key(name), self._get_timestamp_key(name)):
+            if self.cache.exists(key):
+                self.cache.delete(key)
@@ -0,0 +1,115 @@
+import asyncio
+from contextlib import asynccontextmanager
+from logging import getLogger
+from time import monotonic
+from typing import Optional
+
+from pydantic import BaseModel
+
+logger = getLogger("adapters.rate_limiter")
+
+
+class RateLimiterMetrics(BaseModel):
+    acquired: int = 0
+    acquired_weight: int = 0
+    waits: int = 0
+    waited_seconds: float = 0.0
+    server_syncs: int = 0
+    pauses: int = 0
+
+
+class WeightRateLimiter:
+    def __init__(self, capacity: int, period: float = 60.0):
+        self.capacity = capacity
+        self.period = period
+
+        self.tokens = float(capacity)
+        self.in_flight = 0
+        self.metrics = RateLimiterMetrics()
+
+        self._updated_at = monotonic()
+        self._paused_until = 0.0
+        self._last_used_weight: Optional[int] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        return self._lock
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+    def _refill(self) -> None:
+        now = monotonic()
+
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    def get_wait_time(self, weight: int) -> float:
+        if (pause := self._paused_until - monotonic()) > 0:
+            return pause
+
+        self._refill()
+
+        if self.tokens >= weight:
+            return 0.0
+
+        return (weight - self.tokens) / self.refill_rate
+
+    async def acquire(self, weight: int = 1) -> None:
+        weight = min(weight, self.capacity)
+
+        # asyncio.Lock wakes up waiters in FIFO order, concurrent callers are served fairly
+        async with self.lock:
+            while to_wait := self.get_wait_time(weight):
+                logger.debug(
+                    f"weight budget exhausted ({self.tokens:.0f}/{self.capacity}), wait {to_wait:.2f}s"
+                )
+
+                self.metrics.waits += 1
+                self.metrics.waited_seconds += to_wait
+
+                await asyncio.sleep(to_wait)
+
+            self.tokens -= weight
+
+            self.metrics.acquired += 1
+            self.metrics.acquired_weight += weight
+
+    @asynccontextmanager
+    async def consume(self, weight: int = 1):
+        await self.acquire(weight)
+
+        self.in_flight += weight
+
+        try:
+            yield
+        finally:
+            self.in_flight -= weight
+
+    def pause(self, seconds: float) -> None:
+        # The exchange signaled an overload, every caller holds off until it is over
+        logger.warning(f"requests paused for {seconds:.2f}s")
+
+        self._paused_until = max(self._paused_until, monotonic() + seconds)
+        self.tokens = 0.0
+
+        self.metrics.pauses += 1
+
+    def sync(self, used_weight: int) -> None:
+        self._refill()
+
+        remaining = self.capacity - used_weight - self.in_flight
+        window_reset = self._last_used_weight is not None and used_weight < self._last_used_weight
+
+        if window_reset:
+            self.tokens = min(self.capacity, max(self.tokens, remaining))
+        else:
+            self.tokens = min(self.tokens, remaining)
+
+        self._last_used_weight = used_weight
+        self.metrics.server_syncs += 1
@@ -0,0 +1,235 @@
+import asyncio
+from collections import deque
+from logging import getLogger
+from statistics import quantiles
+from time import monotonic
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from pydantic import BaseModel
+
+from analyst.adapters.market_stream_pool import BinanceMarketStreamPool, get_stream_type
+from analyst.adapters.stream_queue import StreamQueue
+from analyst.adapters.stream_recorder import StreamRecorderAdapter
+
+logger = getLogger("adapters.redundant_market_stream")
+
+# Events of these streams share their event time, they are told apart by their own ids
+SEQUENCE_FIELDS = {"trade": "t", "aggTrade": "a"}
+
+
+def get_sequence(stream_type: str, event: dict) -> Optional[int]:
+    if field := SEQUENCE_FIELDS.get(stream_type):
+        return event.get(field)
+
+    # Update id of depth and book ticker events, event time of the others
+    return event.get("u", event.get("lastUpdateId", event.get("E")))
+
+
+class MarketFeedStats(BaseModel):
+    index: int
+    stream_url: str
+    connections: int = 0
+    messages: int = 0
+    wins: int = 0
+    win_rate: float = 0.0
+    # Delay behind the first feed delivering the same events, in seconds
+    lag_p50: Optional[float] = None
+    lag_p99: Optional[float] = None
+    rtt: Optional[float] = None
+
+
+class MarketStreamDeduplicator:
+    lags_size = 10_000
+
+    def __init__(self, feeds_count: int):
+        # Latest event forwarded of each stream, with the time it was received
+        self.last: Dict[Hashable, tuple] = {}
+        self._stream_types: Dict[str, str] = {}
+
+        self.messages = [0] * feeds_count
+        self.wins = [0] * feeds_count
+        self.lags: List[Deque[float]] = [deque(maxlen=self.lags_size) for _ in range(feeds_count)]
+
+    def accept(self, feed: int, data: dict) -> bool:
+        now = monotonic()
+        stream, event = data["stream"], data["data"]
+
+        self.messages[feed] += 1
+
+        if (stream_type := self._stream_types.get(stream)) is None:
+            stream_type = self._stream_types[stream] = get_stream_type(stream)
+
+        # "!bookTicker" carries every symbol
+        key = (stream, event.get("s")) if stream[0] == "!" else stream
+        sequence = get_sequence(stream_type, event)
+
+        if sequence is None:
+            self.wins[feed] += 1
+
+            return True
+
+        last = self.last.get(key)
+
+        if last is None or sequence > last[0]:
+            self.last[key] = (sequence, now)
+
+            self.wins[feed] += 1
+            self.lags[feed].append(0.0)
+
+            return True
+
+        # Already forwarded from a faster feed, older events were superseded by it as well
+        if sequence == last[0]:
+            self.lags[feed].append(now - last[1])
+
+        return False
+
+    def forget(self, streams: Set[str]) -> None:
+        for key in list(self.last):
+            if (key[0] if isinstance(key, tuple) else key) in streams:
+                del self.last[key]
+
+
+class BinanceRedundantMarketStream:
+    # Identical pools of market stream connections, ideally to different hosts, each event is
+    # forwarded once from whichever one delivers it first
+    def __init__(self, settings, stream_urls: Optional[List[str]] = None):
+        self.settings = settings
+
+        self.feeds = [
+            BinanceMarketStreamPool(settings.copy(update={"stream_url": stream_url}))
+            for stream_url in stream_urls or settings.market_stream_urls
+        ]
+        self.deduplicator = MarketStreamDeduplicator(len(self.feeds))
+
+        for index, feed in enumerate(self.feeds):
+            feed.feed_index = index
+            feed.deduplicator = self.deduplicator
+
+        self.on_stale: Optional[Callable[[str, bool], Any]] = None
+        self.stale_streams: Set[str] = set()
+
+        self._queue: Optional[StreamQueue] = None
+
+    @property
+    def queue(self) -> StreamQueue:
+        # Created lazily to be bound to the running loop
+        if self._queue is None:
+            self._queue = StreamQueue(
+                maxsize=self.settings.market_queue_size, policy=self.settings.market_queue_policy
+            )
+
+        return self._queue
+
+    @property
+    def recorder(self) -> Optional[StreamRecorderAdapter]:
+        return self.feeds[0].recorder
+
+    @recorder.setter
+    def recorder(self, recorder: Optional[StreamRecorderAdapter]) -> None:
+        # Recording one of the feeds is enough, the others carry the same events
+        self.feeds[0].recorder = recorder
+
+    @property
+    def subscriptions(self) -> Set[str]:
+        return self.feeds[0].subscriptions
+
+    @property
+    def stats(self) -> List[MarketFeedStats]:
+        stats = []
+
+        for index, feed in enumerate(self.feeds):
+            messages = self.deduplicator.messages[index]
+            lags = self.deduplicator.lags[index]
+            rtts = [shard.rtt for shard in feed.shards if shard.rtt is not None]
+
+            feed_stats = MarketFeedStats(
+                index=index,
+                stream_url=feed.settings.stream_url,
+                connections=len([shard for shard in feed.shards if shard.session]),
+                messages=messages,
+                wins=self.deduplicator.wins[index],
+                win_rate=self.deduplicator.wins[index] / messages if messages else 0.0,
+                rtt=max(rtts) if rtts else None,
+            )
+
+            if len(lags) > 1:
+                percentiles = quantiles(lags, n=100, method="inclusive")
+
+                feed_stats.lag_p50, feed_stats.lag_p99 = percentiles[49], percentiles[98]
+
+            stats.append(feed_stats)
+
+        return stats
+
+    def _on_feed_stale(self, stream: str, stale: bool) -> None:
+        # A stream is only stale once no feed delivers it anymore
+        if stale:
+            if stream in self.stale_streams or not all(
+                stream in feed.stale_streams for feed in self.feeds
+            ):
+                return
+
+            self.stale_streams.add(stream)
+        else:
+            if stream not in self.stale_streams:
+                return
+
+            self.stale_streams.discard(stream)
+
+        if self.on_stale:
+            self.on_stale(stream, stale)
+
+    async def open(self):
+        # The feeds put the events they win into the same queue
+        for feed in self.feeds:
+            feed.queue = self.queue
+
+        await asyncio.gather(*[feed.open() for feed in self.feeds])
+
+    async def close(self):
+        await asyncio.gather(*[feed.close() for feed in self.feeds])
+
+    async def subscribe(self, streams: Iterable[str]):
+        streams = list(streams)
+
+        await asyncio.gather(*[feed.subscribe(streams) for feed in self.feeds])
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        streams = list(streams)
+
+        await asyncio.gather(*[feed.unsubscribe(streams) for feed in self.feeds])
+
+        removed = set(streams) - self.subscriptions
+
+        self.deduplicator.forget(removed)
+        self.stale_streams.difference_update(removed)
+
+    async def listen(
+        self,
+        on_reopen: Optional[Callable[[], Awaitable]] = None,
+        on_stale: Optional[Callable[[str, bool], Any]] = None,
+    ) -> AsyncIterator[dict]:
+        self.on_stale = on_stale
+
+        for feed in self.feeds:
+            feed.on_reopen = on_reopen
+            feed.on_stale = self._on_feed_stale
+
+        if not all(feed.opened for feed in self.feeds):
+            await self.open()
+
+        while True:
+            yield await self.queue.get()
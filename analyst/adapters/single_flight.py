@@ -0,0 +1,63 @@
+import asyncio
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from pydantic import BaseModel
+
+logger = getLogger("adapters.single_flight")
+
+
+class SingleFlightMetrics(BaseModel):
+    calls: int = 0
+    coalesced: int = 0
+    takeovers: int = 0
+
+
+class LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    def __init__(self):
+        self.metrics = SingleFlightMetrics()
+
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        # Callers share the very same result object, it must be treated as read-only
+        while (future := self._in_flight.get(key)) is not None:
+            self.metrics.coalesced += 1
+
+            logger.debug(f"join in-flight call {key}")
+
+            try:
+                return await asyncio.shield(future)
+            except LeaderCancelled:
+                # Only the caller which made the call was cancelled, one of the others makes it again
+                self.metrics.takeovers += 1
+
+        future = asyncio.get_running_loop().create_future()
+
+        self._in_flight[key] = future
+        self.metrics.calls += 1
+
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            future.exception()
+
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+
+            # Avoids "exception was never retrieved" warnings when nobody joined the call
+            future.exception()
+
+            raise
+        else:
+            future.set_result(result)
+
+            return result
+        finally:
+            del self._in_flight[key]
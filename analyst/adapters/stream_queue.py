@@ -0,0 +1,149 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, Hashable, Literal, Optional
+
+from pydantic import BaseModel
+
+QueuePolicy = Literal["block", "drop_oldest", "conflate"]
+
+
+def get_stream_key(data: Any) -> Optional[Hashable]:
+    return data.get("stream") if isinstance(data, dict) else None
+
+
+class StreamQueueMetrics(BaseModel):
+    received: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    conflated: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    # Messages received per second, over the last completed window
+    rate: float = 0.0
+
+
+class StreamQueue:
+    rate_window = 1.0
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        policy: QueuePolicy = "block",
+        key: Callable[[Any], Optional[Hashable]] = get_stream_key,
+    ):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+
+        # With conflation the deque holds keys and the latest item of each key is kept aside
+        self._items: Deque = deque()
+        self._latest: Dict[Hashable, Any] = {}
+
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+
+        # Plain counters on the hot path, the metrics model is only built when read
+        self.received = self.delivered = self.dropped = self.conflated = self.max_depth = 0
+        self.rate = 0.0
+
+        self._window_start = monotonic()
+        self._window_count = 0
+
+    @property
+    def metrics(self) -> StreamQueueMetrics:
+        return StreamQueueMetrics(
+            received=self.received,
+            delivered=self.delivered,
+            dropped=self.dropped,
+            conflated=self.conflated,
+            depth=len(self._items),
+            max_depth=self.max_depth,
+            rate=self.rate,
+        )
+
+    def __len__(self):
+        return len(self._items)
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    def _count_received(self) -> None:
+        self.received += 1
+        self._window_count += 1
+
+        now = monotonic()
+
+        if (elapsed := now - self._window_start) >= self.rate_window:
+            self.rate = self._window_count / elapsed
+
+            self._window_start, self._window_count = now, 0
+
+    def _drop_oldest(self) -> None:
+        key = self._items.popleft()
+
+        if self.policy == "conflate":
+            del self._latest[key]
+
+        self.dropped += 1
+
+    def _append(self, item: Any) -> None:
+        if self.policy == "conflate":
+            key = self.key(item)
+
+            if key is not None and key in self._latest:
+                self._latest[key] = item
+                self.conflated += 1
+
+                return
+
+            # Items without key are never conflated
+            if key is None:
+                key = object()
+
+            if self.full():
+                self._drop_oldest()
+
+            self._items.append(key)
+            self._latest[key] = item
+        else:
+            if self.full():
+                self._drop_oldest()
+
+            self._items.append(item)
+
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+
+        self._not_empty.set()
+
+    async def put(self, item: Any) -> None:
+        self._count_received()
+
+        if self.policy == "block":
+            while self.full():
+                self._not_full.clear()
+
+                await self._not_full.wait()
+
+        self._append(item)
+
+    def get_nowait(self) -> Any:
+        if self.policy == "conflate":
+            item = self._latest.pop(self._items.popleft())
+        else:
+            item = self._items.popleft()
+
+        self.delivered += 1
+
+        self._not_full.set()
+
+        return item
+
+    async def get(self) -> Any:
+        while not self._items:
+            self._not_empty.clear()
+
+            await self._not_empty.wait()
+
+        return self.get_nowait()
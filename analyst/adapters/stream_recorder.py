@@ -0,0 +1,242 @@
+import asyncio
+import gzip
+import json
+from collections import Counter
+from logging import getLogger
+from pathlib import Path
+from time import monotonic, time_ns
+from typing import IO, Any, AsyncIterator, Iterable, Iterator, NamedTuple, Optional, Set
+
+logger = getLogger("adapters.stream_recorder")
+
+
+class StreamRecord(NamedTuple):
+    # Local receive time in microseconds, exchange event time in milliseconds (0 when unknown)
+    received_at: int
+    event_time: int
+    channel: str
+    raw: str
+
+
+def get_event_time(message: Any) -> int:
+    if isinstance(message, dict) and isinstance(data := message.get("data"), dict):
+        return data.get("E", 0)
+
+    return 0
+
+
+class StreamRecorderAdapter:
+    # Raw frames are appended as tab separated lines to gzip segments, listed in index.json with
+    # their time range so a replay can seek to the first segment of interest
+    segment_max_records = 100_000
+    segment_max_duration = 300.0
+    compress_level = 6
+
+    def __init__(self, dir_path: Path):
+        self.dir_path = Path(dir_path)
+
+        self.index: Optional[dict] = None
+        self.segment: Optional[dict] = None
+        self._file: Optional[IO[str]] = None
+
+    def _load_index(self) -> dict:
+        index_path = self.dir_path / "index.json"
+
+        if index_path.exists():
+            return json.loads(index_path.read_text())
+
+        return {"segments": [], "next_segment": 0}
+
+    def _save_index(self) -> None:
+        index_path = self.dir_path / "index.json"
+        tmp_path = index_path.with_suffix(".json.tmp")
+
+        tmp_path.write_text(json.dumps(self.index))
+        tmp_path.replace(index_path)
+
+    def _open_segment(self, received_at: int) -> None:
+        if self.index is None:
+            self.dir_path.mkdir(parents=True, exist_ok=True)
+
+            self.index = self._load_index()
+
+        name = f"{self.index['next_segment']:06d}.tsv.gz"
+
+        self._file = gzip.open(self.dir_path / name, "wt", compresslevel=self.compress_level)
+
+        # Until the segment is closed its end is unknown, a crash leaves it readable up to the last block
+        self.segment = {"name": name, "start": received_at, "end": None, "count": 0}
+
+        self.index["next_segment"] += 1
+        self.index["segments"].append(self.segment)
+
+        self._save_index()
+
+        logger.debug(f"segment {name}: opened")
+
+    def _close_segment(self) -> None:
+        if self._file is None or self.segment is None:
+            return
+
+        self._file.close()
+        self._file = None
+
+        self.segment["end"] = self.segment.pop("last", self.segment["start"])
+
+        self._save_index()
+
+        logger.debug(f"segment {self.segment['name']}: closed with {self.segment['count']} records")
+
+        self.segment = None
+
+    def record(
+        self, channel: str, raw: str, message: Any = None, received_at: Optional[int] = None
+    ) -> None:
+        if received_at is None:
+            received_at = time_ns() // 1000
+
+        if self.segment is not None and (
+            self.segment["count"] >= self.segment_max_records
+            or received_at - self.segment["start"] >= self.segment_max_duration * 1_000_000
+        ):
+            self._close_segment()
+
+        if self.segment is None:
+            self._open_segment(received_at)
+
+        self._file.write(f"{received_at}\t{get_event_time(message)}\t{channel}\t{raw}\n")  # type: ignore
+
+        self.segment["count"] += 1  # type: ignore
+        self.segment["last"] = received_at  # type: ignore
+
+    def close(self) -> None:
+        self._close_segment()
+
+
+class StreamReplayer:
+    # Speed is a multiple of the recorded pace, None replays as fast as possible
+    def __init__(
+        self,
+        dir_path: Path,
+        speed: Optional[float] = 1.0,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ):
+        self.dir_path = Path(dir_path)
+        self.speed = speed
+        self.start = start
+        self.end = end
+
+        # Shared by the channels so that market and user data events stay in their recorded order
+        self._origin: Optional[tuple] = None
+
+    def get_segments(self) -> list:
+        index = json.loads((self.dir_path / "index.json").read_text())
+
+        return [
+            segment
+            for segment in index["segments"]
+            if (self.start is None or segment["end"] is None or segment["end"] >= self.start)
+            and (self.end is None or segment["start"] <= self.end)
+        ]
+
+    def _read_segment(self, segment: dict) -> Iterator[StreamRecord]:
+        with gzip.open(self.dir_path / segment["name"], "rt") as file:
+            try:
+                for line in file:
+                    received_at, event_time, channel, raw = line.rstrip("\n").split("\t", 3)
+
+                    yield StreamRecord(int(received_at), int(event_time), channel, raw)
+            except EOFError:
+                logger.warning(f"segment {segment['name']}: truncated, recording was interrupted")
+
+    def records(self, channels: Optional[Iterable[str]] = None) -> Iterator[StreamRecord]:
+        channels = set(channels) if channels is not None else None
+
+        for segment in self.get_segments():
+            for record in self._read_segment(segment):
+                if self.start is not None and record.received_at < self.start:
+                    continue
+
+                if self.end is not None and record.received_at > self.end:
+                    return
+
+                if channels is None or record.channel in channels:
+                    yield record
+
+    async def _wait(self, received_at: int) -> None:
+        if not self.speed:
+            # Consumers still get to run between records
+            await asyncio.sleep(0)
+
+            return
+
+        now = monotonic()
+
+        if self._origin is None:
+            self._origin = (now, received_at)
+
+        origin_time, origin_received_at = self._origin
+
+        if (delay := origin_time + (received_at - origin_received_at) / 1e6 / self.speed - now) > 0:
+            await asyncio.sleep(delay)
+
+    async def replay(self, channels: Optional[Iterable[str]] = None) -> AsyncIterator[StreamRecord]:
+        for record in self.records(channels):
+            await self._wait(record.received_at)
+
+            yield record
+
+
+class ReplayMarketStream:
+    # Stands in for the market stream pool, only the subscribed streams are fed
+    def __init__(self, replayer: StreamReplayer):
+        self.replayer = replayer
+
+        self.references: Counter = Counter()
+
+    @property
+    def subscriptions(self) -> Set[str]:
+        return set(self.references)
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def subscribe(self, streams: Iterable[str]):
+        self.references.update(streams)
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        self.references.subtract(streams)
+
+        self.references = +self.references
+
+    async def listen(self, on_reopen=None, on_stale=None) -> AsyncIterator[dict]:
+        async for record in self.replayer.replay(["market"]):
+            data = json.loads(record.raw)
+
+            if data.get("stream") in self.references:
+                yield data
+
+
+class ReplayUserDataStream:
+    # Stands in for the user data websocket adapter
+    def __init__(self, replayer: StreamReplayer):
+        self.replayer = replayer
+
+        self.listen_key = "replay"
+
+    async def open(self, listen_key: str):
+        self.listen_key = listen_key
+
+    async def close(self, session):
+        pass
+
+    async def iterate(self, session) -> AsyncIterator[dict]:
+        async for record in self.replayer.replay(["user_data"]):
+            yield json.loads(record.raw)
+
+        # Nothing comes after the recording, ending would make the controller listen to it again
+        await asyncio.Event().wait()
@@ -2,19 +2,28 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
 import traceback
 from collections import defaultdict
 from logging import getLogger
-from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple, Union
+from typing import Coroutine, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
-from analyst.adapters.factory import get_adapters
+from analyst.adapters.factory import close_adapters, get_adapters
 from analyst.bot.exceptions import StrategyExit, StrategyHalt
 from analyst.bot.http_server import BotHttpServer
+from analyst.bot.mailbox import TickerMailbox
 from analyst.bot.order_manager import OrderManager
+from analyst.bot.sequencer import UserDataSequencer
 from analyst.bot.strategies.base import Strategy, StrategyState
 from analyst.controllers.factory import Controllers, get_controllers
-from analyst.crypto.models import Order, OrderFromUserDataStream, OutboundAccountPosition
+from analyst.crypto.models import (
+    Order,
+    OrderFromUserDataStream,
+    OutboundAccountPosition,
+    TradeStreamObject,
+)
+from analyst.crypto.order_book import OrderBook
 from analyst.repositories.factory import get_repositories
 from analyst.repositories.strategy import StrategyRepository
 from analyst.repositories.utils import serialize_order_obj
@@ -28,12 +37,22 @@ class Runner:
         self,
         controllers: Controllers,
         order_manager: OrderManager,
+        order_polling_interval: float = 10.0,
+        user_data_pairing_timeout: float = 0.05,
     ):
         self.controllers = controllers
         self.order_manager = order_manager
+        self.order_polling_interval = order_polling_interval
 
         self.strategies: Dict[UUID, Strategy] = {}
         self.strategies_by_streams: Dict[str, Set[Strategy]] = defaultdict(set)
+        self.mailboxes: Dict[UUID, TickerMailbox] = {}
+
+        self.user_data_sequencer = UserDataSequencer(
+            on_order=self.on_order_from_user_data_stream,
+            on_balances=self.on_balances_from_user_data_stream,
+            pairing_timeout=user_data_pairing_timeout,
+        )
 
     async def setup(self):
         strategies = await self.controllers.mongo.get_running_strategies()
@@ -49,7 +68,10 @@ class Runner:
         for stream_name in strategy.get_stream_names():
             self.strategies_by_streams[stream_name].add(strategy)
 
-    def purge_strategy(self, strategy):
+        mailbox = self.mailboxes[strategy.id] = TickerMailbox()
+        mailbox.task = asyncio.create_task(self.process_strategy_mailbox(strategy, mailbox))
+
+    async def purge_strategy(self, strategy):
         del self.strategies[strategy.id]
 
         for stream_name in strategy.get_stream_names():
@@ -58,6 +80,14 @@ class Runner:
             if not self.strategies_by_streams[stream_name]:
                 del self.strategies_by_streams[stream_name]
 
+        mailbox = self.mailboxes.pop(strategy.id, None)
+
+        if mailbox is not None:
+            mailbox.close()
+
+        # Releases its references, streams still used by other strategies stay subscribed
+        await self.controllers.binance.unsubscribe(strategy.get_stream_names())
+
     async def add_strategy(self, name, version, args) -> Tuple[bool, str]:
         # logger.info([name, version, args])
         try:
@@ -112,9 +142,7 @@ class Runner:
         try:
             await self.controllers.mongo.delete_strategy(strategy)
 
-            self.purge_strategy(strategy)
-
-            await self.controllers.binance.unsubscribe(strategy.get_stream_names())
+            await self.purge_strategy(strategy)
 
             return True, ""
         except Exception as exc:
@@ -124,34 +152,70 @@ class Runner:
             return False, str(exc)
 
     async def run_market_streams(self):
-        streams = list(self.strategies_by_streams.keys())
+        # One reference per strategy, streams are only unsubscribed once unused by all of them
+        streams = [
+            stream_name
+            for strategy in self.strategies.values()
+            for stream_name in strategy.get_stream_names()
+        ]
 
         async for stream_name, ticker_data in self.controllers.binance.listen_market_streams(
-            streams=streams
+            streams=streams, on_stale=self.on_market_stream_stale
         ):
             stream_strategies = self.strategies_by_streams.get(stream_name)
 
-            logger.debug(
-                f"ticker symbol={ticker_data.symbol} "
-                f"bid={ticker_data.bid_quantity:,.8f} @ {ticker_data.bid_price:,.8f} "
-                f"ask={ticker_data.ask_quantity:,.8f} @ {ticker_data.ask_price:,.8f}"
-            )
+            # Reading the prices would decode them on every tick, even unused
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(self._format_market_data(stream_name, ticker_data))
 
             if not stream_strategies:
                 continue
 
-            for strategy in list(stream_strategies):
-                try:
-                    async with strategy.lock:
-                        await strategy.process_ticker_data(ticker_data, self.order_manager)
-                except StrategyExit:
-                    await strategy.terminate(self.order_manager)
+            # Never wait on strategies here, a slow one only gets fewer and fresher tickers
+            for strategy in stream_strategies:
+                self.mailboxes[strategy.id].post(stream_name, ticker_data)
+
+    @staticmethod
+    def _format_market_data(stream_name: str, data) -> str:
+        # Depth streams yield order books and trade streams trades, the others tickers
+        if isinstance(data, OrderBook):
+            return f"order book symbol={data.symbol} bid={data.best_bid()} ask={data.best_ask()}"
+
+        elif isinstance(data, TradeStreamObject):
+            return f"trade stream={stream_name} {data.quantity:,.8f} @ {data.price:,.8f}"
+
+        return (
+            f"ticker symbol={data.symbol} "
+            f"bid={data.bid_quantity:,.8f} @ {data.bid_price:,.8f} "
+            f"ask={data.ask_quantity:,.8f} @ {data.ask_price:,.8f}"
+        )
+
+    def on_market_stream_stale(self, stream_name: str, stale: bool):
+        # Strategies can hold off trading on prices they don't get updates of anymore
+        for strategy in self.strategies_by_streams.get(stream_name, ()):
+            if stale:
+                strategy.stale_streams.add(stream_name)
+            else:
+                strategy.stale_streams.discard(stream_name)
+
+    async def process_strategy_mailbox(self, strategy: Strategy, mailbox: TickerMailbox):
+        while (ticker_data := await mailbox.get()) is not None:
+            try:
+                async with strategy.lock:
+                    await strategy.process_ticker_data(ticker_data, self.order_manager)
+            except StrategyExit:
+                await strategy.terminate(self.order_manager)
 
-                    self.purge_strategy(strategy)
-                except StrategyHalt:
-                    await strategy.stop(self.order_manager)
+                await self.purge_strategy(strategy)
+            except StrategyHalt:
+                await strategy.stop(self.order_manager)
 
-                    self.purge_strategy(strategy)
+                await self.purge_strategy(strategy)
+            except Exception:
+                logger.info(f"Error on ticker data for strategy {strategy.id}")
+                logger.info(traceback.format_exc())
+            finally:
+                mailbox.task_done()
 
     async def keep_alive_user_data_stream(self):
         while True:
@@ -159,9 +223,7 @@ class Runner:
 
             await self.controllers.binance.update_user_data_stream()
 
-    async def on_user_data_stream_restart(self):
-        logger.info("user data stream restart")
-
+    async def process_updated_orders(self):
         orders = await self.order_manager.get_updated_orders()
 
         logger.info(f"updated orders: got {len(orders)}")
@@ -171,8 +233,28 @@ class Runner:
 
             await self.process_order_to_strategy(order)
 
+    async def on_user_data_stream_restart(self):
+        logger.info("user data stream restart")
+
+        await self.process_updated_orders()
+
         await self.order_manager.setup()
 
+    async def poll_orders_while_disconnected(self):
+        # Order updates are missed while the user data stream is down, poll them meanwhile
+        while True:
+            await asyncio.sleep(self.order_polling_interval)
+
+            if self.controllers.binance.user_data_stream_connected:
+                continue
+
+            logger.info("user data stream disconnected: polling orders")
+
+            try:
+                await self.process_updated_orders()
+            except Exception as exc:
+                logger.warning(f"polling orders failed: {exc!r}")
+
     async def process_order_to_strategy(self, order: Order, update: bool = False):
         logger.info("process order to strategy")
 
@@ -198,60 +280,43 @@ class Runner:
             except StrategyExit:
                 await strategy.terminate(self.order_manager)
 
-                self.purge_strategy(strategy)
+                await self.purge_strategy(strategy)
             except StrategyHalt:
                 await strategy.stop(self.order_manager)
 
-                self.purge_strategy(strategy)
+                await self.purge_strategy(strategy)
 
     async def run_user_data_stream(self):
         async for msg in self.controllers.binance.listen_user_data_stream(
             on_restart=self.on_user_data_stream_restart
         ):
-            asyncio.create_task(self.on_user_data_message_received(msg))
+            # Reports are processed in order per order, once their balances are applied
+            self.user_data_sequencer.post(msg)
 
-    async def on_user_data_message_received(
-        self, msg: Union[OrderFromUserDataStream, OutboundAccountPosition, Any]
-    ):
-        if isinstance(msg, OrderFromUserDataStream):
-            # balances user data streams always comes after ~0.01s after the order update,
-            # so the account is synced
-            logger.debug("received order from user data stream: pre sleep")
-
-            await asyncio.sleep(0.1)
-
-            logger.info("received order from user data stream")
-            logger.debug(json.dumps(serialize_order_obj(msg.dict())))
-
-            received_order = msg
+    async def on_order_from_user_data_stream(self, received_order: OrderFromUserDataStream):
+        logger.info("received order from user data stream")
+        logger.debug(json.dumps(serialize_order_obj(received_order.dict())))
 
-            stored_order = await self.controllers.mongo.get_order(
-                received_order.id, received_order.symbol
-            )
-
-            if not stored_order:
-                logger.warning(f"no order found for order {received_order.id} on {received_order.symbol}")
+        stored_order = await self.controllers.mongo.get_order(received_order.id, received_order.symbol)
 
-                return
+        if not stored_order:
+            logger.warning(f"no order found for order {received_order.id} on {received_order.symbol}")
 
-            elif not stored_order.strategy_id:
-                logger.warning(
-                    f"no strategy_id set for order {received_order.id} on {received_order.symbol}"
-                )
+            return
 
-                return
+        elif not stored_order.strategy_id:
+            logger.warning(f"no strategy_id set for order {received_order.id} on {received_order.symbol}")
 
-            received_order.strategy_id = stored_order.strategy_id
+            return
 
-            await self.process_order_to_strategy(received_order, update=True)
+        received_order.strategy_id = stored_order.strategy_id
 
-        elif isinstance(msg, OutboundAccountPosition):
-            logger.info("received balances from user data stream")
+        await self.process_order_to_strategy(received_order, update=True)
 
-            self.order_manager.update_account_with_live_data(msg)
+    def on_balances_from_user_data_stream(self, account_position: OutboundAccountPosition):
+        logger.info("received balances from user data stream")
 
-        else:
-            logger.debug("received unhandled from user data stream")
+        self.order_manager.update_account_with_live_data(account_position)
 
     async def run(self, extra_coroutines: Optional[List[Coroutine]] = None):
         logger.info("bot setup")
@@ -263,6 +328,7 @@ class Runner:
             self.run_market_streams(),
             self.run_user_data_stream(),
             self.keep_alive_user_data_stream(),
+            self.poll_orders_while_disconnected(),
         ]
 
         if extra_coroutines:
@@ -284,7 +350,12 @@ async def main():
     order_manager = OrderManager(controllers=controllers)
     await order_manager.setup()
 
-    runner = Runner(controllers=controllers, order_manager=order_manager)
+    runner = Runner(
+        controllers=controllers,
+        order_manager=order_manager,
+        order_polling_interval=settings.bot.order_polling_interval,
+        user_data_pairing_timeout=settings.bot.user_data_pairing_timeout,
+    )
     http_server = BotHttpServer(settings.bot, runner, controllers)
     # HIGH   QLCBTC VIBBTC
     # MED    TCTBTC DGBBTC
@@ -294,6 +365,8 @@ async def main():
         await asyncio.gather(runner.run(), http_server.run())
     except KeyboardInterrupt:
         await controllers.binance.close_streams()
+    finally:
+        await close_adapters(adapters)
 
 
 if __name__ == "__main__":
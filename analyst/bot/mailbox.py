@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+class TickerMailboxMetrics(BaseModel):
+    received: int = 0
+    processed: int = 0
+    conflated: int = 0
+
+
+class TickerMailbox:
+    # Holds the latest ticker of each stream until the strategy is free to process it
+    def __init__(self):
+        self._latest: Dict[str, Any] = {}
+        self._not_empty = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+
+        self.metrics = TickerMailboxMetrics()
+
+    def __len__(self):
+        return len(self._latest)
+
+    def post(self, stream_name: str, ticker_data: Any) -> None:
+        if self.closed:
+            return
+
+        self.metrics.received += 1
+
+        # An unprocessed ticker is stale once a newer one comes in
+        if stream_name in self._latest:
+            self.metrics.conflated += 1
+
+        self._latest[stream_name] = ticker_data
+
+        self._idle.clear()
+        self._not_empty.set()
+
+    async def get(self) -> Optional[Any]:
+        while not self._latest:
+            if self.closed:
+                return None
+
+            self._not_empty.clear()
+
+            await self._not_empty.wait()
+
+        return self._latest.pop(next(iter(self._latest)))
+
+    def task_done(self) -> None:
+        self.metrics.processed += 1
+
+        if not self._latest:
+            self._idle.set()
+
+    async def join(self) -> None:
+        # Wait until every posted stream has been processed
+        await self._idle.wait()
+
+    def close(self) -> None:
+        self.closed = True
+
+        self._latest.clear()
+
+        self._not_empty.set()
+        self._idle.set()
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import operator
 from decimal import Decimal
 from enum import Enum, auto
 from logging import getLogger
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from uuid import UUID, uuid4
 
 from analyst.bot.strategies.base import Strategy
@@ -36,6 +37,8 @@ class PairSide(Enum):
 
 
 class OrderManager:
+    fetch_workers = 5
+
     def __init__(self, controllers: Controllers):
         self.controllers = controllers
         self.orders: Dict[UUID, Order] = {}
@@ -104,6 +107,35 @@ class OrderManager:
 
         return order
 
+    async def _replace_order(self, order: Order, **kwargs):
+        return await self.controllers.binance.replace_order(order, **kwargs)
+
+    async def replace_order(
+        self, order: Order, quantity: Decimal, price: Decimal, strategy: Optional[Strategy] = None
+    ) -> Tuple[Order, Optional[Order]]:
+        logger.info(f"replace order {order.internal_id} strategy_id={strategy.id if strategy else None}")
+
+        pair = self.get_pair(order.symbol)
+
+        quantity = self.truncate_base_quantity(pair, quantity, ceil=True)
+
+        cancelled_order, new_order = await self._replace_order(
+            order, type="LIMIT_MAKER", price=f"{price:f}", quantity=quantity
+        )
+
+        self.log_order(cancelled_order, "Cancelled")
+
+        cancelled_order = await self.update_order(cancelled_order, strategy)
+
+        self.orders.pop(cancelled_order.internal_id, None)
+
+        if new_order:
+            self.log_order(new_order, f"Replaced by {quantity} @ {price:f}")
+
+            new_order = await self.update_order(new_order, strategy)
+
+        return cancelled_order, new_order
+
     def update_account_with_live_data(self, new_account_position: OutboundAccountPosition):
         logger.info("update account with live data")
 
@@ -300,17 +332,70 @@ class OrderManager:
 
         return order
 
+    @staticmethod
+    def has_order_changed(order: Order, other: Order) -> bool:
+        return (
+            order.status != other.status
+            or order.executed_quantity != other.executed_quantity
+            or order.requested_quantity != other.requested_quantity
+        )
+
+    async def _list_open_orders(self, symbols: Set[str]) -> List[Order]:
+        return await self.controllers.binance.list_symbols_open_orders(symbols)
+
     async def get_updated_orders(self) -> List[Order]:
         logger.debug("get updated orders")
 
+        # Filled, cancelled or expired orders kept locally won't change anymore
+        orders = [order for order in self.orders.values() if order.is_open()]
+
+        if not orders:
+            return []
+
+        open_orders = {
+            (order.symbol, order.id): order
+            for order in await self._list_open_orders({order.symbol for order in orders})
+        }
+
+        fetched_orders = []
+        missing_orders = []
+
+        for order in orders:
+            if open_order := open_orders.get((order.symbol, order.id)):
+                fetched_orders.append((order, open_order))
+            else:
+                missing_orders.append(order)
+
+        # Orders not open anymore were filled or cancelled, they are the only ones to fetch
+        if missing_orders:
+            semaphore = asyncio.Semaphore(self.fetch_workers)
+
+            async def fetch(order):
+                async with semaphore:
+                    return order, await self.controllers.binance.get_updated_order(order)
+
+            fetched_orders += await asyncio.gather(*[fetch(order) for order in missing_orders])
+
         updated_orders = []
 
-        for order in list(self.orders.values()):
-            updated_order = await self.fetch_and_update_order(order)
+        for order, fetched_order in fetched_orders:
+            if not self.has_order_changed(order, fetched_order):
+                continue
+
+            fetched_order.internal_id = order.internal_id
+            fetched_order.strategy_id = order.strategy_id
+            fetched_order.fills = fetched_order.fills or order.fills
+
+            updated_orders.append(fetched_order)
 
-            if order != updated_order:
-                updated_orders.append(updated_order)
+        await self.controllers.mongo.update_orders(updated_orders)
 
-        logger.info(f"get updated orders: {len(updated_orders)} changes")
+        for order in updated_orders:
+            self.orders[order.internal_id] = order
+
+        logger.info(
+            f"get updated orders: {len(updated_orders)} changes, "
+            f"{len(missing_orders)} fetched out of {len(orders)}"
+        )
 
         return updated_orders
@@ -0,0 +1,110 @@
+import asyncio
+import traceback
+from collections import deque
+from datetime import datetime
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from analyst.crypto.models import OrderFromUserDataStream, OutboundAccountPosition
+
+logger = getLogger("bot.sequencer")
+
+OrderKey = Tuple[str, int]
+
+
+class UserDataSequencerMetrics(BaseModel):
+    orders: int = 0
+    balances: int = 0
+    paired: int = 0
+    timed_out: int = 0
+
+
+class UserDataSequencer:
+    # Execution reports of an order are dispatched one at a time in their received order, each one
+    # once the account position of the same update is applied, or after a timeout if none comes
+    def __init__(
+        self,
+        on_order: Callable[[OrderFromUserDataStream], Awaitable],
+        on_balances: Callable[[OutboundAccountPosition], Any],
+        pairing_timeout: float = 0.05,
+    ):
+        self.on_order = on_order
+        self.on_balances = on_balances
+        self.pairing_timeout = pairing_timeout
+
+        self.queues: Dict[OrderKey, Deque[OrderFromUserDataStream]] = {}
+        self.workers: Dict[OrderKey, asyncio.Task] = {}
+
+        self.balances_time: Optional[datetime] = None
+        self._balances_received = asyncio.Event()
+
+        self.metrics = UserDataSequencerMetrics()
+
+    def post(self, msg: Any) -> None:
+        if isinstance(msg, OrderFromUserDataStream):
+            self.metrics.orders += 1
+
+            key = (msg.symbol, msg.id)
+
+            if (queue := self.queues.get(key)) is not None:
+                queue.append(msg)
+            else:
+                self.queues[key] = deque([msg])
+                self.workers[key] = asyncio.create_task(self._process_order(key))
+
+        elif isinstance(msg, OutboundAccountPosition):
+            self.metrics.balances += 1
+
+            self.on_balances(msg)
+
+            if self.balances_time is None or msg.event_time > self.balances_time:
+                self.balances_time = msg.event_time
+
+            # Wakes up the reports waiting for their balances
+            event, self._balances_received = self._balances_received, asyncio.Event()
+            event.set()
+
+        else:
+            logger.debug("received unhandled from user data stream")
+
+    async def _wait_balances(self, event_time: datetime) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.pairing_timeout
+
+        while self.balances_time is None or self.balances_time < event_time:
+            if (timeout := deadline - loop.time()) <= 0:
+                self.metrics.timed_out += 1
+
+                return
+
+            try:
+                await asyncio.wait_for(self._balances_received.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        self.metrics.paired += 1
+
+    async def _process_order(self, key: OrderKey) -> None:
+        queue = self.queues[key]
+
+        try:
+            while queue:
+                order = queue.popleft()
+
+                await self._wait_balances(order.updated_at)
+
+                try:
+                    await self.on_order(order)
+                except Exception:
+                    logger.info(f"Error on order {order.id} from user data stream")
+                    logger.info(traceback.format_exc())
+        finally:
+            del self.queues[key]
+            del self.workers[key]
+
+    async def join(self) -> None:
+        # Wait until every received report has been dispatched
+        while self.workers:
+            await asyncio.gather(*self.workers.values(), return_exceptions=True)
@@ -4,7 +4,7 @@ import asyncio
 from datetime import datetime
 from enum import Enum, auto
 from logging import getLogger
-from typing import TYPE_CHECKING, Optional, Union
+from typing import TYPE_CHECKING, Optional, Set, Union
 from uuid import UUID, uuid4
 
 from analyst.bot.strategies.registry import RegisteredStrategy
@@ -38,7 +38,8 @@ class Strategy(metaclass=RegisteredStrategy):
 
     flags: StrategyFlags
     state: StrategyState
-    lock: asyncio.Lock = asyncio.Lock()
+    lock: asyncio.Lock
+    stale_streams: Set[str]
 
     Flags = StrategyFlags
 
@@ -59,6 +60,12 @@ class Strategy(metaclass=RegisteredStrategy):
         self.flags = flags
         self.state = state
 
+        # One per strategy, a class attribute would serialize all of them
+        self.lock = asyncio.Lock()
+
+        # Streams the bot stopped receiving messages from, cleared as soon as they come back
+        self.stale_streams = set()
+
     @staticmethod
     def _deserialize_timestamp(timestamp: Optional[Union[str, datetime]] = None) -> datetime:
         if not timestamp:
@@ -136,6 +143,10 @@ class Strategy(metaclass=RegisteredStrategy):
     async def send_order(self, order: Order, order_manager: OrderManager):
         raise NotImplementedError()
 
+    @property
+    def has_stale_data(self):
+        return bool(self.stale_streams)
+
     @property
     def is_running(self):
         return self.state != StrategyState.stopped
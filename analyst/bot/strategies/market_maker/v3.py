@@ -42,6 +42,7 @@ class MarketMakerV3(Strategy):
         max_buy_orders: int,
         max_increase_step: int,
         max_increase_retain_delta: timedelta,
+        book_ticker: bool,
         **kwargs,
     ):
         super(MarketMakerV3, self).__init__(**kwargs)
@@ -58,6 +59,7 @@ class MarketMakerV3(Strategy):
         self.max_buy_orders = max_buy_orders
         self.max_increase_step = max_increase_step
         self.max_increase_retain_delta = max_increase_retain_delta
+        self.book_ticker = book_ticker
 
         self._last_ticker_data: Optional[MarketStreamTicker] = None
         self._last_cleanup: Optional[datetime] = None
@@ -107,6 +109,7 @@ class MarketMakerV3(Strategy):
                 "max_buy_orders": self.max_buy_orders,
                 "max_increase_step": self.max_increase_step,
                 "max_increase_retain_delta": self.max_increase_retain_delta,
+                "book_ticker": self.book_ticker,
             },
             "created_at": self.created_at,
             "updated_at": self.updated_at,
@@ -126,6 +129,7 @@ class MarketMakerV3(Strategy):
         max_buy_orders: int = 2,
         max_increase_step: int = 0,
         max_increase_retain_delta: timedelta = timedelta(days=1),
+        book_ticker: bool = False,
         **kwargs,
     ):
         if not isinstance(quote_quantity, Decimal):
@@ -153,12 +157,19 @@ class MarketMakerV3(Strategy):
             max_buy_orders=max_buy_orders,
             max_increase_step=max_increase_step,
             max_increase_retain_delta=max_increase_retain_delta,
+            book_ticker=book_ticker,
             **kwargs,
         )
 
     @staticmethod
     def get_args_meta():
-        return {"symbol": str, "quote_quantity": float, "interval": float, "reverse": bool}
+        return {
+            "symbol": str,
+            "quote_quantity": float,
+            "interval": float,
+            "reverse": bool,
+            "book_ticker": bool,
+        }
 
     @staticmethod
     def get_update_args_meta():
@@ -174,6 +185,10 @@ class MarketMakerV3(Strategy):
         return f"{self.name}:{self.version} on {self.symbol}"
 
     def get_stream_names(self) -> List[str]:
+        # The book ticker is pushed on every top of book change, the ticker once per second
+        if self.book_ticker:
+            return [f"{self.symbol.lower()}@bookTicker"]
+
         return [f"{self.symbol.lower()}@ticker"]
 
     def gatekeeping(self, order_manager: OrderManager):
@@ -241,20 +256,33 @@ class MarketMakerV3(Strategy):
             )
 
             if order and order.requested_quantity != base_quantity:
-                cancelled_order = await order_manager.cancel_order(order, self)
+                cancelled_order, order = await order_manager.replace_order(
+                    order, quantity=base_quantity, price=price, strategy=self
+                )
 
                 if cancelled_order.executed_quantity:
                     converted_base_quantity += cancelled_order.executed_quantity
 
                 del buy_orders[cancelled_order.price]
-                self.internal_buy_order_ids.remove(order.internal_id)
+                self.internal_buy_order_ids.remove(cancelled_order.internal_id)
 
                 logger.info(
                     f"cancel order @ {price:f} "
-                    f"strategy_id={trunk_uuid(self.id)} => {order.internal_id}"
+                    f"strategy_id={trunk_uuid(self.id)} => {cancelled_order.internal_id}"
                 )
 
-                order = None
+                # Otherwise the new order failed and is created from scratch below
+                if order:
+                    buy_orders[order.price] = order
+
+                    self.internal_buy_order_ids.add(order.internal_id)
+
+                    await order_manager.controllers.mongo.store_strategy(self)
+
+                    logger.info(
+                        f"replaced order @ {price:f} "
+                        f"strategy_id={trunk_uuid(self.id)} => {order.internal_id}"
+                    )
 
             if not order:
                 if not order_manager.has_sufficient_quantity(pair, self.quote_quantity, PairSide.quote):
@@ -471,6 +499,12 @@ class MarketMakerV3(Strategy):
         self._last_price_timestamps[floored_bid_price] = now
 
     async def process_ticker_data(self, ticker_data: MarketStreamTicker, order_manager: OrderManager):
+        # The ladder is left as is until the quotes are updated again
+        if self.has_stale_data:
+            logger.debug(f"stale market data, skip ticker strategy_id={trunk_uuid(self.id)}")
+
+            return
+
         now = datetime.now()
 
         await self.update_buy_side(order_manager, ticker_data.bid_price)
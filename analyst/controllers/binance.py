@@ -2,21 +2,31 @@ import asyncio
 import json
 import logging
 import operator
+import random
 from datetime import datetime
 from decimal import Decimal
 from logging import getLogger
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from numpy import inf, nan
 from pandas import DataFrame, concat, to_datetime
 from websockets.exceptions import ConnectionClosed
 
 from analyst.adapters.factory import Adapters
-from analyst.crypto.exceptions import InvalidPairCoins, OrderWouldMatch
+from analyst.adapters.kline_store import KlineStoreAdapter
+from analyst.adapters.klines import columns_to_dataframe, concat_columns, klines_to_columns
+from analyst.adapters.redundant_market_stream import MarketFeedStats
+from analyst.crypto.exceptions import (
+    BinanceAPIError,
+    InvalidPairCoins,
+    OrderBookOutOfSync,
+    OrderWouldMatch,
+)
 from analyst.crypto.models import (
     Account,
     CoinAmount,
-    MarketStreamTicker,
+    LazyBookTicker,
+    LazyMarketStreamTicker,
     Order,
     OrderFromUserDataStream,
     OutboundAccountPosition,
@@ -24,18 +34,32 @@ from analyst.crypto.models import (
     Pairs,
     TradeStreamObject,
 )
+from analyst.crypto.order_book import OrderBook
 from analyst.repositories.utils import serialize_account_obj
 
 logger = getLogger("controllers.binance")
 
+# Returned when cancelling an order which is not open anymore, filled meanwhile most of the time
+UNKNOWN_ORDER_CODE = -2011
+
 
 class BinanceController:
     def __init__(self, adapters: Adapters):
         self.adapters = adapters
 
-        self.market_ws_session = None
         self.user_data_ws_session = None
 
+        self.user_data_stream_connected = False
+
+        # Kept up to date from the depth streams
+        self.order_books: Dict[str, OrderBook] = {}
+        self.order_book_syncs: Dict[str, asyncio.Task] = {}
+
+    @property
+    def orders_adapter(self):
+        # Orders go over the WebSocket API connection when enabled, through the REST API otherwise
+        return getattr(self.adapters, "binance_orders_websocket", None) or self.adapters.binance
+
     async def load_account(self) -> Account:
         account_info = await self.adapters.binance.get_account_info()
 
@@ -57,10 +81,22 @@ class BinanceController:
 
         return coins
 
+    async def get_exchange_info(self) -> dict:
+        if self.adapters.public_cache:
+            return await self.adapters.public_cache.get(
+                "exchange_info", self.adapters.binance.get_exchange_info
+            )
+
+        return await self.adapters.binance.get_exchange_info()
+
+    async def get_prices(self) -> List[dict]:
+        if self.adapters.public_cache:
+            return await self.adapters.public_cache.get("prices", self.adapters.binance.get_prices)
+
+        return await self.adapters.binance.get_prices()
+
     async def load_pairs(self) -> Pairs:
-        exchange_info, prices_list = await asyncio.gather(
-            self.adapters.binance.get_exchange_info(), self.adapters.binance.get_prices()
-        )
+        exchange_info, prices_list = await asyncio.gather(self.get_exchange_info(), self.get_prices())
 
         prices_dict = {prices_data.get("symbol"): prices_data for prices_data in prices_list}
 
@@ -150,13 +186,25 @@ class BinanceController:
         interval: str = "1d",
         start_datetime: datetime = datetime(2000, 1, 1),
         end_datetime: datetime = datetime.now(),
+        page_workers: Optional[int] = None,
     ) -> DataFrame:
-        df = await self.adapters.binance.get_historical_klines(
-            symbol=symbol,
-            interval=interval,
-            start_datetime=start_datetime,
-            end_datetime=end_datetime,
-        )
+        if self.adapters.kline_store and interval != "1M":
+            df = await self.get_stored_klines(
+                self.adapters.kline_store,
+                symbol=symbol,
+                interval=interval,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+                page_workers=page_workers,
+            )
+        else:
+            df = await self.adapters.binance.get_historical_klines(
+                symbol=symbol,
+                interval=interval,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+                page_workers=page_workers,
+            )
 
         # Fix, trades are integers
         if not df.empty:
@@ -165,6 +213,41 @@ class BinanceController:
 
         return df
 
+    async def get_stored_klines(
+        self,
+        kline_store: KlineStoreAdapter,
+        symbol: str,
+        interval: str,
+        start_datetime: datetime,
+        end_datetime: datetime,
+        page_workers: Optional[int] = None,
+    ) -> DataFrame:
+        binance = self.adapters.binance
+
+        start_time, end_time = binance.get_klines_time_range(interval, start_datetime, end_datetime)
+
+        # Only closed klines are stored, the current one is fetched again on the next call
+        now_ms = int(datetime.now().timestamp() * 1000)
+        closed_end_time = min(end_time, now_ms - binance.get_interval_ms(interval))
+
+        fetched_columns = []
+
+        for gap_start, gap_end in kline_store.get_missing_ranges(symbol, interval, start_time, end_time):
+            columns = klines_to_columns(
+                await binance.get_klines_data(
+                    symbol, interval, gap_start, gap_end, page_workers=page_workers
+                )
+            )
+
+            kline_store.append(symbol, interval, columns, gap_start, min(gap_end, closed_end_time))
+            fetched_columns.append(columns)
+
+        columns = concat_columns(
+            [kline_store.read(symbol, interval, start_time, end_time), *fetched_columns]
+        )
+
+        return columns_to_dataframe(columns, interval)
+
     async def load_dataframes(self, pairs: Pairs, workers=5, **kwargs) -> DataFrame:
         logger.debug(f"load dataframes: fetching {len(pairs)} pairs...")
         start_time = datetime.now()
@@ -191,21 +274,60 @@ class BinanceController:
         if "real" in params:
             del params["real"]
 
-        data = await self.adapters.binance.create_order(symbol, side, type, real=False, **params)
-
-        if "code" in data:
-            raise Exception(f"{data['msg']}")
+        await self.orders_adapter.create_order(symbol, side, type, real=False, **params)
 
     async def create_order(self, symbol: str, side: str, type: str, **params) -> Order:
-        data = await self.adapters.binance.create_order(symbol, side, type, real=True, **params)
+        try:
+            data = await self.orders_adapter.create_order(symbol, side, type, real=True, **params)
+        except BinanceAPIError as exc:
+            if exc.msg == "Order would immediately match and take.":
+                raise OrderWouldMatch() from exc
+
+            raise
 
-        if "code" in data:
-            if "msg" in data and data["msg"] == "Order would immediately match and take.":
-                raise OrderWouldMatch()
-            raise Exception(f"{data['msg']}")
+        if order := Order.from_response(data):
+            return order
 
         return await self.get_order(symbol, data["orderId"])
 
+    async def replace_order(self, order: Order, type: str, **params) -> Tuple[Order, Optional[Order]]:
+        try:
+            data = await self.orders_adapter.cancel_replace_order(
+                order.symbol, order.id, order.side, type, **params
+            )
+        except BinanceAPIError as exc:
+            if not isinstance(exc.data, dict):
+                raise
+
+            cancel_response = exc.data.get("cancelResponse") or {}
+
+            # The cancel may have succeeded even if the new order failed, and a cancel failing because
+            # the order was filled meanwhile is a normal race, its final state is fetched below
+            if exc.data.get("cancelResult") == "SUCCESS":
+                logger.info(
+                    f"replace order {order.id}: new order failed ({exc.data.get('newOrderResponse')})"
+                )
+            elif cancel_response.get("code") == UNKNOWN_ORDER_CODE:
+                logger.info(f"replace order {order.id}: not open anymore, getting its final state")
+            else:
+                raise
+
+            data = exc.data
+
+        cancelled_order = Order.from_response(
+            data["cancelResponse"], created_at=order.created_at
+        ) or await self.get_order(order.symbol, order.id)
+
+        if data.get("newOrderResult") != "SUCCESS":
+            return cancelled_order, None
+
+        new_order_data = data["newOrderResponse"]
+        new_order = Order.from_response(new_order_data) or await self.get_order(
+            order.symbol, new_order_data["orderId"]
+        )
+
+        return cancelled_order, new_order
+
     async def get_order(self, symbol: str, order_id: int) -> Order:
         order_data = await self.adapters.binance.get_order(symbol, order_id)
 
@@ -216,11 +338,38 @@ class BinanceController:
 
         return [Order(**order_data) for order_data in orders_data]
 
+    async def list_open_orders(self, symbol: Optional[str] = None) -> List[Order]:
+        orders_data = await self.adapters.binance.list_open_orders(symbol)
+
+        return [Order(**order_data) for order_data in orders_data]
+
+    async def list_symbols_open_orders(self, symbols: Set[str]) -> List[Order]:
+        binance = self.adapters.binance
+
+        # A single account wide call is cheaper once enough symbols are involved
+        if len(symbols) * binance.api_open_orders_weight >= binance.api_all_open_orders_weight:
+            return [order for order in await self.list_open_orders() if order.symbol in symbols]
+
+        orders_by_symbol = await asyncio.gather(*[self.list_open_orders(symbol) for symbol in symbols])
+
+        return [order for orders in orders_by_symbol for order in orders]
+
     async def get_updated_order(self, order: Order) -> Order:
         return await self.get_order(order.symbol, order.id)
 
     async def cancel_order(self, order: Order) -> Order:
-        await self.adapters.binance.cancel_order(order.symbol, order.id)
+        try:
+            data = await self.orders_adapter.cancel_order(order.symbol, order.id)
+        except BinanceAPIError as exc:
+            if exc.code != UNKNOWN_ORDER_CODE:
+                raise
+
+            logger.info(f"cancel order {order.id}: not open anymore, getting its final state")
+
+            return await self.get_order(order.symbol, order.id)
+
+        if cancelled_order := Order.from_response(data, created_at=order.created_at):
+            return cancelled_order
 
         return await self.get_order(order.symbol, order.id)
 
@@ -314,58 +463,127 @@ class BinanceController:
         return converted_coins
 
     async def listen_market_streams(
-        self, streams: Optional[List[str]] = None, on_restart: Optional[Callable] = None
+        self,
+        streams: Optional[List[str]] = None,
+        on_restart: Optional[Callable] = None,
+        on_stale: Optional[Callable] = None,
     ):
         logger.info("listen market stream")
 
-        trigger_on_restart = False
+        if streams:
+            await self.subscribe(streams)
 
-        while 1:
-            if trigger_on_restart and on_restart:
-                try:
-                    await self.open_market_stream()
-                except ConnectionRefusedError:
-                    logger.info("unable to connect to market stream")
+        # Shards reconnect on their own, on_restart is called each time one is back and
+        # on_stale(stream, stale) when a stream stops or starts again receiving messages
+        async for data in self.adapters.binance_market_websocket.listen(
+            on_reopen=on_restart, on_stale=on_stale
+        ):
+            if "stream" not in data:
+                continue
 
-                    await asyncio.sleep(5)
+            elif data["stream"].endswith("@trade"):
+                yield data["stream"], TradeStreamObject(**data["data"])
 
-                    continue
+            elif data["stream"].endswith("@ticker"):
+                # Fields are decoded on access, most strategies only read a couple of them
+                yield data["stream"], LazyMarketStreamTicker(data["data"])
 
-                await on_restart()
+            elif data["stream"].endswith("@bookTicker"):
+                yield data["stream"], LazyBookTicker(data["data"])
 
-                trigger_on_restart = False
+            elif data["stream"] == "!bookTicker":
+                # Routed as the symbol stream, strategies don't have to know which one is subscribed
+                book_ticker = LazyBookTicker(data["data"])
 
-            while 1:
-                try:
-                    data = await self.adapters.binance_market_websocket.receive(self.market_ws_session)
+                yield f"{book_ticker.symbol.lower()}@bookTicker", book_ticker
 
-                    if not data or "stream" not in data:
-                        continue
+            elif "@depth" in data["stream"]:
+                # Only yielded once synced and changed by the event
+                if order_book := self._on_depth_event(data["data"]):
+                    yield data["stream"], order_book
 
-                    elif data["stream"].endswith("@trade"):
-                        yield data["stream"], TradeStreamObject(**data["data"])
+    def _on_depth_event(self, event: Dict) -> Optional[OrderBook]:
+        symbol = event["s"]
 
-                    elif data["stream"].endswith("@ticker"):
-                        yield data["stream"], MarketStreamTicker(**data["data"])
+        if not (order_book := self.order_books.get(symbol)):
+            order_book = self.order_books[symbol] = OrderBook(symbol)
 
-                except ConnectionClosed:
-                    logger.info("connection to market stream closed")
+        try:
+            changed = order_book.apply_event(event)
+        except OrderBookOutOfSync as exc:
+            logger.warning(f"order book {exc}, syncing again")
 
-                    trigger_on_restart = True
+            changed = order_book.apply_event(event)
 
-                    await asyncio.sleep(5)
+        if not order_book.synced and symbol not in self.order_book_syncs:
+            self.order_book_syncs[symbol] = asyncio.create_task(self._sync_order_book(order_book))
+
+        return order_book if changed else None
 
-                    break
+    def _get_order_book_sync_backoff(self, attempt: int) -> float:
+        settings = self.adapters.binance.settings
+
+        backoff = min(
+            settings.order_book_sync_backoff_max, settings.order_book_sync_backoff * 2**attempt
+        )
+
+        return backoff * random.uniform(0.5, 1.0)
+
+    async def _sync_order_book(self, order_book: OrderBook):
+        settings = self.adapters.binance.settings
+
+        # Events are buffered meanwhile and replayed over the snapshot
+        try:
+            for attempt in range(settings.order_book_sync_attempts):
+                if attempt:
+                    await asyncio.sleep(self._get_order_book_sync_backoff(attempt - 1))
+
+                snapshot = await self.adapters.binance.get_order_book(
+                    order_book.symbol, limit=settings.order_book_snapshot_limit
+                )
+
+                try:
+                    order_book.apply_snapshot(snapshot)
+                except OrderBookOutOfSync as exc:
+                    logger.warning(f"order book {exc}, fetching a new snapshot")
+
+                if order_book.synced:
+                    return
+
+            # Synced again on the next event
+            logger.warning(
+                f"order book {order_book.symbol}: not synced after {settings.order_book_sync_attempts} "
+                "snapshots"
+            )
+        except Exception as exc:
+            logger.warning(f"order book {order_book.symbol}: sync failed ({exc!r})")
+        finally:
+            # Cancelled syncs may have been replaced already
+            if self.order_book_syncs.get(order_book.symbol) is asyncio.current_task():
+                del self.order_book_syncs[order_book.symbol]
 
     async def subscribe(self, streams: List[str]):
         logger.info(f"subscribing to {streams}")
 
-        await self.adapters.binance_market_websocket.subscribe(self.market_ws_session, streams)
+        await self.adapters.binance_market_websocket.subscribe(streams)
 
     async def unsubscribe(self, streams: List[str]):
         logger.info(f"unsubscribing to {streams}")
 
-        await self.adapters.binance_market_websocket.unsubscribe(self.market_ws_session, streams)
+        await self.adapters.binance_market_websocket.unsubscribe(streams)
+
+        subscriptions = self.adapters.binance_market_websocket.subscriptions
+
+        for symbol in list(self.order_books):
+            if not any(stream.startswith(f"{symbol.lower()}@depth") for stream in subscriptions):
+                del self.order_books[symbol]
+
+                if sync := self.order_book_syncs.pop(symbol, None):
+                    sync.cancel()
+
+    def get_market_feeds_stats(self) -> List[MarketFeedStats]:
+        # Win rate and lag of each redundant feed, none with a single one
+        return getattr(self.adapters.binance_market_websocket, "stats", [])
 
     async def update_user_data_stream(self, listen_key: Optional[str] = None):
         listen_key = listen_key or self.adapters.binance_user_data_websocket.listen_key
@@ -395,13 +613,11 @@ class BinanceController:
 
                 trigger_on_restart = False
 
-            while 1:
-                try:
-                    data = await self.adapters.binance_user_data_websocket.receive(
-                        self.user_data_ws_session
-                    )
-
-                    if not data or "stream" not in data:
+            try:
+                async for data in self.adapters.binance_user_data_websocket.iterate(
+                    self.user_data_ws_session
+                ):
+                    if "stream" not in data:
                         continue
 
                     elif data["data"]["e"] == "executionReport":
@@ -414,27 +630,23 @@ class BinanceController:
                         logger.debug("received unhandled message from user data stream")
                         logger.debug(json.dumps(data))
 
-                except ConnectionClosed:
-                    logger.info("connection to user data stream closed")
+            except ConnectionClosed:
+                pass
 
-                    trigger_on_restart = True
+            logger.info("connection to user data stream closed")
 
-                    await asyncio.sleep(5)
+            self.user_data_stream_connected = False
+            trigger_on_restart = True
 
-                    break
+            await asyncio.sleep(5)
 
     async def open_market_stream(self, streams: Optional[List[str]] = None):
-        if self.market_ws_session:
-            logger.info("reopen market stream")
+        logger.info("open market stream")
 
-            self.market_ws_session = await self.adapters.binance_market_websocket.reopen()
-        else:
-            logger.info("open market stream")
+        await self.adapters.binance_market_websocket.open()
 
-            self.market_ws_session = await self.adapters.binance_market_websocket.open()
-
-            if streams:
-                await self.subscribe(streams)
+        if streams:
+            await self.subscribe(streams)
 
     async def open_user_data_stream(self):
         logger.info("open user data stream")
@@ -443,6 +655,8 @@ class BinanceController:
 
         self.user_data_ws_session = await self.adapters.binance_user_data_websocket.open(listen_key)
 
+        self.user_data_stream_connected = True
+
     async def open_streams(self):
         logger.info("open streams")
 
@@ -451,8 +665,7 @@ class BinanceController:
     async def close_market_stream(self):
         logger.info("close market stream")
 
-        if self.market_ws_session:
-            await self.adapters.binance_market_websocket.close(self.market_ws_session)
+        await self.adapters.binance_market_websocket.close()
 
     async def close_user_data_stream(self):
         logger.info("close user data stream")
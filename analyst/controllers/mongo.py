@@ -125,6 +125,13 @@ class MongoController:
 
         return order
 
+    async def update_orders(self, orders: List[Order]) -> List[Order]:
+        await self.repositories.orders.bulk_update(orders)
+
+        logger.info(f"update orders: {len(orders)}")
+
+        return orders
+
     async def get_orders(self, **kwargs) -> List[Order]:
         orders = await self.repositories.orders.list(**kwargs)
 
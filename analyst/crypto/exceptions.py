@@ -2,6 +2,29 @@ class BinanceError(Exception):
     pass
 
 
+class BinanceAPIError(BinanceError):
+    def __init__(self, status: int, code: int = 0, msg: str = "", retry_after: float = 0.0, data=None):
+        super().__init__(f"{status} {code}: {msg}")
+
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.retry_after = retry_after
+        self.data = data
+
+
+class BinanceRateLimited(BinanceAPIError):
+    pass
+
+
+class BinanceIPBanned(BinanceRateLimited):
+    pass
+
+
+class BinanceServerError(BinanceAPIError):
+    pass
+
+
 class WrongDatetimeRange(Exception):
     pass
 
@@ -20,3 +43,7 @@ class OrderWouldMatch(Exception):
 
 class PriceMustBeSetOnMarketMakingOrder(Exception):
     pass
+
+
+class OrderBookOutOfSync(Exception):
+    pass
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field, root_validator
@@ -59,6 +59,30 @@ class Pair(BaseModel):
 Account = Dict[str, CoinAmount]
 Pairs = Dict[str, Pair]
 
+ORDER_RESPONSE_FIELDS = (
+    "orderId",
+    "symbol",
+    "status",
+    "type",
+    "side",
+    "price",
+    "origQty",
+    "executedQty",
+    "timeInForce",
+    "transactTime",
+)
+
+
+class OrderFill(BaseModel):
+    trade_id: int = Field(alias="tradeId")
+    price: Decimal
+    quantity: Decimal = Field(alias="qty")
+    commission: Decimal
+    commission_asset: str = Field(alias="commissionAsset")
+
+    class Config:
+        allow_population_by_field_name = True
+
 
 class Order(BaseModel):
     id: int = Field(alias="orderId")
@@ -78,12 +102,29 @@ class Order(BaseModel):
     created_at: datetime = Field(alias="time")
     updated_at: datetime = Field(alias="updateTime")
 
+    fills: List[OrderFill] = Field(default_factory=list)
+
     strategy_id: Optional[UUID] = None
     internal_id: UUID = Field(alias="internal_id", default_factory=uuid4)
 
     class Config:
         allow_population_by_field_name = True
 
+    @classmethod
+    def from_response(cls, data: dict, created_at: Optional[datetime] = None) -> Optional[Order]:
+        # Order creation (FULL) and cancellation responses miss some of the order fields
+        if any(field not in data for field in ORDER_RESPONSE_FIELDS):
+            return None
+
+        return cls(
+            **{
+                "stopPrice": 0.0,
+                **data,
+                "time": created_at or data["transactTime"],
+                "updateTime": data["transactTime"],
+            }
+        )
+
     @classmethod
     def create(cls, **kwargs):
         kwargs.setdefault("stop_price", 0.0)
@@ -154,12 +195,14 @@ class OutboundAccountBalance(BaseModel):
 
 
 class OutboundAccountPosition(BaseModel):
+    event_time: datetime = Field(alias="E", default_factory=datetime.now)
     updated_at: datetime = Field(alias="u")
 
     balances: List[OutboundAccountBalance] = Field(alias="B")
 
     @root_validator
     def remove_timestamp_timezone(cls, values):
+        values["event_time"] = values["event_time"].replace(tzinfo=None)
         values["updated_at"] = values["updated_at"].replace(tzinfo=None)
 
         return values
@@ -213,6 +256,124 @@ class MarketStreamTicker(BaseModel):
         return values
 
 
+def _parse_event_time(value) -> datetime:
+    # Same value as the pydantic parsing of MarketStreamTicker, in naive UTC
+    return datetime.fromtimestamp(int(value) / 1000, timezone.utc).replace(tzinfo=None)
+
+
+class LazyField:
+    # Decodes a raw payload key on first access and memoizes it in the instance slot
+    __slots__ = ("key", "convert", "slot")
+
+    def __init__(self, key: str, convert: Callable):
+        self.key = key
+        self.convert = convert
+
+    def __set_name__(self, owner, name):
+        self.slot = owner.__dict__[f"_{name}"]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        try:
+            return self.slot.__get__(instance)
+        except AttributeError:
+            value = self.convert(instance.raw[self.key])
+
+            self.slot.__set__(instance, value)
+
+            return value
+
+
+class LazyTicker:
+    # Top of book decoded lazily from the raw payload, built for every stream message
+    __slots__ = ("raw", "symbol")
+
+    fields: Tuple[str, ...] = ()
+
+    ask_price: Decimal
+    bid_price: Decimal
+
+    def __init__(self, raw: Dict):
+        self.raw = raw
+        self.symbol: str = raw["s"]
+
+    def has_ask_bid_prices_changed(self, other: Union[LazyTicker, MarketStreamTicker]) -> bool:
+        # Same raw strings mean same prices, no need to decode them
+        if isinstance(other, LazyTicker) and (
+            self.raw["a"] == other.raw["a"] and self.raw["b"] == other.raw["b"]
+        ):
+            return False
+
+        return self.ask_price != other.ask_price or self.bid_price != other.bid_price
+
+    def dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __eq__(self, other):
+        if isinstance(other, type(self)):
+            return self.dict() == other.dict()
+
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw})"
+
+
+class LazyMarketStreamTicker(LazyTicker):
+    # Lightweight MarketStreamTicker, from the <symbol>@ticker stream
+    __slots__ = (
+        "_timestamp",
+        "_last_price",
+        "_ask_price",
+        "_ask_quantity",
+        "_bid_price",
+        "_bid_quantity",
+        "_trades",
+    )
+
+    fields = tuple(MarketStreamTicker.__fields__)
+
+    last_price = LazyField("c", Decimal)
+    ask_price = LazyField("a", Decimal)
+    ask_quantity = LazyField("A", Decimal)
+    bid_price = LazyField("b", Decimal)
+    bid_quantity = LazyField("B", Decimal)
+    trades = LazyField("n", int)
+
+    @property
+    def timestamp(self) -> datetime:
+        try:
+            return self._timestamp
+        except AttributeError:
+            self._timestamp = _parse_event_time(self.raw["E"]) if "E" in self.raw else datetime.now()
+
+            return self._timestamp
+
+    def to_model(self) -> MarketStreamTicker:
+        return MarketStreamTicker(**self.dict())
+
+    def __eq__(self, other):
+        if isinstance(other, MarketStreamTicker):
+            return self.dict() == other.dict()
+
+        return super().__eq__(other)
+
+
+class LazyBookTicker(LazyTicker):
+    # Best bid and ask from the <symbol>@bookTicker stream, pushed on every change
+    __slots__ = ("_update_id", "_ask_price", "_ask_quantity", "_bid_price", "_bid_quantity")
+
+    fields = ("update_id", "symbol", "ask_price", "ask_quantity", "bid_price", "bid_quantity")
+
+    update_id = LazyField("u", int)
+    ask_price = LazyField("a", Decimal)
+    ask_quantity = LazyField("A", Decimal)
+    bid_price = LazyField("b", Decimal)
+    bid_quantity = LazyField("B", Decimal)
+
+
 class TradeStreamObject(BaseModel):
     id: int = Field(alias="t")
     price: Decimal = Field(alias="p")
@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from analyst.crypto.exceptions import OrderBookOutOfSync
+
+Level = Tuple[float, float]
+
+
+class OrderBookSide:
+    # Price levels in sorted arrays, the best level is kept at the end where updates are cheap
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+
+        # Bid keys are prices, ask keys negated prices, both ascending towards the best level
+        self.keys: List[float] = []
+        self.quantities: List[float] = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _key(self, price: float) -> float:
+        return price if self.is_bid else -price
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.quantities.clear()
+
+    def set(self, price: float, quantity: float) -> None:
+        key = self._key(price)
+        index = bisect_left(self.keys, key)
+
+        if index < len(self.keys) and self.keys[index] == key:
+            if quantity:
+                self.quantities[index] = quantity
+            else:
+                del self.keys[index]
+                del self.quantities[index]
+
+        elif quantity:
+            self.keys.insert(index, key)
+            self.quantities.insert(index, quantity)
+
+    def update(self, levels: Iterable[List[str]]) -> None:
+        for price, quantity in levels:
+            self.set(float(price), float(quantity))
+
+    def best(self) -> Optional[Level]:
+        if not self.keys:
+            return None
+
+        return self._key(self.keys[-1]), self.quantities[-1]
+
+    def get_quantity(self, price: float) -> float:
+        key = self._key(price)
+        index = bisect_left(self.keys, key)
+
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.quantities[index]
+
+        return 0.0
+
+    def levels(self, count: Optional[int] = None) -> List[Level]:
+        start = 0 if count is None else max(len(self.keys) - count, 0)
+
+        return [
+            (self._key(key), quantity)
+            for key, quantity in zip(reversed(self.keys[start:]), reversed(self.quantities[start:]))
+        ]
+
+    def cumulative_quantity(self, price: float) -> float:
+        # Quantity available from the best level down to the given price included
+        index = bisect_left(self.keys, self._key(price))
+
+        return sum(self.quantities[index:])
+
+    def to_numpy(self, count: Optional[int] = None) -> np.ndarray:
+        # Levels from the best one, as [price, quantity] rows
+        start = 0 if count is None else max(len(self.keys) - count, 0)
+        size = len(self.keys) - start
+
+        levels = np.empty((size, 2))
+        levels[:, 0] = np.fromiter(self.keys[start:], float, size)[::-1]
+        levels[:, 1] = np.fromiter(self.quantities[start:], float, size)[::-1]
+
+        if not self.is_bid:
+            levels[:, 0] *= -1
+
+        return levels
+
+    def price_for_quantity(self, quantity: float) -> Optional[float]:
+        # Worst price reached when taking the given quantity from the best level
+        cumulative = np.cumsum(self.quantities[::-1])
+        index = int(np.searchsorted(cumulative, quantity))
+
+        if index == len(cumulative):
+            return None
+
+        return self._key(self.keys[-1 - index])
+
+
+class OrderBook:
+    # Snapshot plus depth diff events, following the Binance update ids sequencing
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+        self.bids = OrderBookSide(is_bid=True)
+        self.asks = OrderBookSide(is_bid=False)
+
+        self.last_update_id = 0
+        self.synced = False
+        self.buffer: List[Dict] = []
+
+    def reset(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+
+        self.last_update_id = 0
+        self.synced = False
+        self.buffer = []
+
+    def _apply(self, event: Dict) -> None:
+        self.bids.update(event["b"])
+        self.asks.update(event["a"])
+
+        self.last_update_id = event["u"]
+
+    def apply_snapshot(self, snapshot: Dict) -> None:
+        self.bids.clear()
+        self.asks.clear()
+
+        self.bids.update(snapshot["bids"])
+        self.asks.update(snapshot["asks"])
+
+        self.last_update_id = snapshot["lastUpdateId"]
+
+        buffer, self.buffer = self.buffer, []
+        self.synced = True
+
+        for event in buffer:
+            self.apply_event(event)
+
+    def apply_event(self, event: Dict) -> bool:
+        # Returns whether the book changed, events are buffered until a snapshot is applied
+        if not self.synced:
+            self.buffer.append(event)
+
+            return False
+
+        # Already part of the snapshot
+        if event["u"] <= self.last_update_id:
+            return False
+
+        if event["U"] > self.last_update_id + 1:
+            missing = f"{self.last_update_id + 1}-{event['U'] - 1}"
+
+            self.reset()
+
+            raise OrderBookOutOfSync(f"{self.symbol}: missed updates {missing}")
+
+        self._apply(event)
+
+        return True
+
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def spread(self) -> Optional[float]:
+        if not self.bids or not self.asks:
+            return None
+
+        return self.asks.best()[0] - self.bids.best()[0]  # type: ignore
+
+    def mid_price(self) -> Optional[float]:
+        if not self.bids or not self.asks:
+            return None
+
+        return (self.asks.best()[0] + self.bids.best()[0]) / 2  # type: ignore
@@ -2,7 +2,7 @@ from logging import getLogger
 from typing import List
 from uuid import UUID
 
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, UpdateOne
 
 from analyst.adapters.factory import Adapters
 from analyst.crypto.models import Order
@@ -61,6 +61,20 @@ class OrderRepository:
 
         return order
 
+    async def bulk_update(self, orders: List[Order]) -> None:
+        if not orders:
+            return
+
+        result = await self.mongo.bulk_write(
+            [
+                UpdateOne({"internal_id": order.internal_id}, {"$set": serialize_obj(order.dict())})
+                for order in orders
+            ],
+            ordered=False,
+        )
+
+        logger.info(f"bulk update: {result.modified_count}/{len(orders)} modified")
+
     async def get(self, order_id: int, symbol: str) -> Order:
         if order_data := await self.mongo.find_one({"id": order_id, "symbol": symbol}):
             return Order(**order_data)
@@ -26,6 +26,8 @@ def serialize_order_obj(obj):
         return obj.isoformat()
     elif isinstance(obj, dict):
         return {k: serialize_order_obj(v) for k, v in list(obj.items())}
+    elif isinstance(obj, list):
+        return [serialize_order_obj(item) for item in obj]
     return obj
 
 
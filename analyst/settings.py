@@ -1,18 +1,85 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 from hartware_lib.pydantic.field_types import BooleanFromString
 from pydantic import BaseSettings, Field
 
 DEFAULT_CACHE_DIR = Path("cache_dir", "files")
+DEFAULT_KLINE_STORE_DIR = Path("cache_dir", "klines")
+DEFAULT_STREAM_RECORDS_DIR = Path("cache_dir", "streams")
+DEFAULT_SIMULATOR_FIXTURE_DIR = Path("tests", "fixture_data")
 
 
 class BinanceApiSettings(BaseSettings):
     api_url: str = "https://api.binance.com"
     stream_url: str = "wss://stream.binance.com:443/stream"
+    ws_api_url: str = "wss://ws-api.binance.com:443/ws-api/v3"
     api_key: str
     secret_key: str
 
+    pool_size: int = 100
+    pool_size_per_host: int = 0
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 60.0
+    request_timeout: float = 30.0
+
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+    retry_backoff_max: float = 10.0
+    max_retry_after: float = 60.0
+
+    klines_page_workers: int = 4
+
+    # Orders are placed and cancelled through the REST API or over a WebSocket API connection
+    order_transport: Literal["rest", "websocket"] = "rest"
+
+    # Concurrent identical GET requests share one call: "public" endpoints only, all "reads"
+    # including signed ones, or "none". Shared signed reads may answer with an order or account
+    # state fetched before a recent order event, they are opt-in
+    single_flight_scope: Literal["none", "public", "reads"] = "public"
+
+    exchange_info_cache_ttl: float = 3600.0
+    prices_cache_ttl: float = 2.0
+
+    # Market streams are sharded over several connections, Binance caps one at 1024 streams
+    market_streams_per_connection: int = 1000
+    market_min_connections: int = 1
+    market_max_connections: int = 8
+    # Market messages waiting to be processed: "block" the readers when full,
+    # "drop_oldest" or "conflate" to the latest message of each stream
+    market_queue_size: int = 10_000
+    market_queue_policy: Literal["block", "drop_oldest", "conflate"] = "block"
+    # Binance drops connections sending more than 5 messages per second
+    market_control_messages_per_second: int = 5
+    market_request_timeout: float = 10.0
+    # Redundant feeds: the market streams are received from each of these urls at once, ideally
+    # different hosts such as wss://data-stream.binance.vision/stream, and each event is forwarded
+    # from the first one delivering it. Empty for a single feed from stream_url
+    market_stream_urls: List[str] = []
+    # Shards reconnect right away, then back off exponentially with jitter
+    market_reconnect_backoff: float = 0.05
+    market_reconnect_backoff_max: float = 5.0
+    # Connections not answering pings for longer are dropped and reopened, streams silent for
+    # longer than the threshold of their type are reported stale to their strategies
+    market_health_check_interval: float = 1.0
+    market_connection_stale_after: float = 30.0
+    market_stale_after: Dict[str, float] = {
+        "ticker": 10.0,
+        "bookTicker": 30.0,
+        "depth": 10.0,
+        "trade": 60.0,
+    }
+
+    # Levels of the snapshot order books are synced from, the depth streams only update them
+    order_book_snapshot_limit: int = 1000
+    # Snapshots behind the buffered events are fetched again, backing off exponentially with jitter
+    order_book_sync_attempts: int = 5
+    order_book_sync_backoff: float = 0.5
+    order_book_sync_backoff_max: float = 10.0
+
+    ws_ping_interval: float = 20.0
+    ws_ping_timeout: float = 20.0
+
     class Config:
         case_sensitive = False
         env_prefix = "ANALYST_BINANCE_"
@@ -74,21 +141,63 @@ class BotSettings(BaseSettings):
 
     jwt_secret: str
 
+    order_polling_interval: float = 10.0
+    # Longest wait of an execution report for the balances update that comes with it
+    user_data_pairing_timeout: float = 0.05
+
     class Config:
         case_sensitive = False
         env_prefix = "ANALYST_BOT_"
 
 
+class SimulatorSettings(BaseSettings):
+    host: str = "localhost"
+    port: int = 8090
+
+    fixture_dir: Path = DEFAULT_SIMULATOR_FIXTURE_DIR
+    # JSON list of steps, each step mapping symbols to [bid, ask], replayed in loop
+    market_script: Optional[Path] = None
+    seed: Optional[int] = None
+
+    ticker_interval: float = 1.0
+    price_volatility: float = 0.0005
+    commission: float = 0.001
+    check_balances: BooleanFromString = Field(default=True)  # type: ignore
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    weight_limit: int = 1200
+    # Signed requests older than this many milliseconds are rejected, unless they set their own
+    recv_window: int = 5000
+    # Market stream connections sending more messages per second, pings included, are closed
+    stream_messages_limit: int = 5
+    # Unset to leave the stream connections pings unanswered
+    stream_pongs: BooleanFromString = Field(default=True)  # type: ignore
+
+    class Config:
+        case_sensitive = False
+        env_prefix = "ANALYST_SIMULATOR_"
+
+
 class AppSettings(BaseSettings):
     test: BooleanFromString = Field(default=False)  # type: ignore
     debug: BooleanFromString = Field(default=False)  # type: ignore
 
     file_cache_dir: Path = DEFAULT_CACHE_DIR
+    use_public_cache: BooleanFromString = Field(default=True)  # type: ignore
+    use_kline_store: BooleanFromString = Field(default=True)  # type: ignore
+    kline_store_dir: Path = DEFAULT_KLINE_STORE_DIR
+    # Raw market and user data frames are recorded to be replayed offline
+    record_streams: BooleanFromString = Field(default=False)  # type: ignore
+    stream_records_dir: Path = DEFAULT_STREAM_RECORDS_DIR
     redis_cache: RedisCacheSettings = Field(default_factory=RedisCacheSettings)
     binance: BinanceApiSettings = Field(default_factory=BinanceApiSettings)
     mongo: MongoSettings = Field(default_factory=MongoSettings)
     rabbitmq: RabbitMQSettings = Field(default_factory=RabbitMQSettings)
     bot: BotSettings = Field(default_factory=BotSettings)
+    simulator: SimulatorSettings = Field(default_factory=SimulatorSettings)
 
     class Config:
         case_sensitive = False
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from analyst.settings import SimulatorSettings
+from analyst.simulator.server import SimulatorServer
+
+
+async def main():
+    server = SimulatorServer(SimulatorSettings())
+
+    await server.start()
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    asyncio.run(main())
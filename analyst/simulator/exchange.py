@@ -0,0 +1,645 @@
+import json
+from collections import defaultdict
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+from pathlib import Path
+from random import Random
+from time import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+ParamsDict = Dict[str, str]
+
+
+def now_ms() -> int:
+    return int(time() * 1000)
+
+
+def format_decimal(value: Decimal) -> str:
+    return f"{value:.8f}"
+
+
+class SimulatorError(Exception):
+    def __init__(self, status: int, code: int, msg: str, data=None):
+        super().__init__(f"{status} {code}: {msg}")
+
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.data = data
+
+    def to_dict(self) -> dict:
+        error = {"code": self.code, "msg": self.msg}
+
+        if self.data is not None:
+            error["data"] = self.data
+
+        return error
+
+
+class SimulatedExchange:
+    order_types = ("LIMIT", "LIMIT_MAKER", "MARKET")
+    # Synthetic depth served by snapshots and diff streams
+    depth_levels = 100
+
+    def __init__(
+        self,
+        exchange_info: dict,
+        prices: List[dict],
+        account_info: dict,
+        commission: float = 0.001,
+        price_volatility: float = 0.0005,
+        check_balances: bool = True,
+        seed: Optional[int] = None,
+    ):
+        self.exchange_info = exchange_info
+        self.symbols = {}
+        self.books: Dict[str, Dict[str, Decimal]] = {}
+
+        prices_by_symbol = {price["symbol"]: price for price in prices}
+
+        # Only symbols with a known top of book can be traded
+        for symbol_info in exchange_info["symbols"]:
+            symbol = symbol_info["symbol"]
+
+            if symbol not in prices_by_symbol:
+                continue
+
+            filters = {filter["filterType"]: filter for filter in symbol_info["filters"]}
+
+            self.symbols[symbol] = {
+                "base": symbol_info["baseAsset"],
+                "quote": symbol_info["quoteAsset"],
+                "tick_size": Decimal(filters["PRICE_FILTER"]["tickSize"]).normalize(),
+                "step_size": Decimal(filters["LOT_SIZE"]["stepSize"]).normalize(),
+            }
+            self.books[symbol] = {
+                key: Decimal(prices_by_symbol[symbol][key])
+                for key in ("bidPrice", "bidQty", "askPrice", "askQty")
+            }
+
+        self.balances = {
+            balance["asset"]: {"free": Decimal(balance["free"]), "locked": Decimal(balance["locked"])}
+            for balance in account_info["balances"]
+        }
+
+        self.orders: Dict[int, dict] = {}
+        self.open_orders: Dict[str, Dict[int, dict]] = defaultdict(dict)
+        self.locked: Dict[int, Decimal] = {}
+        self.trades: Dict[str, int] = defaultdict(int)
+        self.book_update_ids: Dict[str, int] = defaultdict(int)
+        self.depth_events_state: Dict[str, Tuple[int, Dict[str, str], Dict[str, str]]] = {}
+
+        self.listeners: List[Callable[[dict], None]] = []
+
+        self.next_order_id = 1
+        self.next_trade_id = 1
+
+        self.commission = Decimal(str(commission))
+        self.price_volatility = price_volatility
+        self.check_balances = check_balances
+        self.random = Random(seed)
+
+    @classmethod
+    def from_fixtures(cls, fixture_dir: Path, **kwargs):
+        def load(name: str):
+            with open(fixture_dir / name) as fd:
+                return json.load(fd)
+
+        return cls(
+            load("exchange_info.json"), load("pairs_prices.json"), load("account_info.json"), **kwargs
+        )
+
+    #
+    # User data events
+    #
+
+    def _emit(self, event: dict) -> None:
+        for listener in self.listeners:
+            listener(event)
+
+    def _emit_execution_report(self, order: dict, execution_type: str, fill: Optional[dict] = None):
+        if not self.listeners:
+            return
+
+        fill = fill or {}
+
+        self._emit(
+            {
+                "e": "executionReport",
+                "E": now_ms(),
+                "s": order["symbol"],
+                "c": order["clientOrderId"],
+                "S": order["side"],
+                "o": order["type"],
+                "f": order["timeInForce"],
+                "q": order["origQty"],
+                "p": order["price"],
+                "P": order["stopPrice"],
+                "x": execution_type,
+                "X": order["status"],
+                "i": order["orderId"],
+                "l": fill.get("qty", format_decimal(Decimal(0))),
+                "z": order["executedQty"],
+                "L": fill.get("price", format_decimal(Decimal(0))),
+                "n": fill.get("commission", "0"),
+                "N": fill.get("commissionAsset"),
+                "T": order["updateTime"],
+                "t": fill.get("tradeId", -1),
+                "w": order["status"] in ("NEW", "PARTIALLY_FILLED"),
+                "m": bool(fill) and execution_type == "TRADE" and order["type"] != "MARKET",
+                "O": order["time"],
+                "Z": order["cummulativeQuoteQty"],
+            }
+        )
+
+    def _emit_account_position(self, assets: Iterable[str]) -> None:
+        if not self.listeners or not assets:
+            return
+
+        timestamp = now_ms()
+
+        self._emit(
+            {
+                "e": "outboundAccountPosition",
+                "E": timestamp,
+                "u": timestamp,
+                "B": [
+                    {
+                        "a": asset,
+                        "f": format_decimal(self.balances[asset]["free"]),
+                        "l": format_decimal(self.balances[asset]["locked"]),
+                    }
+                    for asset in sorted(assets)
+                ],
+            }
+        )
+
+    #
+    # Balances
+    #
+
+    def _get_balance(self, asset: str) -> Dict[str, Decimal]:
+        return self.balances.setdefault(asset, {"free": Decimal(0), "locked": Decimal(0)})
+
+    def _lock(self, asset: str, quantity: Decimal) -> None:
+        balance = self._get_balance(asset)
+
+        if self.check_balances and balance["free"] < quantity:
+            raise SimulatorError(400, -2010, "Account has insufficient balance for requested action.")
+
+        balance["free"] -= quantity
+        balance["locked"] += quantity
+
+    def _unlock(self, asset: str, quantity: Decimal) -> None:
+        balance = self._get_balance(asset)
+
+        balance["free"] += quantity
+        balance["locked"] -= quantity
+
+    def get_account_info(self) -> dict:
+        return {
+            "makerCommission": int(self.commission * 10000),
+            "takerCommission": int(self.commission * 10000),
+            "canTrade": True,
+            "canWithdraw": False,
+            "canDeposit": False,
+            "updateTime": now_ms(),
+            "accountType": "SPOT",
+            "balances": [
+                {
+                    "asset": asset,
+                    "free": format_decimal(balance["free"]),
+                    "locked": format_decimal(balance["locked"]),
+                }
+                for asset, balance in self.balances.items()
+            ],
+            "permissions": ["SPOT"],
+        }
+
+    #
+    # Orders
+    #
+
+    def _get_symbol(self, params: ParamsDict) -> str:
+        symbol = params.get("symbol", "")
+
+        if symbol not in self.books:
+            raise SimulatorError(400, -1121, "Invalid symbol.")
+
+        return symbol
+
+    @staticmethod
+    def _get_decimal(params: ParamsDict, name: str) -> Decimal:
+        try:
+            return Decimal(params[name])
+        except (KeyError, InvalidOperation):
+            raise SimulatorError(
+                400,
+                -1102,
+                f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.",
+            )
+
+    @staticmethod
+    def _get_order_id(params: ParamsDict, name: str = "orderId") -> int:
+        try:
+            return int(params[name])
+        except (KeyError, ValueError):
+            raise SimulatorError(
+                400,
+                -1102,
+                f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.",
+            )
+
+    def create_order(self, params: ParamsDict, test: bool = False) -> dict:
+        symbol = self._get_symbol(params)
+        symbol_info = self.symbols[symbol]
+        book = self.books[symbol]
+
+        side, type = params.get("side"), params.get("type")
+
+        if side not in ("BUY", "SELL"):
+            raise SimulatorError(400, -1100, "Illegal characters found in parameter 'side'.")
+        elif type not in self.order_types:
+            raise SimulatorError(400, -1116, "Invalid orderType.")
+
+        match_price = book["askPrice"] if side == "BUY" else book["bidPrice"]
+
+        if type == "MARKET":
+            price = Decimal(0)
+
+            if "quoteOrderQty" in params and "quantity" not in params:
+                quantity = (self._get_decimal(params, "quoteOrderQty") / match_price).quantize(
+                    symbol_info["step_size"], rounding=ROUND_DOWN
+                )
+            else:
+                quantity = self._get_decimal(params, "quantity")
+        else:
+            price = self._get_decimal(params, "price")
+            quantity = self._get_decimal(params, "quantity")
+
+        if quantity <= 0:
+            raise SimulatorError(400, -1013, "Filter failure: LOT_SIZE")
+
+        crosses = type == "MARKET" or (price >= match_price if side == "BUY" else price <= match_price)
+
+        if type == "LIMIT_MAKER" and crosses:
+            raise SimulatorError(400, -2010, "Order would immediately match and take.")
+
+        if side == "BUY":
+            lock_asset, lock_quantity = symbol_info["quote"], quantity * (price or match_price)
+        else:
+            lock_asset, lock_quantity = symbol_info["base"], quantity
+
+        if test:
+            if self.check_balances and self._get_balance(lock_asset)["free"] < lock_quantity:
+                raise SimulatorError(400, -2010, "Account has insufficient balance for requested action.")
+
+            return {}
+
+        self._lock(lock_asset, lock_quantity)
+
+        order_id, timestamp = self.next_order_id, now_ms()
+        self.next_order_id += 1
+
+        order = {
+            "symbol": symbol,
+            "orderId": order_id,
+            "orderListId": -1,
+            "clientOrderId": params.get("newClientOrderId") or f"simulator{order_id}",
+            "price": format_decimal(price),
+            "origQty": format_decimal(quantity),
+            "executedQty": format_decimal(Decimal(0)),
+            "cummulativeQuoteQty": format_decimal(Decimal(0)),
+            "status": "NEW",
+            "timeInForce": params.get("timeInForce", "GTC"),
+            "type": type,
+            "side": side,
+            "stopPrice": format_decimal(Decimal(0)),
+            "icebergQty": format_decimal(Decimal(0)),
+            "time": timestamp,
+            "updateTime": timestamp,
+            "isWorking": True,
+            "origQuoteOrderQty": format_decimal(Decimal(0)),
+        }
+
+        self.orders[order_id] = order
+        self.locked[order_id] = lock_quantity
+
+        self._emit_execution_report(order, "NEW")
+
+        fills = []
+
+        # The top of book has unlimited liquidity: crossing orders are filled at once
+        if crosses:
+            fills.append(self._fill(order, match_price))
+        else:
+            self.open_orders[symbol][order_id] = order
+
+        self._emit_account_position({symbol_info["base"], symbol_info["quote"]})
+
+        return {**self._get_order_response(order), "fills": fills}
+
+    def _get_order_response(self, order: dict) -> dict:
+        return {
+            "symbol": order["symbol"],
+            "orderId": order["orderId"],
+            "orderListId": order["orderListId"],
+            "clientOrderId": order["clientOrderId"],
+            "transactTime": order["updateTime"],
+            "price": order["price"],
+            "origQty": order["origQty"],
+            "executedQty": order["executedQty"],
+            "cummulativeQuoteQty": order["cummulativeQuoteQty"],
+            "status": order["status"],
+            "timeInForce": order["timeInForce"],
+            "type": order["type"],
+            "side": order["side"],
+        }
+
+    def _fill(self, order: dict, price: Decimal) -> dict:
+        symbol_info = self.symbols[order["symbol"]]
+        base, quote = self._get_balance(symbol_info["base"]), self._get_balance(symbol_info["quote"])
+
+        quantity = Decimal(order["origQty"]) - Decimal(order["executedQty"])
+        quote_quantity = quantity * price
+        locked = self.locked.pop(order["orderId"])
+
+        if order["side"] == "BUY":
+            commission, commission_asset = quantity * self.commission, symbol_info["base"]
+
+            quote["locked"] -= locked
+            quote["free"] += locked - quote_quantity
+            base["free"] += quantity - commission
+        else:
+            commission, commission_asset = quote_quantity * self.commission, symbol_info["quote"]
+
+            base["locked"] -= locked
+            quote["free"] += quote_quantity - commission
+
+        order["executedQty"] = order["origQty"]
+        order["cummulativeQuoteQty"] = format_decimal(
+            Decimal(order["cummulativeQuoteQty"]) + quote_quantity
+        )
+        order["status"] = "FILLED"
+        order["updateTime"] = now_ms()
+        order["isWorking"] = False
+
+        self.open_orders[order["symbol"]].pop(order["orderId"], None)
+        self.trades[order["symbol"]] += 1
+
+        fill = {
+            "price": format_decimal(price),
+            "qty": format_decimal(quantity),
+            "commission": format_decimal(commission),
+            "commissionAsset": commission_asset,
+            "tradeId": self.next_trade_id,
+        }
+        self.next_trade_id += 1
+
+        self._emit_execution_report(order, "TRADE", fill)
+
+        return fill
+
+    def cancel_order(self, params: ParamsDict, order_id_name: str = "orderId") -> dict:
+        symbol = self._get_symbol(params)
+        order_id = self._get_order_id(params, order_id_name)
+
+        order = self.open_orders[symbol].pop(order_id, None)
+
+        if not order:
+            raise SimulatorError(400, -2011, "Unknown order sent.")
+
+        symbol_info = self.symbols[symbol]
+
+        self._unlock(
+            symbol_info["quote"] if order["side"] == "BUY" else symbol_info["base"],
+            self.locked.pop(order_id),
+        )
+
+        order["status"] = "CANCELED"
+        order["updateTime"] = now_ms()
+        order["isWorking"] = False
+
+        self._emit_execution_report(order, "CANCELED")
+        self._emit_account_position({symbol_info["base"], symbol_info["quote"]})
+
+        return {**self._get_order_response(order), "origClientOrderId": order["clientOrderId"]}
+
+    def cancel_replace_order(self, params: ParamsDict) -> dict:
+        allow_failure = params.get("cancelReplaceMode") == "ALLOW_FAILURE"
+
+        try:
+            cancel_result, cancel_response = "SUCCESS", self.cancel_order(params, "cancelOrderId")
+        except SimulatorError as exc:
+            if not allow_failure:
+                raise SimulatorError(
+                    400,
+                    -2022,
+                    "Order cancel-replace failed.",
+                    {
+                        "cancelResult": "FAILURE",
+                        "newOrderResult": "NOT_ATTEMPTED",
+                        "cancelResponse": exc.to_dict(),
+                        "newOrderResponse": None,
+                    },
+                )
+
+            cancel_result, cancel_response = "FAILURE", exc.to_dict()
+
+        try:
+            new_order_result, new_order_response = "SUCCESS", self.create_order(params)
+        except SimulatorError as exc:
+            new_order_result, new_order_response = "FAILURE", exc.to_dict()
+
+        data = {
+            "cancelResult": cancel_result,
+            "newOrderResult": new_order_result,
+            "cancelResponse": cancel_response,
+            "newOrderResponse": new_order_response,
+        }
+
+        if cancel_result == "FAILURE" and new_order_result == "FAILURE":
+            raise SimulatorError(400, -2022, "Order cancel-replace failed.", data)
+        elif "FAILURE" in (cancel_result, new_order_result):
+            raise SimulatorError(409, -2021, "Order cancel-replace partially failed.", data)
+
+        return data
+
+    def get_order(self, params: ParamsDict) -> dict:
+        symbol = self._get_symbol(params)
+        order = self.orders.get(self._get_order_id(params))
+
+        if not order or order["symbol"] != symbol:
+            raise SimulatorError(400, -2013, "Order does not exist.")
+
+        return order
+
+    def list_orders(self, params: ParamsDict) -> List[dict]:
+        symbol = self._get_symbol(params)
+
+        return [order for order in self.orders.values() if order["symbol"] == symbol]
+
+    def list_open_orders(self, params: ParamsDict) -> List[dict]:
+        if "symbol" in params:
+            return list(self.open_orders[self._get_symbol(params)].values())
+
+        return [order for orders in self.open_orders.values() for order in orders.values()]
+
+    #
+    # Market data
+    #
+
+    def get_book_tickers(self) -> List[dict]:
+        return [
+            {
+                "symbol": symbol,
+                "bidPrice": format_decimal(book["bidPrice"]),
+                "bidQty": format_decimal(book["bidQty"]),
+                "askPrice": format_decimal(book["askPrice"]),
+                "askQty": format_decimal(book["askQty"]),
+            }
+            for symbol, book in self.books.items()
+        ]
+
+    def get_ticker(self, symbol: str) -> dict:
+        book = self.books[symbol]
+
+        return {
+            "e": "24hrTicker",
+            "E": now_ms(),
+            "s": symbol,
+            "c": format_decimal(book["bidPrice"]),
+            "a": format_decimal(book["askPrice"]),
+            "A": format_decimal(book["askQty"]),
+            "b": format_decimal(book["bidPrice"]),
+            "B": format_decimal(book["bidQty"]),
+            "n": self.trades[symbol],
+        }
+
+    def get_book_ticker(self, symbol: str) -> dict:
+        book = self.books[symbol]
+
+        return {
+            "u": self.book_update_ids[symbol],
+            "s": symbol,
+            "b": format_decimal(book["bidPrice"]),
+            "B": format_decimal(book["bidQty"]),
+            "a": format_decimal(book["askPrice"]),
+            "A": format_decimal(book["askQty"]),
+        }
+
+    def _get_depth_levels(self, symbol: str, limit: int) -> Tuple[List[list], List[list]]:
+        book = self.books[symbol]
+        tick_size = self.symbols[symbol]["tick_size"]
+
+        # Synthetic levels, one tick apart, behind the top of book
+        bids = [
+            [format_decimal(book["bidPrice"] - tick_size * i), format_decimal(book["bidQty"])]
+            for i in range(limit)
+            if book["bidPrice"] - tick_size * i > 0
+        ]
+        asks = [
+            [format_decimal(book["askPrice"] + tick_size * i), format_decimal(book["askQty"])]
+            for i in range(limit)
+        ]
+
+        return bids, asks
+
+    def get_depth(self, params: ParamsDict) -> dict:
+        symbol = self._get_symbol(params)
+        bids, asks = self._get_depth_levels(symbol, min(int(params.get("limit", 100)), self.depth_levels))
+
+        return {"lastUpdateId": self.book_update_ids[symbol], "bids": bids, "asks": asks}
+
+    def get_depth_event(self, symbol: str) -> Optional[dict]:
+        update_id = self.book_update_ids[symbol]
+        last_update_id, last_bids, last_asks = self.depth_events_state.get(symbol, (0, {}, {}))
+
+        if update_id == last_update_id:
+            return None
+
+        bids, asks = self._get_depth_levels(symbol, self.depth_levels)
+        self.depth_events_state[symbol] = (update_id, dict(bids), dict(asks))
+
+        # Levels which are gone are sent with a zero quantity
+        return {
+            "e": "depthUpdate",
+            "E": now_ms(),
+            "s": symbol,
+            "U": last_update_id + 1,
+            "u": update_id,
+            "b": bids + [[price, "0"] for price in last_bids.keys() - dict(bids).keys()],
+            "a": asks + [[price, "0"] for price in last_asks.keys() - dict(asks).keys()],
+        }
+
+    def get_klines(
+        self, symbol: str, interval_ms: int, start_time: int, end_time: int, limit: int
+    ) -> List[list]:
+        book = self.books[symbol]
+        mid_price = float(book["bidPrice"] + book["askPrice"]) / 2
+        last_open_time = min(end_time, now_ms() - interval_ms)
+
+        first_open_time = start_time + (-start_time % interval_ms)
+
+        klines = []
+
+        for open_time in range(first_open_time, last_open_time + 1, interval_ms)[:limit]:
+            # Seeded by the kline itself so that the history is stable between calls
+            random = Random(f"{symbol}{interval_ms}{open_time}")
+
+            open_price = mid_price * (1 + random.uniform(-0.01, 0.01))
+            close_price = mid_price * (1 + random.uniform(-0.01, 0.01))
+            high_price = max(open_price, close_price) * (1 + random.uniform(0, 0.005))
+            low_price = min(open_price, close_price) * (1 - random.uniform(0, 0.005))
+            volume = random.uniform(1, 1000)
+
+            klines.append(
+                [
+                    open_time,
+                    f"{open_price:.8f}",
+                    f"{high_price:.8f}",
+                    f"{low_price:.8f}",
+                    f"{close_price:.8f}",
+                    f"{volume:.8f}",
+                    open_time + interval_ms - 1,
+                    f"{volume * close_price:.8f}",
+                    random.randint(1, 500),
+                    f"{volume / 2:.8f}",
+                    f"{volume * close_price / 2:.8f}",
+                    "0",
+                ]
+            )
+
+        return klines
+
+    def set_book(self, symbol: str, bid_price: Decimal, ask_price: Decimal) -> None:
+        book = self.books[symbol]
+
+        book["bidPrice"], book["askPrice"] = bid_price, ask_price
+        self.book_update_ids[symbol] += 1
+
+        filled_assets: Set[str] = set()
+
+        # Resting orders are makers and get filled at their own price
+        for order in list(self.open_orders[symbol].values()):
+            price = Decimal(order["price"])
+
+            if (order["side"] == "BUY" and price >= ask_price) or (
+                order["side"] == "SELL" and price <= bid_price
+            ):
+                self._fill(order, price)
+
+                filled_assets.update((self.symbols[symbol]["base"], self.symbols[symbol]["quote"]))
+
+        self._emit_account_position(filled_assets)
+
+    def walk_books(self) -> List[str]:
+        for symbol, book in self.books.items():
+            tick_size = self.symbols[symbol]["tick_size"]
+            spread = max(book["askPrice"] - book["bidPrice"], tick_size)
+
+            move = Decimal(str(self.random.gauss(0, self.price_volatility)))
+            bid_price = max((book["bidPrice"] * (1 + move)).quantize(tick_size), tick_size)
+
+            self.set_book(symbol, bid_price, bid_price + spread)
+
+        return list(self.books)
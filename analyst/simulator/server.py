@@ -0,0 +1,494 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from decimal import Decimal
+from functools import lru_cache, partial
+from logging import getLogger
+from random import Random
+from secrets import token_hex
+from time import monotonic
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from aiohttp import WSCloseCode, WSMsgType, web
+
+from analyst.adapters.binance import BinanceAdapter
+from analyst.adapters.order_websocket import BinanceOrderWebSocketAdapter
+from analyst.settings import SimulatorSettings
+from analyst.simulator.exchange import SimulatedExchange, SimulatorError, now_ms
+
+logger = getLogger("simulator.server")
+
+INTERVAL_UNITS_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000,
+    "M": 2_592_000_000,
+}
+
+
+class SimulatorServer:
+    api_klines_limit = 1000
+
+    def __init__(self, settings: SimulatorSettings, exchange: Optional[SimulatedExchange] = None):
+        self.settings = settings
+        self.exchange = exchange or SimulatedExchange.from_fixtures(
+            settings.fixture_dir,
+            commission=settings.commission,
+            price_volatility=settings.price_volatility,
+            check_balances=settings.check_balances,
+            seed=settings.seed,
+        )
+        self.exchange.listeners.append(self.on_user_data_event)
+
+        self.random = Random(settings.seed)
+
+        self.market_script: List[Dict[str, List[str]]] = []
+        self.market_script_step = 0
+
+        if settings.market_script:
+            with open(settings.market_script) as fd:
+                self.market_script = json.load(fd)
+
+        self.listen_keys: Set[str] = set()
+        self.market_sessions: Dict[web.WebSocketResponse, Set[str]] = {}
+        self.market_messages_times: Dict[web.WebSocketResponse, Deque[float]] = defaultdict(deque)
+        self.user_data_sessions: Dict[web.WebSocketResponse, asyncio.Queue] = {}
+
+        self.ws_api_methods: Dict[str, Callable[[dict], dict]] = {
+            "order.place": self.exchange.create_order,
+            "order.test": partial(self.exchange.create_order, test=True),
+            "order.cancel": self.exchange.cancel_order,
+            "order.cancelReplace": self.exchange.cancel_replace_order,
+        }
+        self.ws_api_sessions: Set[web.WebSocketResponse] = set()
+        self.ws_api_tasks: Set[asyncio.Task] = set()
+
+        self.used_weight = 0
+        self.used_weight_minute = 0
+
+        self.runner: Optional[web.AppRunner] = None
+        self.market_task: Optional[asyncio.Task] = None
+
+    #
+    # REST API
+    #
+
+    def _get_weight(self, request) -> int:
+        if (request.method, request.path) == ("GET", "/api/v3/openOrders"):
+            return (
+                BinanceAdapter.api_open_orders_weight
+                if "symbol" in request.query
+                else BinanceAdapter.api_all_open_orders_weight
+            )
+        elif (request.method, request.path) == ("GET", "/api/v3/depth"):
+            return BinanceAdapter.get_depth_weight(int(request.query.get("limit", 100)))
+
+        return BinanceAdapter.api_endpoint_weights.get((request.method, request.path), 1)
+
+    def _use_weight(self, weight: int) -> int:
+        minute = now_ms() // 60_000
+
+        if minute != self.used_weight_minute:
+            self.used_weight, self.used_weight_minute = 0, minute
+
+        self.used_weight += weight
+
+        return self.used_weight
+
+    async def _simulate_latency(self) -> None:
+        delay = self.settings.latency + self.random.uniform(0, self.settings.latency_jitter)
+
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _simulate_failures(self, used_weight: int, headers: Dict[str, str]) -> None:
+        draw = self.random.random()
+
+        if used_weight > self.settings.weight_limit:
+            headers["Retry-After"] = str(60 - now_ms() // 1000 % 60)
+
+            raise SimulatorError(
+                429,
+                -1003,
+                f"Too much request weight used; current limit is {self.settings.weight_limit} "
+                "request weight per 1 MINUTE.",
+            )
+        elif draw < self.settings.rate_limit_rate:
+            headers["Retry-After"] = "1"
+
+            raise SimulatorError(429, -1003, "Too many requests.")
+        elif draw < self.settings.rate_limit_rate + self.settings.error_rate:
+            raise SimulatorError(
+                503, -1001, "Internal error; unable to process your request. Please try again."
+            )
+
+    def _check_timestamp(self, params: dict) -> None:
+        if "timestamp" not in params:
+            return
+
+        recv_window = int(params.get("recvWindow", self.settings.recv_window))
+
+        if now_ms() - int(params["timestamp"]) > recv_window:
+            raise SimulatorError(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        if request.path in ("/stream", "/ws-api/v3"):
+            return await handler(request)
+
+        await self._simulate_latency()
+
+        used_weight = self._use_weight(self._get_weight(request))
+        headers = {"x-mbx-used-weight": str(used_weight), "x-mbx-used-weight-1m": str(used_weight)}
+
+        try:
+            self._simulate_failures(used_weight, headers)
+
+            request["params"] = {**request.query, **(await request.post())}
+
+            self._check_timestamp(request["params"])
+
+            data = await handler(request)
+        except SimulatorError as exc:
+            logger.debug(f"{request.method} {request.path}: {exc}")
+
+            return web.json_response(exc.to_dict(), status=exc.status, headers=headers)
+
+        return web.json_response(data, headers=headers)
+
+    async def ping(self, request):
+        return {}
+
+    async def get_time(self, request):
+        return {"serverTime": now_ms()}
+
+    async def get_exchange_info(self, request):
+        return {**self.exchange.exchange_info, "serverTime": now_ms()}
+
+    async def get_book_tickers(self, request):
+        tickers = self.exchange.get_book_tickers()
+
+        if "symbol" in request["params"]:
+            for ticker in tickers:
+                if ticker["symbol"] == request["params"]["symbol"]:
+                    return ticker
+
+            raise SimulatorError(400, -1121, "Invalid symbol.")
+
+        return tickers
+
+    async def get_depth(self, request):
+        return self.exchange.get_depth(request["params"])
+
+    async def get_klines(self, request):
+        params = request["params"]
+        symbol, interval = params.get("symbol", ""), params.get("interval", "")
+
+        if symbol not in self.exchange.books:
+            raise SimulatorError(400, -1121, "Invalid symbol.")
+        elif interval not in BinanceAdapter.api_possible_intervals:
+            raise SimulatorError(400, -1120, "Invalid interval.")
+
+        interval_ms = int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+        limit = min(int(params.get("limit", 500)), self.api_klines_limit)
+        end_time = int(params.get("endTime", now_ms()))
+        start_time = int(params.get("startTime", end_time - limit * interval_ms))
+
+        return self.exchange.get_klines(symbol, interval_ms, start_time, end_time, limit)
+
+    async def get_account(self, request):
+        return self.exchange.get_account_info()
+
+    async def create_order(self, request):
+        return self.exchange.create_order(request["params"])
+
+    async def create_test_order(self, request):
+        return self.exchange.create_order(request["params"], test=True)
+
+    async def get_order(self, request):
+        return self.exchange.get_order(request["params"])
+
+    async def cancel_order(self, request):
+        return self.exchange.cancel_order(request["params"])
+
+    async def cancel_replace_order(self, request):
+        return self.exchange.cancel_replace_order(request["params"])
+
+    async def list_open_orders(self, request):
+        return self.exchange.list_open_orders(request["params"])
+
+    async def list_orders(self, request):
+        return self.exchange.list_orders(request["params"])
+
+    async def create_listen_key(self, request):
+        listen_key = token_hex(32)
+
+        self.listen_keys.add(listen_key)
+
+        return {"listenKey": listen_key}
+
+    async def keep_alive_listen_key(self, request):
+        if request["params"].get("listenKey") not in self.listen_keys:
+            raise SimulatorError(400, -1125, "This listenKey does not exist.")
+
+        return {}
+
+    async def close_listen_key(self, request):
+        self.listen_keys.discard(request["params"].get("listenKey", ""))
+
+        return {}
+
+    #
+    # WebSocket API
+    #
+
+    async def _on_ws_api_request(self, session: web.WebSocketResponse, data: dict) -> None:
+        request_id, method, params = data.get("id"), data.get("method"), data.get("params") or {}
+        headers: Dict[str, str] = {}
+
+        await self._simulate_latency()
+
+        try:
+            if method not in self.ws_api_methods:
+                raise SimulatorError(400, -1020, "This operation is not supported.")
+
+            used_weight = self._use_weight(
+                BinanceAdapter.api_endpoint_weights[BinanceOrderWebSocketAdapter.api_methods[method]]
+            )
+
+            self._simulate_failures(used_weight, headers)
+            self._check_timestamp(params)
+
+            response = {"id": request_id, "status": 200, "result": self.ws_api_methods[method](params)}
+        except SimulatorError as exc:
+            logger.debug(f"ws-api {method}: {exc}")
+
+            error = exc.to_dict()
+
+            # Sent as the epoch in milliseconds the requests can be made again
+            if "Retry-After" in headers:
+                error["data"] = {"retryAfter": now_ms() + int(headers["Retry-After"]) * 1000}
+
+            response = {"id": request_id, "status": exc.status, "error": error}
+
+        response["rateLimits"] = [
+            {
+                "rateLimitType": "REQUEST_WEIGHT",
+                "interval": "MINUTE",
+                "intervalNum": 1,
+                "limit": self.settings.weight_limit,
+                "count": self.used_weight,
+            }
+        ]
+
+        if not session.closed:
+            await session.send_json(response)
+
+    async def ws_api(self, request):
+        session = web.WebSocketResponse()
+        await session.prepare(request)
+
+        self.ws_api_sessions.add(session)
+
+        try:
+            async for message in session:
+                if message.type == WSMsgType.TEXT:
+                    # Answered concurrently, the latency of a request doesn't hold the next ones
+                    task = asyncio.create_task(self._on_ws_api_request(session, json.loads(message.data)))
+
+                    self.ws_api_tasks.add(task)
+                    task.add_done_callback(self.ws_api_tasks.discard)
+        finally:
+            self.ws_api_sessions.discard(session)
+
+        return session
+
+    #
+    # Websocket streams
+    #
+
+    def on_user_data_event(self, event: dict) -> None:
+        for queue in self.user_data_sessions.values():
+            queue.put_nowait(event)
+
+    async def _send_user_data(
+        self, session: web.WebSocketResponse, listen_key: str, queue: asyncio.Queue
+    ):
+        while True:
+            event = await queue.get()
+
+            await session.send_json({"stream": listen_key, "data": event})
+
+    async def _check_messages_limit(self, session: web.WebSocketResponse) -> bool:
+        times = self.market_messages_times[session]
+        times.append(now := monotonic())
+
+        while times[0] <= now - 1:
+            times.popleft()
+
+        if len(times) > self.settings.stream_messages_limit:
+            logger.info("market stream: too many messages, closing the connection")
+
+            await session.close(code=WSCloseCode.POLICY_VIOLATION, message=b"Too many requests")
+
+            return False
+
+        return True
+
+    async def _on_market_message(self, session: web.WebSocketResponse, data: dict) -> None:
+        if not await self._check_messages_limit(session):
+            return
+
+        method, params, request_id = data.get("method"), data.get("params") or [], data.get("id")
+        subscriptions = self.market_sessions[session]
+        result = None
+
+        if method == "SUBSCRIBE":
+            subscriptions.update(params)
+        elif method == "UNSUBSCRIBE":
+            subscriptions.difference_update(params)
+        elif method == "LIST_SUBSCRIPTIONS":
+            result = sorted(subscriptions)
+        else:
+            await session.send_json({"error": {"code": 2, "msg": "Invalid request"}, "id": request_id})
+
+            return
+
+        await session.send_json({"result": result, "id": request_id})
+
+    async def stream(self, request):
+        # Pings are answered here, Binance counts them in the messages limit of market connections
+        session = web.WebSocketResponse(autoping=False)
+        await session.prepare(request)
+
+        streams = request.query.get("streams", "")
+        sender = None
+
+        if streams in self.listen_keys:
+            queue: asyncio.Queue = asyncio.Queue()
+
+            self.user_data_sessions[session] = queue
+            sender = asyncio.create_task(self._send_user_data(session, streams, queue))
+        else:
+            self.market_sessions[session] = set(filter(None, streams.split("/")))
+
+        try:
+            async for message in session:
+                if message.type == WSMsgType.PING:
+                    if session in self.market_sessions and not await self._check_messages_limit(session):
+                        continue
+
+                    if self.settings.stream_pongs:
+                        await session.pong(message.data)
+
+                elif message.type == WSMsgType.TEXT and session in self.market_sessions:
+                    await self._on_market_message(session, json.loads(message.data))
+        finally:
+            if sender:
+                sender.cancel()
+
+            self.market_sessions.pop(session, None)
+            self.market_messages_times.pop(session, None)
+            self.user_data_sessions.pop(session, None)
+
+        return session
+
+    def step_market(self) -> List[str]:
+        if not self.market_script:
+            return self.exchange.walk_books()
+
+        step = self.market_script[self.market_script_step % len(self.market_script)]
+        self.market_script_step += 1
+
+        for symbol, (bid_price, ask_price) in step.items():
+            self.exchange.set_book(symbol, Decimal(str(bid_price)), Decimal(str(ask_price)))
+
+        return list(step)
+
+    async def broadcast_tickers(self, symbols: List[str]) -> None:
+        streams: Dict[str, Callable[[], Optional[dict]]] = {}
+
+        for symbol in symbols:
+            # Computed once for both depth streams, the event marks the levels as sent
+            depth_event = lru_cache()(partial(self.exchange.get_depth_event, symbol))
+
+            streams[f"{symbol.lower()}@ticker"] = partial(self.exchange.get_ticker, symbol)
+            streams[f"{symbol.lower()}@bookTicker"] = partial(self.exchange.get_book_ticker, symbol)
+            streams[f"{symbol.lower()}@depth"] = depth_event
+            streams[f"{symbol.lower()}@depth@100ms"] = depth_event
+
+        tickers: Dict[str, Optional[dict]] = {}
+
+        for session, subscriptions in list(self.market_sessions.items()):
+            for stream in subscriptions & streams.keys():
+                if stream not in tickers:
+                    tickers[stream] = streams[stream]()
+
+                if tickers[stream] is not None:
+                    await session.send_json({"stream": stream, "data": tickers[stream]})
+
+            if "!bookTicker" in subscriptions:
+                for symbol in symbols:
+                    await session.send_json(
+                        {"stream": "!bookTicker", "data": self.exchange.get_book_ticker(symbol)}
+                    )
+
+    async def run_market(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.ticker_interval)
+
+            await self.broadcast_tickers(self.step_market())
+
+    def get_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes(
+            [
+                web.get("/api/v3/ping", self.ping),
+                web.get("/api/v3/time", self.get_time),
+                web.get("/api/v3/exchangeInfo", self.get_exchange_info),
+                web.get("/api/v3/ticker/bookTicker", self.get_book_tickers),
+                web.get("/api/v3/depth", self.get_depth),
+                web.get("/api/v3/klines", self.get_klines),
+                web.get("/api/v3/account", self.get_account),
+                web.post("/api/v3/order", self.create_order),
+                web.post("/api/v3/order/test", self.create_test_order),
+                web.get("/api/v3/order", self.get_order),
+                web.delete("/api/v3/order", self.cancel_order),
+                web.post("/api/v3/order/cancelReplace", self.cancel_replace_order),
+                web.get("/api/v3/openOrders", self.list_open_orders),
+                web.get("/api/v3/allOrders", self.list_orders),
+                web.post("/api/v3/userDataStream", self.create_listen_key),
+                web.put("/api/v3/userDataStream", self.keep_alive_listen_key),
+                web.delete("/api/v3/userDataStream", self.close_listen_key),
+                web.get("/stream", self.stream),
+                web.get("/ws-api/v3", self.ws_api),
+            ]
+        )
+
+        return app
+
+    async def start(self) -> None:
+        self.runner = web.AppRunner(self.get_app())
+
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, self.settings.host, self.settings.port)
+
+        await site.start()
+
+        self.market_task = asyncio.create_task(self.run_market())
+
+        logger.info(f"simulator listening on {self.settings.host}:{self.settings.port}")
+
+    async def stop(self) -> None:
+        if self.market_task:
+            self.market_task.cancel()
+
+        sessions = list(self.market_sessions) + list(self.user_data_sessions) + list(self.ws_api_sessions)
+
+        for session in sessions:
+            await session.close()
+
+        if self.runner:
+            await self.runner.cleanup()
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Benchmarks register themselves on import
+from benchmarks import (  # noqa: F401
+    bench_controllers,
+    bench_klines,
+    bench_models,
+    bench_order_book,
+    bench_order_manager,
+    bench_orders,
+    bench_runner,
+    bench_screener,
+    bench_serialization,
+    bench_strategies,
+    bench_streams,
+    bench_user_data,
+)
+from benchmarks.runner import compare, load_report, run_benchmarks, save_report
+
+DEFAULT_BASELINE_PATH = Path("benchmarks", "baseline.json")
+DEFAULT_OUTPUT_PATH = Path("benchmarks", "results.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hot paths microbenchmarks")
+    parser.add_argument("-k", "--filter", default="*", help="glob on the benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repeat")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="median slowdown ratio flagged as regression"
+    )
+    parser.add_argument("--log-level", default="WARNING", help="keeps debug logs out of the timings")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level)
+
+    report = asyncio.run(run_benchmarks(args.filter, repeat=args.repeat, min_time=args.min_time))
+
+    if args.save_baseline:
+        save_report(args.baseline, report)
+
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+
+        return
+
+    baseline = load_report(args.baseline)
+
+    if baseline:
+        report["comparison"] = compare(report, baseline, args.threshold)
+
+    save_report(args.output, report)
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    regressions = [name for name, result in report.get("comparison", {}).items() if result["regression"]]
+
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from benchmarks.runner import benchmark
+from benchmarks.utils import get_fixture_controllers
+
+
+@benchmark("controllers.binance.load_pairs")
+def load_pairs():
+    return get_fixture_controllers().binance.load_pairs
+
+
+@benchmark("controllers.binance.get_order_book")
+def get_order_book():
+    # REST snapshot turned into a DataFrame, what the local order books replace
+    binance = get_fixture_controllers().binance
+
+    async def run():
+        await binance.get_order_book("ETHBTC")
+
+    return run
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from pandas import DataFrame, DatetimeIndex
+
+from analyst.adapters.klines import klines_to_dataframe
+from benchmarks.runner import benchmark
+from benchmarks.utils import forge_klines
+
+
+def rowwise_klines_to_dataframe(klines, interval):
+    # Former decoding, one dict per kline, kept as the reference of the columnar one
+    df = DataFrame(
+        [
+            {
+                "timestamp": datetime.fromtimestamp((kline_data[6] + 1) / 1000),
+                "open": float(kline_data[1]),
+                "high": float(kline_data[2]),
+                "low": float(kline_data[3]),
+                "close": float(kline_data[4]),
+                "volumes": float(kline_data[5]),
+                "trades": kline_data[8],
+            }
+            for kline_data in klines
+        ]
+    )
+
+    if not df.empty:
+        df["timestamp"] = DatetimeIndex(df["timestamp"])
+        df.set_index("timestamp", inplace=True)
+
+        if interval == "1d":
+            df = df.resample("D").mean()
+            df.index.freq = None
+
+    return df
+
+
+@benchmark("klines.to_dataframe.1m")
+def klines_to_dataframe_1m():
+    klines = forge_klines(10_000)
+
+    return lambda: klines_to_dataframe(klines, "1m")
+
+
+@benchmark("klines.to_dataframe_rowwise.1m")
+def rowwise_klines_to_dataframe_1m():
+    klines = forge_klines(10_000)
+
+    return lambda: rowwise_klines_to_dataframe(klines, "1m")
+
+
+@benchmark("klines.to_dataframe.1d")
+def klines_to_dataframe_1d():
+    # Daily klines are resampled
+    klines = forge_klines(1_000, interval_ms=86_400_000)
+
+    return lambda: klines_to_dataframe(klines, "1d")
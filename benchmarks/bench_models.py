@@ -0,0 +1,78 @@
+from analyst.crypto.models import LazyMarketStreamTicker, MarketStreamTicker, OrderFromUserDataStream
+from benchmarks.runner import benchmark
+
+TICKER_DATA = {
+    "e": "24hrTicker",
+    "E": 1662661031419,
+    "s": "BTCUSDT",
+    "p": "-120.21000000",
+    "P": "-0.622",
+    "w": "19180.31276143",
+    "c": "19208.12000000",
+    "Q": "0.00520000",
+    "b": "19208.12000000",
+    "B": "0.09846000",
+    "a": "19208.74000000",
+    "A": "0.02862000",
+    "o": "19328.33000000",
+    "h": "19458.25000000",
+    "l": "18983.47000000",
+    "v": "245021.55174000",
+    "q": "4699603006.69315390",
+    "O": 1662574631419,
+    "C": 1662661031419,
+    "F": 1742108270,
+    "L": 1746998813,
+    "n": 4890544,
+}
+
+EXECUTION_REPORT_DATA = {
+    "e": "executionReport",
+    "E": 1662661031419,
+    "s": "BTCUSDT",
+    "c": "web_b4e4b1fb0d1b4bb1a8c6f4a1c1f1e9a2",
+    "S": "BUY",
+    "o": "LIMIT_MAKER",
+    "f": "GTC",
+    "q": "0.00100000",
+    "p": "19000.00000000",
+    "P": "0.00000000",
+    "F": "0.00000000",
+    "g": -1,
+    "C": "",
+    "x": "TRADE",
+    "X": "FILLED",
+    "r": "NONE",
+    "i": 13485713485,
+    "l": "0.00100000",
+    "z": "0.00100000",
+    "L": "19000.00000000",
+    "n": "0.00000100",
+    "N": "BTC",
+    "T": 1662661031418,
+    "t": 1746998813,
+    "I": 28740813751,
+    "w": False,
+    "m": True,
+    "M": True,
+    "O": 1662660031418,
+    "Z": "19.00000000",
+    "Y": "19.00000000",
+    "Q": "0.00000000",
+}
+
+
+@benchmark("models.market_stream_ticker")
+def market_stream_ticker():
+    return lambda: MarketStreamTicker(**TICKER_DATA)
+
+
+@benchmark("models.lazy_market_stream_ticker")
+def lazy_market_stream_ticker():
+    # What strategies do on each tick: build it and read the bid price
+    return lambda: LazyMarketStreamTicker(TICKER_DATA).bid_price
+
+
+@benchmark("models.order_from_user_data_stream")
+def order_from_user_data_stream():
+    return lambda: OrderFromUserDataStream(**EXECUTION_REPORT_DATA)
@@ -0,0 +1,44 @@
+from analyst.crypto.order_book import OrderBook
+from benchmarks.runner import benchmark
+from benchmarks.utils import forge_depth
+
+
+def get_order_book(levels: int = 1000) -> OrderBook:
+    order_book = OrderBook("ETHBTC")
+    order_book.apply_snapshot(forge_depth(levels))
+
+    return order_book
+
+
+@benchmark("crypto.order_book_apply_event")
+def order_book_apply_event():
+    order_book = get_order_book()
+    snapshot = forge_depth(10)
+
+    def apply_event():
+        # Top levels quantities changing, as most depth diffs do
+        update_id = order_book.last_update_id + 1
+
+        order_book.apply_event(
+            {"U": update_id, "u": update_id, "b": snapshot["bids"][::-1], "a": snapshot["asks"][::-1]}
+        )
+
+    return apply_event
+
+
+@benchmark("crypto.order_book_best_levels")
+def order_book_best_levels():
+    order_book = get_order_book()
+
+    return lambda: (
+        order_book.best_bid(),
+        order_book.best_ask(),
+        order_book.bids.cumulative_quantity(0.0699),
+    )
+
+
+@benchmark("crypto.order_book_to_numpy")
+def order_book_to_numpy():
+    order_book = get_order_book()
+
+    return lambda: (order_book.bids.to_numpy(100), order_book.asks.to_numpy(100))
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+from analyst.bot.order_manager import PairSide
+from benchmarks.runner import benchmark
+from benchmarks.utils import get_fixture_controllers
+from tests.mocks.order_manager import MockedOrderManager
+
+
+async def get_order_manager() -> MockedOrderManager:
+    order_manager = MockedOrderManager(controllers=get_fixture_controllers())
+
+    await order_manager.setup()
+
+    return order_manager
+
+
+@benchmark("order_manager.truncate_base_quantity")
+async def truncate_base_quantity():
+    order_manager = await get_order_manager()
+    pair = order_manager.get_pair("BTCUSDT")
+    quantity = Decimal("0.00052061")
+
+    return lambda: order_manager.truncate_base_quantity(pair, quantity, ceil=True)
+
+
+@benchmark("order_manager.convert_quantity")
+async def convert_quantity():
+    order_manager = await get_order_manager()
+    quantity, price = Decimal("10"), Decimal("19208.12")
+
+    return lambda: order_manager.convert_quantity(quantity, price, to=PairSide.base)
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from analyst.adapters.binance import BinanceAdapter
+from analyst.adapters.order_websocket import BinanceOrderWebSocketAdapter
+from analyst.adapters.rate_limiter import WeightRateLimiter
+from analyst.settings import BinanceApiSettings, SimulatorSettings
+from analyst.simulator.server import SimulatorServer
+from benchmarks.runner import benchmark
+
+SIMULATOR_PORT = 8095
+
+simulator: Optional[SimulatorServer] = None
+
+
+async def get_settings() -> BinanceApiSettings:
+    global simulator
+
+    # Left running until the benchmarks process exits
+    if simulator is None:
+        simulator = SimulatorServer(
+            SimulatorSettings(port=SIMULATOR_PORT, ticker_interval=3600, weight_limit=10**9)
+        )
+        await simulator.start()
+
+    return BinanceApiSettings(
+        api_url=f"http://localhost:{SIMULATOR_PORT}",
+        ws_api_url=f"ws://localhost:{SIMULATOR_PORT}/ws-api/v3",
+    )
+
+
+def get_rate_limiter() -> WeightRateLimiter:
+    # The benchmark loops would exhaust the real weight budget
+    return WeightRateLimiter(10**9, period=BinanceAdapter.api_weight_period)
+
+
+@benchmark("adapters.order_ack_rest")
+async def order_ack_rest():
+    adapter = BinanceAdapter(settings=await get_settings())
+    adapter.rate_limiter = get_rate_limiter()
+
+    await adapter.setup()
+
+    async def create_test_order():
+        await adapter.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    return create_test_order
+
+
+@benchmark("adapters.order_ack_websocket")
+async def order_ack_websocket():
+    adapter = BinanceOrderWebSocketAdapter(settings=await get_settings(), rate_limiter=get_rate_limiter())
+
+    async def create_test_order():
+        await adapter.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    return create_test_order
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+from analyst.bot.bot import Runner
+from analyst.crypto.models import LazyMarketStreamTicker
+from benchmarks.bench_models import TICKER_DATA
+from benchmarks.runner import benchmark
+
+
+@benchmark("bot.run_market_streams.1000")
+def run_market_streams():
+    # Per tick overhead of the runner, before anything is posted to the strategies
+    async def listen_market_streams(streams=None, on_stale=None):
+        for _ in range(1000):
+            yield "btcusdt@ticker", LazyMarketStreamTicker(TICKER_DATA)
+
+    controllers = SimpleNamespace(binance=SimpleNamespace(listen_market_streams=listen_market_streams))
+    runner = Runner(controllers=controllers, order_manager=None)
+
+    return runner.run_market_streams
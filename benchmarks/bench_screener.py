@@ -0,0 +1,38 @@
+import numpy as np
+from pandas import DataFrame, concat, date_range
+
+from analyst.screener import MarketMakerScreener
+from benchmarks.runner import benchmark
+from benchmarks.utils import get_fixture_controllers
+
+
+def forge_frames(symbols, periods: int, freq: str, seed: int) -> DataFrame:
+    random = np.random.default_rng(seed)
+    index = date_range("2022-01-01", periods=periods, freq=freq)
+
+    return concat(
+        {
+            symbol: DataFrame(
+                {
+                    "close": np.round(1 + random.normal(0, 0.01, periods).cumsum(), 4),
+                    "volumes": random.uniform(1, 1000, periods),
+                },
+                index=index,
+            )
+            for symbol in symbols
+        },
+        axis=1,
+    )
+
+
+@benchmark("screener.market_maker.run")
+async def market_maker_screener_run():
+    pairs = await get_fixture_controllers().binance.load_pairs()
+    pairs = {symbol: pair for symbol, pair in pairs.items() if pair.quote == "BTC"}
+
+    screener = MarketMakerScreener(controllers=None, pairs=pairs)
+    # Same window sizes as load_1h_dataframe and load_5m_dataframe
+    screener.df_1h = forge_frames(pairs, 60 * 24, "1h", seed=1)
+    screener.df_5m = forge_frames(pairs, 990, "5min", seed=2)
+
+    return screener.run
@@ -0,0 +1,35 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from analyst.bot.strategies.market_maker import MarketMakerV3
+from analyst.crypto.models import Order
+from analyst.repositories.utils import recover_decimal, serialize_obj
+from benchmarks.runner import benchmark
+
+
+@benchmark("repositories.order_round_trip")
+def order_round_trip():
+    order = Order.create(
+        id=1,
+        symbol="BTCUSDT",
+        status="NEW",
+        type="LIMIT_MAKER",
+        side="BUY",
+        price=Decimal("19000"),
+        requested_quantity=Decimal("0.001"),
+    ).dict()
+
+    return lambda: recover_decimal(serialize_obj(order))
+
+
+@benchmark("repositories.strategy_round_trip")
+def strategy_round_trip():
+    strategy = MarketMakerV3.create(
+        symbol="BTCUSDT",
+        quote_quantity=Decimal("10"),
+        interval=Decimal("500"),
+        cleanup_interval=timedelta(minutes=45),
+        max_buy_orders=3,
+    ).dict()
+
+    return lambda: recover_decimal(serialize_obj(strategy))
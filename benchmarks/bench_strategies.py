@@ -0,0 +1,44 @@
+from decimal import Decimal
+from itertools import cycle
+
+from analyst.bot.strategies.market_maker import MarketMakerV3
+from benchmarks.bench_order_manager import get_order_manager
+from benchmarks.runner import benchmark
+
+
+def create_strategy() -> MarketMakerV3:
+    return MarketMakerV3.create(
+        symbol="BTCUSDT",
+        quote_quantity=Decimal("10"),
+        interval=Decimal("500"),
+        max_buy_orders=3,
+    )
+
+
+@benchmark("strategies.market_maker_v3.update_buy_side.steady")
+async def update_buy_side_steady():
+    order_manager = await get_order_manager()
+    strategy = create_strategy()
+
+    # Ladder already set: the common tick where nothing changes
+    await strategy.update_buy_side(order_manager, Decimal("15_000"))
+
+    async def run():
+        await strategy.update_buy_side(order_manager, Decimal("15_100"))
+
+    return run
+
+
+@benchmark("strategies.market_maker_v3.update_buy_side.moving")
+async def update_buy_side_moving():
+    order_manager = await get_order_manager()
+    strategy = create_strategy()
+    bid_prices = cycle((Decimal("15_000"), Decimal("15_500")))
+
+    await strategy.update_buy_side(order_manager, next(bid_prices))
+
+    # Each tick creates or cancels the top level of the ladder
+    async def run():
+        await strategy.update_buy_side(order_manager, next(bid_prices))
+
+    return run
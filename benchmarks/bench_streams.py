@@ -0,0 +1,105 @@
+import json
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+
+from analyst.adapters.redundant_market_stream import MarketStreamDeduplicator
+from analyst.adapters.stream_queue import StreamQueue
+from analyst.adapters.stream_recorder import ReplayMarketStream, StreamRecorderAdapter, StreamReplayer
+from analyst.controllers.binance import BinanceController
+from benchmarks.runner import add_teardown, benchmark
+
+TICKER_MESSAGE = json.dumps(
+    {
+        "stream": "ethbtc@ticker",
+        "data": {
+            "e": "24hrTicker",
+            "E": 1672515782136,
+            "s": "ETHBTC",
+            "c": "0.07126000",
+            "a": "0.07126000",
+            "A": "10.00000000",
+            "b": "0.07125000",
+            "B": "12.00000000",
+            "n": 1000,
+        },
+    }
+)
+
+
+def get_temporary_dir() -> str:
+    temporary_dir = TemporaryDirectory()
+
+    add_teardown(temporary_dir.cleanup)
+
+    return temporary_dir.name
+
+
+def stream_queue_round_trip(policy):
+    queue = StreamQueue(maxsize=1000, policy=policy)
+
+    async def round_trip():
+        await queue.put(json.loads(TICKER_MESSAGE))
+        await queue.get()
+
+    return round_trip
+
+
+@benchmark("adapters.stream_queue_block")
+def stream_queue_block():
+    return stream_queue_round_trip("block")
+
+
+@benchmark("adapters.stream_queue_conflate")
+def stream_queue_conflate():
+    return stream_queue_round_trip("conflate")
+
+
+@benchmark("adapters.market_stream_deduplicate")
+def market_stream_deduplicate():
+    # The same new event delivered by two feeds, the second one is dropped
+    deduplicator = MarketStreamDeduplicator(2)
+    message = json.loads(TICKER_MESSAGE)
+    event = message["data"]
+
+    def deduplicate():
+        event["E"] += 1
+
+        deduplicator.accept(0, message)
+        deduplicator.accept(1, message)
+
+    return deduplicate
+
+
+@benchmark("adapters.stream_recorder_record")
+def stream_recorder_record():
+    recorder = StreamRecorderAdapter(dir_path=get_temporary_dir())
+    message = json.loads(TICKER_MESSAGE)
+
+    add_teardown(recorder.close)
+
+    return lambda: recorder.record("market", TICKER_MESSAGE, message)
+
+
+@benchmark("controllers.binance.replay_market_streams")
+def replay_market_streams():
+    # 1000 recorded tickers fed through the controller as fast as possible
+    dir_path = get_temporary_dir()
+
+    recorder = StreamRecorderAdapter(dir_path=dir_path)
+
+    for i in range(1000):
+        recorder.record("market", TICKER_MESSAGE, received_at=i * 1000)
+
+    recorder.close()
+
+    async def replay():
+        controller = BinanceController(
+            adapters=SimpleNamespace(
+                binance_market_websocket=ReplayMarketStream(StreamReplayer(dir_path, speed=None))
+            )
+        )
+
+        async for _, ticker in controller.listen_market_streams(streams=["ethbtc@ticker"]):
+            ticker.bid_price
+
+    return replay
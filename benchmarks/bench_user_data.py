@@ -0,0 +1,40 @@
+from analyst.bot.sequencer import UserDataSequencer
+from analyst.crypto.models import OrderFromUserDataStream, OutboundAccountPosition
+from benchmarks.runner import benchmark
+
+EVENT_TIME = 1672515782136
+
+
+@benchmark("bot.user_data_sequencer_fill")
+def user_data_sequencer_fill():
+    # Fill reaction latency, a report dispatched once its balances update is applied
+    report = OrderFromUserDataStream(
+        **{
+            "E": EVENT_TIME,
+            "s": "ETHBTC",
+            "S": "BUY",
+            "o": "LIMIT",
+            "f": "GTC",
+            "q": "1.0",
+            "p": "0.07",
+            "P": "0",
+            "X": "FILLED",
+            "i": 1,
+            "l": "1.0",
+            "O": EVENT_TIME,
+        }
+    )
+    account_position = OutboundAccountPosition(**{"E": EVENT_TIME, "u": EVENT_TIME, "B": []})
+
+    async def on_order(order):
+        pass
+
+    sequencer = UserDataSequencer(on_order=on_order, on_balances=lambda account_position: None)
+
+    async def fill():
+        sequencer.post(report)
+        sequencer.post(account_position)
+
+        await sequencer.join()
+
+    return fill
@@ -0,0 +1,128 @@
+import asyncio
+import fnmatch
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+BenchmarkSetup = Callable[[], Union[Callable, Awaitable[Callable]]]
+
+BENCHMARKS: Dict[str, BenchmarkSetup] = {}
+
+# Release what the setup of the running benchmark created, in reverse order once it is timed
+TEARDOWNS: List[Callable[[], Any]] = []
+
+
+def benchmark(name: str):
+    # Registers a setup function returning the callable (sync or async) to time
+    def decorator(setup: BenchmarkSetup) -> BenchmarkSetup:
+        BENCHMARKS[name] = setup
+
+        return setup
+
+    return decorator
+
+
+def add_teardown(callback: Callable[[], Any]) -> None:
+    TEARDOWNS.append(callback)
+
+
+async def _time(func: Callable, number: int) -> float:
+    if asyncio.iscoroutinefunction(func):
+        start = perf_counter()
+
+        for _ in range(number):
+            await func()
+
+        return perf_counter() - start
+
+    start = perf_counter()
+
+    for _ in range(number):
+        func()
+
+    return perf_counter() - start
+
+
+async def measure(func: Callable, repeat: int = 5, min_time: float = 0.05) -> dict:
+    # Grow the loop count until one repeat is long enough to be timed reliably
+    number = 1
+
+    while (elapsed := await _time(func, number)) < min_time:
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = [await _time(func, number) / number for _ in range(repeat)]
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+
+async def run_benchmarks(pattern: str = "*", repeat: int = 5, min_time: float = 0.05) -> dict:
+    results = {}
+
+    for name, setup in sorted(BENCHMARKS.items()):
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+
+        try:
+            func = setup()
+
+            if asyncio.iscoroutine(func):
+                func = await func
+
+            results[name] = await measure(func, repeat=repeat, min_time=min_time)
+        finally:
+            while TEARDOWNS:
+                TEARDOWNS.pop()()
+
+        print(f"{name:<50} {results[name]['median'] * 1e6:>12.2f} us", file=sys.stderr)
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.2) -> dict:
+    comparison = {}
+
+    for name, result in report["results"].items():
+        baseline_result = baseline["results"].get(name)
+
+        if not baseline_result:
+            continue
+
+        ratio = result["median"] / baseline_result["median"]
+
+        comparison[name] = {
+            "baseline": baseline_result["median"],
+            "current": result["median"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        }
+
+    return comparison
+
+
+def load_report(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def save_report(path: Path, report: dict) -> None:
+    with open(path, "w") as fd:
+        json.dump(report, fd, indent=2)
@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from analyst.bot.strategies.base import Strategy
+from analyst.controllers.binance import BinanceController
+from analyst.crypto.models import Order
+
+FIXTURE_DIR = Path("tests", "fixture_data")
+
+MINUTE_MS = 60_000
+
+
+def load_fixture(name: str):
+    with open(FIXTURE_DIR / f"{name}.json") as fd:
+        return json.load(fd)
+
+
+class FixtureBinanceAdapter:
+    # Serves the fixture data in place of the exchange
+    def __init__(self):
+        self.account_info = load_fixture("account_info")
+        self.exchange_info = load_fixture("exchange_info")
+        self.prices = load_fixture("pairs_prices")
+
+    async def get_account_info(self):
+        return self.account_info
+
+    async def get_exchange_info(self):
+        return self.exchange_info
+
+    async def get_prices(self):
+        return self.prices
+
+    async def get_order_book(self, symbol: str, limit=None):
+        return forge_depth(limit or 100)
+
+
+class InMemoryMongoController:
+    def __init__(self):
+        self.orders: Dict[UUID, Order] = {}
+        self.strategies: Dict[UUID, Strategy] = {}
+
+    async def store_order(self, order: Order, strategy: Optional[Strategy] = None) -> Order:
+        if strategy:
+            order.strategy_id = strategy.id
+
+        self.orders[order.internal_id] = order
+
+        return order
+
+    async def update_order(self, order: Order, strategy: Optional[Strategy] = None) -> Order:
+        return await self.store_order(order, strategy)
+
+    async def update_orders(self, orders: List[Order]) -> List[Order]:
+        for order in orders:
+            await self.store_order(order)
+
+        return orders
+
+    async def store_strategy(self, strategy: Strategy) -> Strategy:
+        self.strategies[strategy.id] = strategy
+
+        return strategy
+
+    async def update_strategy(self, strategy: Strategy) -> Strategy:
+        return await self.store_strategy(strategy)
+
+
+def get_fixture_controllers() -> SimpleNamespace:
+    adapters = SimpleNamespace(binance=FixtureBinanceAdapter(), public_cache=None, kline_store=None)
+
+    return SimpleNamespace(binance=BinanceController(adapters=adapters), mongo=InMemoryMongoController())
+
+
+def forge_klines(count: int, start: datetime = datetime(2022, 1, 1), interval_ms: int = MINUTE_MS):
+    start_time = int(start.timestamp()) * 1000
+
+    return [
+        [
+            start_time + index * interval_ms,
+            "0.00001234",
+            "0.00001240",
+            "0.00001230",
+            "0.00001238",
+            "152340.00000000",
+            start_time + (index + 1) * interval_ms - 1,
+            "1.88543120",
+            index % 97,
+            "76170.00000000",
+            "0.94271560",
+            "0",
+        ]
+        for index in range(count)
+    ]
+
+
+def forge_depth(levels: int, last_update_id: int = 1000) -> Dict:
+    return {
+        "lastUpdateId": last_update_id,
+        "bids": [[f"{0.07 - index * 1e-5:.8f}", f"{1 + index % 7}.00000000"] for index in range(levels)],
+        "asks": [
+            [f"{0.07001 + index * 1e-5:.8f}", f"{1 + index % 5}.00000000"] for index in range(levels)
+        ],
+    }
@@ -1,7 +1,7 @@
 import asyncio
 from os import environ
 
-from analyst.adapters.factory import get_adapters
+from analyst.adapters.factory import close_adapters, get_adapters
 from analyst.adapters.local_file import LocalFileAdapter
 from analyst.settings import get_settings
 
@@ -43,6 +43,8 @@ async def main():
 
     print("Pair prices: OK")
 
+    await close_adapters(a)
+
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from aiohttp import web
+from pytest import fixture
+
+from analyst.adapters.binance import BinanceAdapter
+from analyst.settings import SimulatorSettings
+from analyst.simulator.server import SimulatorServer
+
+MINUTE_MS = 60_000
+LISTING_TIME = int(datetime(2022, 1, 1).timestamp()) * 1000
+
+
+def forge_kline(open_time):
+    return [open_time, "1.0", "2.0", "0.5", "1.5", "10.0", open_time + MINUTE_MS - 1, "15.0", 3]
+
+
+@fixture(scope="function")
+def scripted_responses():
+    return []
+
+
+@fixture(scope="function")
+def received_requests():
+    return []
+
+
+@fixture(scope="function")
+async def binance_server(scripted_responses, received_requests):
+    async def server_time(request):
+        return web.json_response({"serverTime": 1660000000000}, headers={"x-mbx-used-weight-1m": "1"})
+
+    async def klines(request):
+        start_time = max(int(request.query["startTime"]), LISTING_TIME)
+        end_time = int(request.query["endTime"])
+        limit = int(request.query["limit"])
+
+        first_open_time = start_time + (-start_time % MINUTE_MS)
+
+        return web.json_response(
+            [
+                forge_kline(open_time)
+                for open_time in range(first_open_time, end_time + 1, MINUTE_MS)[:limit]
+            ]
+        )
+
+    async def scripted(request):
+        received_requests.append((request.method, request.path, dict(request.query)))
+
+        status, data, headers = scripted_responses.pop(0)
+
+        return web.json_response(data, status=status, headers=headers)
+
+    app = web.Application()
+    app.add_routes(
+        [
+            web.get("/api/v3/time", server_time),
+            web.get("/api/v3/klines", klines),
+            web.route("*", "/api/v3/scripted", scripted),
+            web.route("*", "/api/v3/order", scripted),
+            web.route("*", "/api/v3/order/cancelReplace", scripted),
+        ]
+    )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    site = web.TCPSite(runner, "localhost", 8089)
+    await site.start()
+
+    yield "http://localhost:8089"
+
+    await runner.cleanup()
+
+
+@fixture(scope="function")
+async def binance_adapter(settings, binance_server):
+    settings.binance.api_url = binance_server
+    settings.binance.retry_backoff = 0.01
+
+    adapter = BinanceAdapter(settings=settings.binance)
+    await adapter.setup()
+
+    yield adapter
+
+    await adapter.close()
+
+
+@fixture(scope="function")
+def simulator_settings():
+    return SimulatorSettings(port=8091, ticker_interval=0.05, seed=1)
+
+
+@fixture(scope="function")
+async def simulator(simulator_settings):
+    server = SimulatorServer(simulator_settings)
+    await server.start()
+
+    yield server
+
+    await server.stop()
+
+
+@fixture(scope="function")
+async def simulated_adapter(settings, simulator):
+    settings.binance.api_url = f"http://localhost:{simulator.settings.port}"
+    settings.binance.stream_url = f"ws://localhost:{simulator.settings.port}/stream"
+    settings.binance.max_retries = 0
+
+    adapter = BinanceAdapter(settings=settings.binance)
+    await adapter.setup()
+
+    yield adapter
+
+    await adapter.close()
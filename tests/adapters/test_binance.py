@@ -0,0 +1,341 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from time import monotonic
+from types import SimpleNamespace
+
+from pytest import mark, raises
+
+from analyst.controllers.binance import BinanceController
+from analyst.crypto.exceptions import BinanceAPIError, BinanceIPBanned, BinanceServerError
+from analyst.crypto.models import Order
+from analyst.repositories.utils import serialize_order_obj
+
+
+async def test_session_is_reused(binance_adapter):
+    session = await binance_adapter.get_session()
+
+    for _ in range(5):
+        await binance_adapter.get_metadata()
+
+    assert await binance_adapter.get_session() is session
+    assert binance_adapter.metrics.requests == 5
+    assert binance_adapter.metrics.new_connections == 1
+    assert binance_adapter.metrics.reused_connections == 4
+
+
+async def test_session_is_recreated_after_close(binance_adapter):
+    await binance_adapter.get_metadata()
+    await binance_adapter.close()
+
+    metadata = await binance_adapter.get_metadata()
+
+    assert metadata.weights.amount_1m == 1
+    assert binance_adapter.metrics.sessions_created == 2
+
+
+@mark.parametrize("page_workers", [1, 4])
+async def test_get_historical_klines_pages(binance_adapter, page_workers):
+    df = await binance_adapter.get_historical_klines(
+        "BTCUSDT",
+        interval="1m",
+        start_datetime=datetime(2021, 12, 31),
+        end_datetime=datetime(2022, 1, 1) + timedelta(minutes=3500),
+        page_workers=page_workers,
+    )
+
+    assert len(df) == 3500
+    assert df.index.is_monotonic_increasing
+    assert df.index.is_unique
+    assert binance_adapter.metrics.requests == 4
+
+
+async def test_concurrent_reads_are_coalesced(binance_adapter):
+    await asyncio.gather(*[binance_adapter.get_metadata() for _ in range(5)])
+
+    assert binance_adapter.metrics.requests == 1
+    assert binance_adapter.single_flight.metrics.calls == 1
+    assert binance_adapter.single_flight.metrics.coalesced == 4
+
+
+async def test_single_flight_can_be_disabled(binance_adapter):
+    binance_adapter.settings.single_flight_scope = "none"
+
+    await asyncio.gather(*[binance_adapter.get_metadata() for _ in range(5)])
+
+    assert binance_adapter.metrics.requests == 5
+    assert binance_adapter.single_flight.metrics.coalesced == 0
+
+
+def test_single_flight_key(binance_adapter):
+    params = {"symbol": "BTCUSDT"}
+
+    # Signed reads are not shared by default
+    assert (
+        binance_adapter._get_single_flight_key("GET", "/api/v3/order", signed=True, params=params) is None
+    )
+    assert binance_adapter._get_single_flight_key("GET", "/api/v3/exchangeInfo") is not None
+
+    binance_adapter.settings.single_flight_scope = "reads"
+
+    assert binance_adapter._get_single_flight_key("GET", "/api/v3/order", signed=True, params=params) == (
+        "GET",
+        "/api/v3/order",
+        (("symbol", "BTCUSDT"),),
+    )
+    assert (
+        binance_adapter._get_single_flight_key("POST", "/api/v3/order", signed=True, params=params)
+        is None
+    )
+
+
+async def test_rate_limited_request_is_retried_after_pause(binance_adapter, scripted_responses):
+    scripted_responses.extend(
+        [
+            (429, {"code": -1003, "msg": "Too many requests"}, {"Retry-After": "1"}),
+            (200, {"ok": True}, {}),
+        ]
+    )
+
+    start_time = monotonic()
+
+    assert await binance_adapter._request("POST", "/api/v3/scripted") == {"ok": True}
+    assert monotonic() - start_time >= 1
+    assert binance_adapter.metrics.rate_limited == 1
+    assert binance_adapter.rate_limiter.metrics.pauses == 1
+
+
+async def test_ban_above_max_retry_after_is_raised(binance_adapter, scripted_responses):
+    scripted_responses.append(
+        (418, {"code": -1003, "msg": "Way too many requests"}, {"Retry-After": "120"})
+    )
+
+    with raises(BinanceIPBanned) as exc_info:
+        await binance_adapter._request("GET", "/api/v3/scripted")
+
+    assert exc_info.value.retry_after == 120
+    assert binance_adapter.rate_limiter.get_wait_time(1) > 60
+
+
+async def test_server_error_is_retried_for_reads_only(binance_adapter, scripted_responses):
+    scripted_responses.extend([(503, {}, {}), (502, None, {}), (200, [1, 2], {})])
+
+    assert await binance_adapter._request("GET", "/api/v3/scripted") == [1, 2]
+    assert binance_adapter.metrics.retries == 2
+
+    scripted_responses.extend([(503, {"code": -1000, "msg": "Unknown status"}, {})])
+
+    with raises(BinanceServerError):
+        await binance_adapter._request("POST", "/api/v3/scripted")
+
+    assert binance_adapter.metrics.server_errors == 3
+
+
+async def test_api_error(binance_adapter, scripted_responses):
+    scripted_responses.append(
+        (400, {"code": -2010, "msg": "Order would immediately match and take."}, {})
+    )
+
+    with raises(BinanceAPIError) as exc_info:
+        await binance_adapter._request("POST", "/api/v3/scripted")
+
+    assert exc_info.value.code == -2010
+    assert binance_adapter.metrics.retries == 0
+
+
+async def test_order_built_from_full_response(binance_adapter, scripted_responses, received_requests):
+    scripted_responses.append(
+        (
+            200,
+            {
+                "symbol": "BTCUSDT",
+                "orderId": 28,
+                "orderListId": -1,
+                "clientOrderId": "6gCrw2kRUAF9CvJDGP16IP",
+                "transactTime": 1507725176595,
+                "price": "0.00000000",
+                "origQty": "10.00000000",
+                "executedQty": "10.00000000",
+                "cummulativeQuoteQty": "10.00000000",
+                "status": "FILLED",
+                "timeInForce": "GTC",
+                "type": "MARKET",
+                "side": "SELL",
+                "fills": [
+                    {
+                        "price": "4000.00000000",
+                        "qty": "1.00000000",
+                        "commission": "4.00000000",
+                        "commissionAsset": "USDT",
+                        "tradeId": 56,
+                    },
+                    {
+                        "price": "3999.00000000",
+                        "qty": "9.00000000",
+                        "commission": "35.99100000",
+                        "commissionAsset": "USDT",
+                        "tradeId": 57,
+                    },
+                ],
+            },
+            {},
+        )
+    )
+
+    data = await binance_adapter.create_order("BTCUSDT", "SELL", "MARKET", quantity=10, real=True)
+    order = Order.from_response(data)
+
+    assert received_requests[0][2]["newOrderRespType"] == "FULL"
+    assert order.id == 28
+    assert order.is_filled()
+    assert order.created_at == order.updated_at
+    assert [fill.quantity for fill in order.fills] == [Decimal("1"), Decimal("9")]
+    assert serialize_order_obj(order.dict())["fills"][1]["price"] == 3999.0
+
+
+async def test_order_built_from_cancel_response(binance_adapter, scripted_responses):
+    created_at = datetime(2022, 1, 1)
+
+    scripted_responses.append(
+        (
+            200,
+            {
+                "symbol": "LTCBTC",
+                "origClientOrderId": "myOrder1",
+                "orderId": 4,
+                "orderListId": -1,
+                "clientOrderId": "cancelMyOrder1",
+                "transactTime": 1684804350068,
+                "price": "2.00000000",
+                "origQty": "1.00000000",
+                "executedQty": "0.00000000",
+                "cummulativeQuoteQty": "0.00000000",
+                "status": "CANCELED",
+                "timeInForce": "GTC",
+                "type": "LIMIT",
+                "side": "BUY",
+            },
+            {},
+        )
+    )
+
+    data = await binance_adapter.cancel_order("LTCBTC", 4)
+    order = Order.from_response(data, created_at=created_at)
+
+    assert order.is_cancelled()
+    assert order.created_at == created_at
+    assert order.updated_at > created_at
+
+    del data["transactTime"]
+
+    assert Order.from_response(data) is None
+
+
+def forge_order_response(order_id, status, price="2.00000000", quantity="1.00000000"):
+    return {
+        "symbol": "LTCBTC",
+        "orderId": order_id,
+        "transactTime": 1684804350068,
+        "price": price,
+        "origQty": quantity,
+        "executedQty": "0.00000000",
+        "status": status,
+        "timeInForce": "GTC",
+        "type": "LIMIT_MAKER",
+        "side": "BUY",
+    }
+
+
+async def test_replace_order(binance_adapter, scripted_responses, received_requests):
+    binance_controller = BinanceController(adapters=SimpleNamespace(binance=binance_adapter))
+    order = Order.from_response(forge_order_response(4, "NEW"))
+
+    scripted_responses.append(
+        (
+            200,
+            {
+                "cancelResult": "SUCCESS",
+                "newOrderResult": "SUCCESS",
+                "cancelResponse": forge_order_response(4, "CANCELED"),
+                "newOrderResponse": forge_order_response(5, "NEW", price="1.90000000"),
+            },
+            {},
+        )
+    )
+
+    cancelled_order, new_order = await binance_controller.replace_order(
+        order, type="LIMIT_MAKER", price="1.9", quantity=1
+    )
+
+    assert received_requests[0][2]["cancelOrderId"] == "4"
+    assert received_requests[0][2]["cancelReplaceMode"] == "STOP_ON_FAILURE"
+    assert cancelled_order.is_cancelled()
+    assert new_order.id == 5
+    assert new_order.price == Decimal("1.9")
+
+
+async def test_replace_order_new_order_failure(binance_adapter, scripted_responses):
+    binance_controller = BinanceController(adapters=SimpleNamespace(binance=binance_adapter))
+    order = Order.from_response(forge_order_response(4, "NEW"))
+
+    scripted_responses.append(
+        (
+            400,
+            {
+                "code": -2021,
+                "msg": "Order cancel-replace partially failed.",
+                "data": {
+                    "cancelResult": "SUCCESS",
+                    "newOrderResult": "FAILURE",
+                    "cancelResponse": forge_order_response(4, "CANCELED"),
+                    "newOrderResponse": {"code": -2010, "msg": "Order would immediately match and take."},
+                },
+            },
+            {},
+        )
+    )
+
+    cancelled_order, new_order = await binance_controller.replace_order(
+        order, type="LIMIT_MAKER", price="2.1", quantity=1
+    )
+
+    assert cancelled_order.is_cancelled()
+    assert new_order is None
+
+    scripted_responses.append(
+        (
+            400,
+            {
+                "code": -2022,
+                "msg": "Order cancel-replace failed.",
+                "data": {
+                    "cancelResult": "FAILURE",
+                    "newOrderResult": "NOT_ATTEMPTED",
+                    "cancelResponse": {"code": -2011, "msg": "Unknown order sent."},
+                    "newOrderResponse": None,
+                },
+            },
+            {},
+        )
+    )
+
+    # Filled before the cancel, its final state is fetched
+    scripted_responses.append(
+        (
+            200,
+            {
+                **forge_order_response(4, "FILLED"),
+                "stopPrice": "0.00000000",
+                "time": 1684804350068,
+                "updateTime": 1684804350068,
+            },
+            {},
+        )
+    )
+
+    cancelled_order, new_order = await binance_controller.replace_order(
+        order, type="LIMIT_MAKER", price="2.1", quantity=1
+    )
+
+    assert cancelled_order.is_filled()
+    assert new_order is None
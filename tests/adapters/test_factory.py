@@ -0,0 +1,21 @@
+from analyst.adapters.factory import close_adapters, get_adapters
+from analyst.adapters.kline_store import KlineStoreAdapter
+from analyst.adapters.public_cache import PublicCacheAdapter
+
+
+async def test_get_adapters_with_default_caches(settings, simulator, tmp_path):
+    # Both are disabled for the other tests
+    settings.use_public_cache = True
+    settings.use_kline_store = True
+    settings.file_cache_dir = tmp_path / "files"
+    settings.kline_store_dir = tmp_path / "klines"
+    settings.binance.api_url = f"http://localhost:{simulator.settings.port}"
+
+    adapters = await get_adapters(settings=settings)
+
+    try:
+        assert isinstance(adapters.public_cache, PublicCacheAdapter)
+        assert isinstance(adapters.kline_store, KlineStoreAdapter)
+        assert adapters.public_cache.ttls["prices"] == settings.binance.prices_cache_ttl
+    finally:
+        await close_adapters(adapters)
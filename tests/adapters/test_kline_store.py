@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from pytest import fixture
+
+from analyst.adapters.kline_store import KlineStoreAdapter, merge_ranges, subtract_ranges
+from analyst.adapters.klines import klines_to_columns
+from analyst.controllers.binance import BinanceController
+from tests.adapters.conftest import LISTING_TIME, MINUTE_MS, forge_kline
+
+
+@fixture(scope="function")
+def kline_store(tmp_path):
+    return KlineStoreAdapter(dir_path=tmp_path)
+
+
+@fixture(scope="function")
+def binance_controller(binance_adapter, kline_store):
+    return BinanceController(adapters=SimpleNamespace(binance=binance_adapter, kline_store=kline_store))
+
+
+def forge_columns(start_time, count):
+    return klines_to_columns([forge_kline(start_time + i * MINUTE_MS) for i in range(count)])
+
+
+def test_ranges():
+    assert merge_ranges([(10, 20), (0, 5), (6, 8), (15, 30), (40, 50)]) == [(0, 8), (10, 30), (40, 50)]
+
+    assert subtract_ranges(0, 100, []) == [(0, 100)]
+    assert subtract_ranges(0, 100, [(20, 30), (50, 60)]) == [(0, 19), (31, 49), (61, 100)]
+    assert subtract_ranges(25, 55, [(20, 30), (50, 60)]) == [(31, 49)]
+    assert subtract_ranges(0, 100, [(0, 200)]) == []
+
+
+def test_append_and_read(kline_store):
+    start_time = LISTING_TIME
+
+    kline_store.append(
+        "BTCUSDT", "1m", forge_columns(start_time, 100), start_time, start_time + 99 * MINUTE_MS
+    )
+
+    assert kline_store.get_ranges("BTCUSDT", "1m") == [(start_time, start_time + 99 * MINUTE_MS)]
+    assert kline_store.get_missing_ranges("BTCUSDT", "1m", start_time, start_time + 199 * MINUTE_MS) == [
+        (start_time + 99 * MINUTE_MS + 1, start_time + 199 * MINUTE_MS)
+    ]
+
+    columns = kline_store.read("BTCUSDT", "1m", start_time + 10 * MINUTE_MS, start_time + 19 * MINUTE_MS)
+
+    assert len(columns["open_time"]) == 10
+    assert columns["open_time"][0] == start_time + 10 * MINUTE_MS
+    assert columns["close"].dtype == np.float64
+
+    reopened_store = KlineStoreAdapter(dir_path=kline_store.dir_path)
+
+    assert reopened_store.get_ranges("BTCUSDT", "1m") == kline_store.get_ranges("BTCUSDT", "1m")
+    assert len(reopened_store.read("BTCUSDT", "1m", start_time)["open_time"]) == 100
+
+
+def test_compaction(kline_store):
+    kline_store.max_segments = 4
+
+    for i in range(10):
+        start_time = LISTING_TIME + i * 10 * MINUTE_MS
+
+        end_time = start_time + 10 * MINUTE_MS - 1
+
+        kline_store.append("BTCUSDT", "1m", forge_columns(start_time, 10), start_time, end_time)
+
+    columns = kline_store.read("BTCUSDT", "1m", LISTING_TIME)
+
+    assert len(list(kline_store._get_dir("BTCUSDT", "1m").glob("*.npz"))) <= 4
+    assert kline_store.get_ranges("BTCUSDT", "1m") == [(LISTING_TIME, LISTING_TIME + 100 * MINUTE_MS - 1)]
+    assert np.array_equal(columns["open_time"], forge_columns(LISTING_TIME, 100)["open_time"])
+
+
+async def test_get_klines_fills_gaps_only(binance_controller, binance_adapter, kline_store):
+    start_datetime = datetime(2022, 1, 2)
+
+    df = await binance_controller.get_klines(
+        "BTCUSDT",
+        interval="1m",
+        start_datetime=start_datetime,
+        end_datetime=start_datetime + timedelta(hours=10),
+    )
+
+    assert len(df) == 601
+    assert binance_adapter.metrics.requests == 1
+
+    df = await binance_controller.get_klines(
+        "BTCUSDT",
+        interval="1m",
+        start_datetime=start_datetime - timedelta(hours=1),
+        end_datetime=start_datetime + timedelta(hours=20),
+    )
+
+    assert len(df) == 1261
+    assert df.index.is_monotonic_increasing
+    assert df.index.is_unique
+    assert binance_adapter.metrics.requests == 3
+
+    df = await binance_controller.get_klines(
+        "BTCUSDT",
+        interval="1m",
+        start_datetime=start_datetime,
+        end_datetime=start_datetime + timedelta(hours=5),
+    )
+
+    assert len(df) == 301
+    assert binance_adapter.metrics.requests == 3
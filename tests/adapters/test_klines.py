@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from pandas import DataFrame, DatetimeIndex
+
+from analyst.adapters.klines import klines_to_columns, klines_to_dataframe
+from tests.utils import equal_dataframes
+
+HOUR_MS = 3600 * 1000
+START_TIME = int(datetime(2022, 3, 20).timestamp()) * 1000
+
+
+def forge_klines(count, interval_ms=HOUR_MS):
+    return [
+        [
+            START_TIME + index * interval_ms,
+            f"{index}.1",
+            f"{index}.2",
+            f"{index}.3",
+            f"{index}.4",
+            f"{index * 10}.5",
+            START_TIME + (index + 1) * interval_ms - 1,
+            "123.4",
+            index * 3,
+        ]
+        for index in range(count)
+    ]
+
+
+def rowwise_klines_to_dataframe(klines, interval):
+    df = DataFrame(
+        [
+            {
+                "timestamp": datetime.fromtimestamp((kline_data[6] + 1) / 1000),
+                "open": float(kline_data[1]),
+                "high": float(kline_data[2]),
+                "low": float(kline_data[3]),
+                "close": float(kline_data[4]),
+                "volumes": float(kline_data[5]),
+                "trades": kline_data[8],
+            }
+            for kline_data in klines
+        ]
+    )
+
+    if not df.empty:
+        df["timestamp"] = DatetimeIndex(df["timestamp"])
+        df.set_index("timestamp", inplace=True)
+
+        if interval == "1d":
+            df = df.resample("D").mean()
+            df.index.freq = None
+
+    return df
+
+
+def test_klines_to_columns():
+    columns = klines_to_columns(forge_klines(3))
+
+    assert list(columns["trades"]) == [0, 3, 6]
+    assert list(columns["close"]) == [0.4, 1.4, 2.4]
+    assert columns["open_time"][1] - columns["open_time"][0] == HOUR_MS
+
+
+def test_klines_to_dataframe_matches_rowwise_decoding():
+    klines = forge_klines(24 * 20)
+
+    assert equal_dataframes(klines_to_dataframe(klines, "1h"), rowwise_klines_to_dataframe(klines, "1h"))
+
+
+def test_klines_to_dataframe_daily_resample():
+    klines = forge_klines(20, interval_ms=24 * HOUR_MS)
+
+    assert equal_dataframes(klines_to_dataframe(klines, "1d"), rowwise_klines_to_dataframe(klines, "1d"))
+
+
+def test_klines_to_dataframe_empty():
+    assert klines_to_dataframe([], "1h").empty
@@ -0,0 +1,287 @@
+import asyncio
+import json
+from time import monotonic
+
+from pytest import fixture
+
+from analyst.adapters.market_stream_pool import BinanceMarketStreamPool
+
+STREAMS = ["ethbtc@ticker", "ltcbtc@ticker", "bnbbtc@ticker", "bnbeth@ticker", "btcusdt@ticker"]
+
+
+@fixture(scope="function")
+async def market_stream_pool(settings, simulator):
+    settings.binance.stream_url = f"ws://localhost:{simulator.settings.port}/stream"
+    settings.binance.market_streams_per_connection = 2
+    settings.binance.market_max_connections = 3
+    settings.binance.market_reconnect_backoff = 0.01
+
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+
+    yield pool
+
+    await pool.close()
+
+
+async def get_server_subscriptions(simulator):
+    # Let the server process the subscription frames
+    await asyncio.sleep(0.1)
+
+    return sorted(sorted(subscriptions) for subscriptions in simulator.market_sessions.values())
+
+
+async def receive_streams(pool, count):
+    streams = set()
+
+    async for data in pool.listen():
+        if "stream" in data:
+            streams.add(data["stream"])
+
+        if len(streams) == count:
+            return streams
+
+
+async def test_subscriptions_are_sharded(market_stream_pool, simulator):
+    await market_stream_pool.subscribe(STREAMS[:4])
+
+    assert market_stream_pool.subscriptions == set(STREAMS[:4])
+    assert [shard.load for shard in market_stream_pool.shards] == [2, 2]
+
+    await market_stream_pool.open()
+
+    assert await get_server_subscriptions(simulator) == [
+        sorted(shard.subscriptions) for shard in market_stream_pool.shards
+    ]
+
+
+async def test_streams_over_capacity_are_dropped(market_stream_pool):
+    await market_stream_pool.subscribe(STREAMS + ["adabtc@ticker", "adabnb@ticker"])
+
+    assert len(market_stream_pool.shards) == 3
+    assert len(market_stream_pool.subscriptions) == 6
+    assert market_stream_pool.metrics.dropped_streams == 1
+
+
+async def test_shards_are_merged_into_one_iterator(market_stream_pool):
+    await market_stream_pool.subscribe(STREAMS[:3])
+
+    streams = await asyncio.wait_for(receive_streams(market_stream_pool, 3), timeout=2)
+
+    assert streams == set(STREAMS[:3])
+    assert len(market_stream_pool.shards) == 2
+
+
+async def test_unsubscribe_rebalances_shards(market_stream_pool, simulator):
+    await market_stream_pool.open()
+    await market_stream_pool.subscribe(STREAMS)
+
+    assert len(await get_server_subscriptions(simulator)) == 3
+
+    await market_stream_pool.unsubscribe(STREAMS[1:4])
+
+    assert market_stream_pool.subscriptions == {STREAMS[0], STREAMS[4]}
+    assert len(market_stream_pool.shards) == 1
+    assert await get_server_subscriptions(simulator) == [sorted([STREAMS[0], STREAMS[4]])]
+
+
+async def test_shards_reopen_independently(market_stream_pool, simulator):
+    reopened = []
+
+    async def on_reopen():
+        reopened.append(True)
+
+    await market_stream_pool.subscribe(STREAMS[:3])
+
+    market_stream_pool.on_reopen = on_reopen
+    await market_stream_pool.open()
+
+    first_shard, second_shard = market_stream_pool.shards
+    second_session = second_shard.session
+
+    await get_server_subscriptions(simulator)
+
+    for session, subscriptions in list(simulator.market_sessions.items()):
+        if subscriptions == first_shard.subscriptions:
+            await session.close()
+
+    await asyncio.sleep(0.3)
+
+    assert reopened == [True]
+    assert market_stream_pool.metrics.reopens == 1
+    assert second_shard.session is second_session
+    assert await get_server_subscriptions(simulator) == [
+        sorted(shard.subscriptions) for shard in market_stream_pool.shards
+    ]
+
+
+async def test_subscriptions_are_reference_counted(market_stream_pool, simulator):
+    await market_stream_pool.open()
+    await market_stream_pool.subscribe([STREAMS[0], STREAMS[0], STREAMS[1]])
+
+    await market_stream_pool.unsubscribe([STREAMS[0]])
+
+    assert market_stream_pool.subscriptions == {STREAMS[0], STREAMS[1]}
+    assert await get_server_subscriptions(simulator) == [sorted(STREAMS[:2])]
+
+    await market_stream_pool.unsubscribe([STREAMS[0], STREAMS[2]])
+
+    assert market_stream_pool.subscriptions == {STREAMS[1]}
+    assert await get_server_subscriptions(simulator) == [[STREAMS[1]]]
+
+
+async def test_concurrent_subscriptions_are_batched(settings, market_stream_pool, simulator):
+    settings.binance.market_streams_per_connection = 100
+    settings.binance.market_control_messages_per_second = 2
+
+    streams = [f"stream{i}@ticker" for i in range(20)]
+    sent_ids = []
+
+    async def send(session, data):
+        sent_ids.append(data["id"])
+
+        await session.send(json.dumps(data))
+
+    market_stream_pool.send = send
+
+    await market_stream_pool.open()
+    await asyncio.gather(*[market_stream_pool.subscribe([stream]) for stream in streams])
+
+    # The first frame goes out right away, subscriptions made meanwhile are sent together
+    assert market_stream_pool.metrics.control_frames == 2
+    assert market_stream_pool.metrics.acknowledged == 2
+    assert len(set(sent_ids)) == len(sent_ids) == 2
+    assert await get_server_subscriptions(simulator) == [sorted(streams)]
+    assert market_stream_pool.metrics.reopens == 0
+
+
+async def test_request_errors_are_counted(market_stream_pool):
+    await market_stream_pool.open()
+
+    await market_stream_pool._request(market_stream_pool.shards[0], "UNKNOWN", [])
+
+    assert market_stream_pool.metrics.request_errors == 1
+    assert not market_stream_pool.shards[0].requests
+
+
+async def test_control_frames_are_rate_limited(settings, market_stream_pool):
+    settings.binance.market_streams_per_connection = 10
+    settings.binance.market_control_messages_per_second = 2
+
+    await market_stream_pool.open()
+
+    start = monotonic()
+
+    for stream in STREAMS[:3]:
+        await market_stream_pool.subscribe([stream])
+
+    assert monotonic() - start >= 0.4
+    assert market_stream_pool.metrics.control_frames == 3
+
+
+async def test_concurrent_subscriptions_open_one_connection(settings, market_stream_pool, simulator):
+    settings.binance.market_min_connections = 0
+
+    await market_stream_pool.open()
+
+    await asyncio.gather(
+        market_stream_pool.subscribe(STREAMS[:1]), market_stream_pool.subscribe(STREAMS[1:2])
+    )
+
+    assert market_stream_pool.metrics.connections == 1
+    assert len(market_stream_pool.shards) == 1
+    assert await get_server_subscriptions(simulator) == [sorted(STREAMS[:2])]
+
+
+async def test_stalled_connections_are_reopened(settings, market_stream_pool, simulator):
+    settings.binance.market_health_check_interval = 0.05
+    settings.binance.market_connection_stale_after = 0.2
+
+    await market_stream_pool.subscribe(STREAMS[:2])
+    await market_stream_pool.open()
+
+    await get_server_subscriptions(simulator)
+
+    # The server keeps streaming but stops answering pings
+    simulator.settings.stream_pongs = False
+
+    try:
+        while not market_stream_pool.metrics.stalls:
+            await asyncio.sleep(0.05)
+    finally:
+        simulator.settings.stream_pongs = True
+
+    await asyncio.sleep(0.2)
+
+    assert market_stream_pool.metrics.stalls == 1
+    assert market_stream_pool.metrics.reopens == 1
+    assert market_stream_pool.metrics.missed_pongs >= 1
+    assert await get_server_subscriptions(simulator) == [sorted(STREAMS[:2])]
+
+
+async def test_silent_connections_are_kept(settings, market_stream_pool, simulator):
+    settings.binance.market_health_check_interval = 0.05
+    settings.binance.market_connection_stale_after = 0.2
+    settings.binance.market_stale_after = {"ticker": 0.2}
+
+    await market_stream_pool.subscribe(STREAMS[:2])
+    await market_stream_pool.open()
+
+    await get_server_subscriptions(simulator)
+
+    # Illiquid streams: the server keeps answering pings but stops streaming
+    for subscriptions in simulator.market_sessions.values():
+        subscriptions.clear()
+
+    await asyncio.sleep(0.5)
+
+    assert market_stream_pool.metrics.stalls == 0
+    assert market_stream_pool.metrics.reopens == 0
+    assert market_stream_pool.stale_streams == set(STREAMS[:2])
+
+
+async def test_ping_round_trip_is_measured(settings, market_stream_pool):
+    settings.binance.market_health_check_interval = 0.05
+
+    await market_stream_pool.subscribe(STREAMS[:3])
+    await market_stream_pool.open()
+
+    # Pings wait behind the subscriptions in the control limiter
+    await asyncio.sleep(0.5)
+
+    for shard in market_stream_pool.shards:
+        assert 0 < shard.rtt < 0.05
+        # The subscription and the pings
+        assert shard.limiter.metrics.acquired >= 2
+
+    assert market_stream_pool.metrics.missed_pongs == 0
+
+
+async def test_stale_streams_are_notified(settings, market_stream_pool, simulator):
+    settings.binance.market_health_check_interval = 0.05
+    settings.binance.market_stale_after = {"ticker": 0.2}
+
+    notifications = []
+
+    await market_stream_pool.subscribe(STREAMS[:2])
+
+    market_stream_pool.on_stale = lambda stream, stale: notifications.append((stream, stale))
+    await market_stream_pool.open()
+
+    await get_server_subscriptions(simulator)
+
+    for subscriptions in simulator.market_sessions.values():
+        subscriptions.discard(STREAMS[0])
+
+    await asyncio.sleep(0.4)
+
+    assert notifications == [(STREAMS[0], True)]
+    assert market_stream_pool.stale_streams == {STREAMS[0]}
+
+    for subscriptions in simulator.market_sessions.values():
+        subscriptions.add(STREAMS[0])
+
+    await asyncio.sleep(0.2)
+
+    assert notifications == [(STREAMS[0], True), (STREAMS[0], False)]
+    assert not market_stream_pool.stale_streams
+    assert market_stream_pool.metrics.stalls == 0
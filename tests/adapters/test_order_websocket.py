@@ -0,0 +1,145 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+from pytest import fixture, raises
+
+from analyst.adapters.binance import BinanceWebSocketConnectionClosed
+from analyst.adapters.order_websocket import BinanceOrderWebSocketAdapter
+from analyst.controllers.binance import BinanceController
+from analyst.crypto.exceptions import BinanceAPIError, BinanceRateLimited
+
+
+@fixture(scope="function")
+async def orders_websocket(settings, simulated_adapter, simulator):
+    settings.binance.ws_api_url = f"ws://localhost:{simulator.settings.port}/ws-api/v3"
+
+    adapter = BinanceOrderWebSocketAdapter(settings.binance, rate_limiter=simulated_adapter.rate_limiter)
+
+    yield adapter
+
+    await adapter.close()
+
+
+@fixture(scope="function")
+def orders_controller(simulated_adapter, orders_websocket):
+    return BinanceController(
+        adapters=SimpleNamespace(binance=simulated_adapter, binance_orders_websocket=orders_websocket)
+    )
+
+
+async def test_orders_over_websocket(orders_controller, orders_websocket, simulator):
+    order = await orders_controller.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    assert order.status == "FILLED"
+    assert order.executed_quantity == 1
+
+    order = await orders_controller.create_order(
+        "ETHBTC", "BUY", "LIMIT", quantity=1.0, price=Decimal("0.05"), time_in_force="GTC"
+    )
+
+    assert order.status == "NEW"
+
+    cancelled_order, new_order = await orders_controller.replace_order(
+        order, "LIMIT", quantity=1.0, price=Decimal("0.04"), time_in_force="GTC"
+    )
+
+    assert cancelled_order.status == "CANCELED"
+    assert new_order.status == "NEW"
+
+    assert (await orders_controller.cancel_order(new_order)).status == "CANCELED"
+
+    await orders_controller.create_test_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    # Everything went through the same connection, not the REST API
+    assert orders_websocket.metrics.connections == 1
+    assert orders_websocket.metrics.requests == 5
+    assert orders_controller.adapters.binance.metrics.requests == 0
+
+
+async def test_requests_are_multiplexed(orders_websocket, simulator):
+    # Jitter makes the simulator answer out of order
+    simulator.settings.latency_jitter = 0.05
+
+    prices = [Decimal("0.05") - i * Decimal("0.0001") for i in range(20)]
+
+    responses = await asyncio.gather(
+        *[
+            orders_websocket.create_order(
+                "ETHBTC",
+                "BUY",
+                "LIMIT",
+                real=True,
+                quantity=1.0,
+                price=price,
+                time_in_force="GTC",
+            )
+            for price in prices
+        ]
+    )
+
+    assert [Decimal(response["price"]) for response in responses] == prices
+    assert orders_websocket.metrics.connections == 1
+    assert not orders_websocket.requests
+
+
+async def test_errors(orders_websocket, simulator):
+    with raises(BinanceAPIError) as exc_info:
+        await orders_websocket.create_order("FAKEBTC", "BUY", "MARKET", real=True, quantity=1.0)
+
+    assert exc_info.value.status == 400
+    assert exc_info.value.code == -1121
+
+    simulator.settings.weight_limit = 0
+
+    with raises(BinanceRateLimited) as exc_info:
+        await orders_websocket.cancel_order("ETHBTC", 1)
+
+    assert exc_info.value.retry_after > 0
+    assert orders_websocket.rate_limiter.metrics.pauses == 1
+    assert orders_websocket.metrics.errors == 2
+
+
+async def test_requests_are_signed_once_budget_is_acquired(orders_websocket, simulator):
+    simulator.settings.recv_window = 500
+    simulator.settings.rate_limit_rate = 1.0
+
+    with raises(BinanceRateLimited):
+        await orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    simulator.settings.rate_limit_rate = 0.0
+
+    # Waits for the rate limiter pause before being stamped
+    await orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    assert orders_websocket.rate_limiter.metrics.waits == 1
+
+
+async def test_reconnect_and_timeout(settings, orders_websocket, simulator):
+    await orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    simulator.settings.latency = 0.2
+
+    request = asyncio.create_task(orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0))
+    await asyncio.sleep(0.05)
+
+    for session in list(simulator.ws_api_sessions):
+        await session.close()
+
+    # Never sent again, it may have been executed
+    with raises(BinanceWebSocketConnectionClosed):
+        await request
+
+    assert orders_websocket.metrics.lost_requests == 1
+
+    settings.binance.request_timeout = 0.1
+
+    with raises(asyncio.TimeoutError):
+        await orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    simulator.settings.latency = 0.0
+
+    await orders_websocket.create_order("ETHBTC", "BUY", "MARKET", quantity=1.0)
+
+    assert orders_websocket.metrics.connections == 2
+    assert orders_websocket.metrics.timeouts == 1
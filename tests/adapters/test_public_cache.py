@@ -0,0 +1,104 @@
+from pytest import fixture
+
+from analyst.adapters.local_file import LocalFileAdapter
+from analyst.adapters.public_cache import PublicCacheAdapter
+
+
+@fixture(scope="function")
+def local_file_adapter(tmp_path):
+    return LocalFileAdapter(dir_path=tmp_path)
+
+
+@fixture(scope="function")
+def clock(monkeypatch):
+    now = [1000.0]
+
+    monkeypatch.setattr("analyst.adapters.public_cache.time", lambda: now[0])
+
+    return now
+
+
+def get_fetcher(data):
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+
+        return data
+
+    return fetch, calls
+
+
+def get_public_cache(local_file_adapter):
+    return PublicCacheAdapter(cache=local_file_adapter, ttls={"exchange_info": 3600, "prices": 2})
+
+
+async def test_get_within_ttl(local_file_adapter, clock):
+    public_cache = get_public_cache(local_file_adapter)
+    fetch, calls = get_fetcher({"symbols": []})
+
+    for _ in range(3):
+        assert await public_cache.get("exchange_info", fetch) == {"symbols": []}
+
+    assert len(calls) == 1
+    assert public_cache.metrics.misses == 1
+    assert public_cache.metrics.memory_hits == 2
+
+
+async def test_per_name_ttl(local_file_adapter, clock):
+    public_cache = get_public_cache(local_file_adapter)
+    fetch_exchange_info, exchange_info_calls = get_fetcher({"symbols": []})
+    fetch_prices, prices_calls = get_fetcher([{"symbol": "BTCUSDT"}])
+
+    await public_cache.get("exchange_info", fetch_exchange_info)
+    await public_cache.get("prices", fetch_prices)
+
+    clock[0] += 10
+
+    await public_cache.get("exchange_info", fetch_exchange_info)
+    await public_cache.get("prices", fetch_prices)
+
+    assert len(exchange_info_calls) == 1
+    assert len(prices_calls) == 2
+
+
+async def test_shared_between_instances(local_file_adapter, clock):
+    fetch, calls = get_fetcher({"symbols": ["BTCUSDT"]})
+
+    await get_public_cache(local_file_adapter).get("exchange_info", fetch)
+
+    other_public_cache = get_public_cache(local_file_adapter)
+
+    assert await other_public_cache.get("exchange_info", fetch) == {"symbols": ["BTCUSDT"]}
+    assert len(calls) == 1
+    assert other_public_cache.metrics.shared_hits == 1
+
+    other_public_cache.invalidate("exchange_info")
+
+    await get_public_cache(local_file_adapter).get("exchange_info", fetch)
+
+    assert len(calls) == 2
+
+
+async def test_expired_shared_entry_is_not_read(local_file_adapter, clock):
+    fetch, calls = get_fetcher([{"symbol": "BTCUSDT"}])
+
+    await get_public_cache(local_file_adapter).get("prices", fetch)
+
+    clock[0] += 10
+
+    read_names = []
+    read = local_file_adapter.read
+
+    def counting_read(name):
+        read_names.append(name)
+
+        return read(name)
+
+    local_file_adapter.read = counting_read
+
+    await get_public_cache(local_file_adapter).get("prices", fetch)
+
+    # Only the fetch time was read to find out it expired
+    assert read_names == ["binance_public.prices.fetched_at"]
+    assert len(calls) == 2
@@ -0,0 +1,71 @@
+import asyncio
+from time import monotonic
+
+from analyst.adapters.rate_limiter import WeightRateLimiter
+
+
+async def test_acquire_within_capacity():
+    rate_limiter = WeightRateLimiter(capacity=10, period=60)
+
+    start = monotonic()
+
+    for _ in range(10):
+        await rate_limiter.acquire(1)
+
+    assert monotonic() - start < 0.1
+    assert rate_limiter.metrics.waits == 0
+    assert rate_limiter.metrics.acquired_weight == 10
+
+
+async def test_acquire_waits_without_blocking_loop():
+    rate_limiter = WeightRateLimiter(capacity=10, period=0.5)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+
+    await rate_limiter.acquire(10)
+    await rate_limiter.acquire(5)
+
+    ticker_task.cancel()
+
+    assert rate_limiter.metrics.waits == 1
+    assert ticks >= 10
+
+
+async def test_acquire_is_fair():
+    rate_limiter = WeightRateLimiter(capacity=4, period=0.2)
+    served = []
+
+    async def caller(name, weight):
+        await rate_limiter.acquire(weight)
+        served.append(name)
+
+    await asyncio.gather(
+        *[caller(name, weight) for name, weight in (("a", 4), ("b", 3), ("c", 1), ("d", 2))]
+    )
+
+    assert served == ["a", "b", "c", "d"]
+
+
+async def test_sync_with_server_used_weight():
+    rate_limiter = WeightRateLimiter(capacity=100, period=60)
+
+    rate_limiter.sync(90)
+
+    assert rate_limiter.tokens == 10
+
+    await rate_limiter.acquire(5)
+    rate_limiter.sync(95)
+
+    assert 5 <= rate_limiter.tokens < 6
+
+    rate_limiter.sync(2)
+
+    assert 98 <= rate_limiter.tokens <= 100
@@ -0,0 +1,103 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+from pytest import fixture
+
+from analyst.adapters.redundant_market_stream import (
+    BinanceRedundantMarketStream,
+    MarketStreamDeduplicator,
+)
+from analyst.controllers.binance import BinanceController
+
+STREAMS = ["ethbtc@ticker", "ltcbtc@ticker"]
+
+
+@fixture(scope="function")
+async def redundant_market_stream(settings, simulator):
+    stream_url = f"ws://localhost:{simulator.settings.port}/stream"
+
+    market_stream = BinanceRedundantMarketStream(settings.binance, stream_urls=[stream_url, stream_url])
+
+    yield market_stream
+
+    await market_stream.close()
+
+
+def forge_message(stream, **event):
+    return {"stream": stream, "data": event}
+
+
+def test_events_are_accepted_once():
+    deduplicator = MarketStreamDeduplicator(2)
+
+    assert deduplicator.accept(0, forge_message("ethbtc@ticker", E=1))
+    assert not deduplicator.accept(1, forge_message("ethbtc@ticker", E=1))
+
+    # Whichever feed delivers first wins, late older events are dropped
+    assert deduplicator.accept(1, forge_message("ethbtc@ticker", E=3))
+    assert not deduplicator.accept(0, forge_message("ethbtc@ticker", E=2))
+    assert not deduplicator.accept(0, forge_message("ethbtc@ticker", E=3))
+
+    # Trades of the same millisecond are different events
+    assert deduplicator.accept(0, forge_message("ethbtc@trade", E=1, t=10))
+    assert deduplicator.accept(0, forge_message("ethbtc@trade", E=1, t=11))
+    assert not deduplicator.accept(1, forge_message("ethbtc@trade", E=1, t=11))
+
+    # Symbols of the all market stream are sequenced on their own
+    assert deduplicator.accept(0, forge_message("!bookTicker", s="ETHBTC", u=5))
+    assert deduplicator.accept(1, forge_message("!bookTicker", s="LTCBTC", u=4))
+    assert not deduplicator.accept(1, forge_message("!bookTicker", s="ETHBTC", u=5))
+
+    assert deduplicator.messages == [6, 5]
+    assert deduplicator.wins == [4, 2]
+    assert len(deduplicator.lags[1]) == 5
+
+
+async def test_feeds_are_merged_without_duplicates(settings, simulated_adapter, redundant_market_stream):
+    controller = BinanceController(
+        adapters=SimpleNamespace(
+            binance=simulated_adapter, binance_market_websocket=redundant_market_stream
+        )
+    )
+    events: Counter = Counter()
+
+    async def listen():
+        async for stream, ticker in controller.listen_market_streams(streams=STREAMS):
+            events[(stream, ticker.timestamp)] += 1
+
+            if len(events) == 20:
+                return
+
+    await asyncio.wait_for(listen(), timeout=5)
+
+    assert set(events.values()) == {1}
+
+    stats = controller.get_market_feeds_stats()
+
+    assert [feed_stats.connections for feed_stats in stats] == [1, 1]
+    assert sum(feed_stats.wins for feed_stats in stats) >= 20
+    assert all(feed_stats.messages >= 19 for feed_stats in stats)
+    assert 0.99 < sum(feed_stats.win_rate for feed_stats in stats) < 1.01
+
+
+async def test_streams_are_stale_once_every_feed_is(redundant_market_stream):
+    notifications = []
+
+    redundant_market_stream.on_stale = lambda stream, stale: notifications.append((stream, stale))
+
+    for feed in redundant_market_stream.feeds:
+        feed.on_stale = redundant_market_stream._on_feed_stale
+
+    first_feed, second_feed = redundant_market_stream.feeds
+
+    first_feed._set_stale(STREAMS[0], True)
+    assert notifications == []
+
+    second_feed._set_stale(STREAMS[0], True)
+    assert notifications == [(STREAMS[0], True)]
+
+    first_feed._set_stale(STREAMS[0], False)
+    second_feed._set_stale(STREAMS[0], False)
+    assert notifications == [(STREAMS[0], True), (STREAMS[0], False)]
+    assert not redundant_market_stream.stale_streams
@@ -0,0 +1,340 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from pytest import fixture, raises
+
+from analyst.adapters.binance import BinanceUserDataWebSocketAdapter
+from analyst.adapters.market_stream_pool import BinanceMarketStreamPool
+from analyst.controllers.binance import BinanceController
+from analyst.crypto.exceptions import BinanceAPIError, BinanceRateLimited, BinanceServerError
+from analyst.crypto.models import LazyBookTicker, Order, OrderFromUserDataStream
+
+
+@fixture(scope="function")
+def simulated_controller(simulated_adapter):
+    return BinanceController(adapters=SimpleNamespace(binance=simulated_adapter))
+
+
+def get_balances(account_info):
+    return {balance["asset"]: Decimal(balance["free"]) for balance in account_info["balances"]}
+
+
+async def test_market_order_is_filled_at_top_of_book(simulated_adapter):
+    data = await simulated_adapter.create_order("ETHBTC", "BUY", "MARKET", real=True, quantity=1.0)
+
+    order = Order.from_response(data)
+
+    assert order.is_filled()
+    assert order.executed_quantity == Decimal("1")
+    assert order.fills[0].price == Decimal("0.084875")
+    assert order.fills[0].commission_asset == "ETH"
+
+    balances = get_balances(await simulated_adapter.get_account_info())
+
+    assert balances["BTC"] == Decimal("1") - Decimal("0.084875")
+    assert balances["ETH"] == Decimal("3.5") + Decimal("0.999")
+
+
+async def test_crossing_limit_maker_is_rejected(simulated_controller):
+    with raises(BinanceAPIError) as exc_info:
+        await simulated_controller.adapters.binance.create_order(
+            "ETHBTC", "BUY", "LIMIT_MAKER", real=True, price=0.09, quantity=1.0
+        )
+
+    assert exc_info.value.code == -2010
+    assert exc_info.value.msg == "Order would immediately match and take."
+
+
+async def test_resting_order_is_filled_when_book_moves(simulated_adapter, simulator):
+    data = await simulated_adapter.create_order(
+        "ETHBTC", "SELL", "LIMIT_MAKER", real=True, price=0.1, quantity=1.0
+    )
+
+    assert data["status"] == "NEW"
+    assert len(await simulated_adapter.list_open_orders("ETHBTC")) == 1
+
+    simulator.exchange.set_book("ETHBTC", Decimal("0.1"), Decimal("0.100001"))
+
+    order = Order(**await simulated_adapter.get_order("ETHBTC", data["orderId"]))
+
+    assert order.is_filled()
+    assert await simulated_adapter.list_open_orders() == []
+
+
+async def test_cancel_releases_locked_balance(simulated_adapter):
+    data = await simulated_adapter.create_order(
+        "ETHBTC", "BUY", "LIMIT", real=True, price=0.05, quantity=10.0, time_in_force="GTC"
+    )
+
+    assert get_balances(await simulated_adapter.get_account_info())["BTC"] == Decimal("0.5")
+
+    cancelled = await simulated_adapter.cancel_order("ETHBTC", data["orderId"])
+
+    assert cancelled["status"] == "CANCELED"
+    assert get_balances(await simulated_adapter.get_account_info())["BTC"] == Decimal("1")
+
+    with raises(BinanceAPIError) as exc_info:
+        await simulated_adapter.cancel_order("ETHBTC", data["orderId"])
+
+    assert exc_info.value.code == -2011
+
+
+async def test_cancel_filled_order(simulated_controller, simulator):
+    data = await simulated_controller.adapters.binance.create_order(
+        "ETHBTC", "BUY", "LIMIT", real=True, price=0.08, quantity=1.0, time_in_force="GTC"
+    )
+    order = Order.from_response(data)
+
+    assert not order.is_filled()
+
+    # Filled by the time the cancel reaches the exchange
+    simulator.exchange.set_book("ETHBTC", Decimal("0.07"), Decimal("0.075"))
+
+    cancelled_order = await simulated_controller.cancel_order(order)
+
+    assert cancelled_order.id == order.id
+    assert cancelled_order.is_filled()
+
+
+async def test_replace_order(simulated_controller):
+    data = await simulated_controller.adapters.binance.create_order(
+        "ETHBTC", "BUY", "LIMIT_MAKER", real=True, price=0.05, quantity=1.0
+    )
+    order = Order.from_response(data)
+
+    cancelled_order, new_order = await simulated_controller.replace_order(
+        order, "LIMIT_MAKER", price=0.06, quantity=2.0
+    )
+
+    assert cancelled_order.is_cancelled()
+    assert new_order.price == Decimal("0.06")
+
+    cancelled_order, new_order = await simulated_controller.replace_order(
+        new_order, "LIMIT_MAKER", price=0.09, quantity=2.0
+    )
+
+    assert cancelled_order.is_cancelled()
+    assert new_order is None
+
+
+async def test_replace_filled_order(simulated_controller, simulator):
+    data = await simulated_controller.adapters.binance.create_order(
+        "ETHBTC", "BUY", "LIMIT", real=True, price=0.08, quantity=1.0, time_in_force="GTC"
+    )
+    order = Order.from_response(data)
+
+    simulator.exchange.set_book("ETHBTC", Decimal("0.07"), Decimal("0.075"))
+
+    # The level was filled before being amended, nothing is placed instead
+    filled_order, new_order = await simulated_controller.replace_order(
+        order, "LIMIT", price=0.07, quantity=1.0, time_in_force="GTC"
+    )
+
+    assert filled_order.id == order.id
+    assert filled_order.is_filled()
+    assert new_order is None
+    assert await simulated_controller.adapters.binance.list_open_orders("ETHBTC") == []
+
+
+async def test_weight_headers_and_limit(simulated_adapter, simulator):
+    simulator.settings.weight_limit = 25
+
+    await simulated_adapter.get_exchange_info()
+    await simulated_adapter.get_exchange_info()
+
+    metadata = await simulated_adapter.get_metadata()
+
+    assert metadata.weights.amount_1m == 21
+
+    with raises(BinanceRateLimited) as exc_info:
+        await simulated_adapter.get_exchange_info()
+
+    assert exc_info.value.code == -1003
+    assert exc_info.value.retry_after > 0
+
+
+async def test_error_injection(simulated_adapter, simulator):
+    simulator.settings.error_rate = 1.0
+
+    with raises(BinanceServerError):
+        await simulated_adapter.get_prices()
+
+
+async def test_signed_request_is_stamped_on_retry(settings, simulated_adapter, simulator):
+    settings.binance.max_retries = 1
+
+    # Stamped before its Retry-After pause, the retry would be rejected
+    simulator.settings.recv_window = 500
+    simulator.settings.rate_limit_rate = 1.0
+
+    request = asyncio.create_task(simulated_adapter.get_account_info())
+
+    while not simulated_adapter.metrics.rate_limited:
+        await asyncio.sleep(0.01)
+
+    simulator.settings.rate_limit_rate = 0.0
+
+    assert "balances" in await request
+    assert simulated_adapter.metrics.retries == 1
+
+
+async def test_latency_injection(simulated_adapter, simulator):
+    simulator.settings.latency = 0.1
+
+    start = datetime.now()
+
+    await simulated_adapter.get_metadata()
+
+    assert datetime.now() - start >= timedelta(seconds=0.1)
+
+
+async def test_historical_klines_are_stable(simulated_adapter):
+    kwargs = dict(
+        interval="1h",
+        start_datetime=datetime.now() - timedelta(days=2),
+        end_datetime=datetime.now() - timedelta(days=1),
+    )
+
+    df = await simulated_adapter.get_historical_klines("BTCUSDT", **kwargs)
+
+    assert len(df) == 24
+    assert df.equals(await simulated_adapter.get_historical_klines("BTCUSDT", **kwargs))
+
+
+async def test_market_stream(settings, simulated_adapter):
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+
+    async def listen():
+        async for data in pool.listen():
+            return data
+
+    await pool.open()
+    await pool.subscribe(["ethbtc@ticker"])
+
+    try:
+        message = await asyncio.wait_for(listen(), timeout=1)
+    finally:
+        await pool.close()
+
+    assert message["stream"] == "ethbtc@ticker"
+    assert message["data"]["s"] == "ETHBTC"
+    assert pool.metrics.acknowledged == 1
+
+
+async def test_market_stream_messages_limit(settings, simulated_adapter):
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+
+    await pool.open()
+
+    shard = pool.shards[0]
+    session = shard.session
+
+    # Sent around the control frames budget of the pool
+    for request_id in range(6):
+        await pool.send(session, {"method": "LIST_SUBSCRIPTIONS", "id": request_id})
+
+    await asyncio.sleep(0.2)
+
+    try:
+        # Closed by the server, the shard reconnected on its own
+        assert session.closed
+        assert shard.session is not session
+        assert pool.metrics.reopens == 1
+    finally:
+        await pool.close()
+
+
+async def test_book_ticker_streams(settings, simulated_adapter):
+    settings.binance.market_streams_per_connection = 10
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+    controller = BinanceController(
+        adapters=SimpleNamespace(binance=simulated_adapter, binance_market_websocket=pool)
+    )
+
+    messages = {}
+
+    async def listen():
+        async for stream_name, ticker in controller.listen_market_streams(
+            streams=["ethbtc@bookTicker", "!bookTicker"]
+        ):
+            messages.setdefault(stream_name, ticker)
+
+            if {"ethbtc@bookTicker", "bnbbtc@bookTicker"} <= messages.keys():
+                return
+
+    try:
+        await asyncio.wait_for(listen(), timeout=2)
+    finally:
+        await pool.close()
+
+    assert isinstance(messages["ethbtc@bookTicker"], LazyBookTicker)
+    assert messages["ethbtc@bookTicker"].symbol == "ETHBTC"
+    assert messages["ethbtc@bookTicker"].bid_price < messages["ethbtc@bookTicker"].ask_price
+    assert messages["bnbbtc@bookTicker"].symbol == "BNBBTC"
+
+
+async def test_order_book_from_depth_stream(settings, simulated_adapter, simulator):
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+    controller = BinanceController(
+        adapters=SimpleNamespace(binance=simulated_adapter, binance_market_websocket=pool)
+    )
+
+    async def listen():
+        updates = 0
+
+        async for stream_name, order_book in controller.listen_market_streams(
+            streams=["ethbtc@depth@100ms"]
+        ):
+            if (updates := updates + 1) == 3:
+                return order_book
+
+    try:
+        order_book = await asyncio.wait_for(listen(), timeout=2)
+    finally:
+        await pool.close()
+
+    tick_size = float(simulator.exchange.symbols["ETHBTC"]["tick_size"])
+    bid_prices = order_book.bids.to_numpy()[:, 0]
+
+    assert order_book.synced
+    assert order_book.best_bid()[0] < order_book.best_ask()[0]
+    assert len(order_book.bids) == len(order_book.asks) == simulator.exchange.depth_levels
+
+    # Levels left behind by the moving book have been removed by the diffs
+    assert abs(bid_prices[0] - bid_prices[-1] - tick_size * (len(bid_prices) - 1)) < tick_size / 2
+
+
+async def test_user_data_stream(settings, simulated_adapter):
+    adapter = BinanceUserDataWebSocketAdapter(settings.binance)
+    session = await adapter.open(await simulated_adapter.request_listen_key())
+
+    # Let the server register the connection
+    await asyncio.sleep(0.1)
+
+    data = await simulated_adapter.create_order("ETHBTC", "BUY", "MARKET", real=True, quantity=1.0)
+
+    async def receive(count):
+        messages = []
+
+        async for message in adapter.iterate(session):
+            messages.append(message)
+
+            if len(messages) == count:
+                return messages
+
+    messages = await asyncio.wait_for(receive(3), timeout=1)
+
+    assert [message["data"]["e"] for message in messages] == [
+        "executionReport",
+        "executionReport",
+        "outboundAccountPosition",
+    ]
+
+    order = OrderFromUserDataStream(**messages[1]["data"])
+
+    assert order.id == data["orderId"]
+    assert order.status == "FILLED"
+
+    await adapter.close(session)
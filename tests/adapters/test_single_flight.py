@@ -0,0 +1,70 @@
+import asyncio
+
+from pytest import raises
+
+from analyst.adapters.single_flight import SingleFlight
+
+
+async def test_share_result():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+
+        return {"value": 1}
+
+    results = await asyncio.gather(*[single_flight.do("key", func) for _ in range(3)])
+
+    assert results == [{"value": 1}] * 3
+    assert results[0] is results[1] is results[2]
+    assert len(calls) == 1
+    assert single_flight.metrics.coalesced == 2
+
+    await single_flight.do("key", func)
+
+    assert len(calls) == 2
+
+
+async def test_share_exception():
+    single_flight = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.01)
+
+        raise ValueError("failed")
+
+    results = await asyncio.gather(
+        *[single_flight.do("key", func) for _ in range(3)], return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert single_flight.metrics.calls == 1
+
+    with raises(ValueError):
+        await single_flight.do("key", func)
+
+
+async def test_follower_takes_over_cancelled_call():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+
+        return {"value": 1}
+
+    leader = asyncio.create_task(single_flight.do("key", func))
+    await asyncio.sleep(0)
+
+    followers = [asyncio.create_task(single_flight.do("key", func)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == [{"value": 1}] * 2
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert single_flight.metrics.takeovers == 2
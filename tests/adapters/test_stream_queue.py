@@ -0,0 +1,81 @@
+import asyncio
+
+from analyst.adapters.stream_queue import StreamQueue
+
+
+def ticker(stream, price):
+    return {"stream": stream, "data": {"c": price}}
+
+
+async def test_block_waits_for_room():
+    queue = StreamQueue(maxsize=2, policy="block")
+
+    await queue.put(ticker("ethbtc@ticker", "1"))
+    await queue.put(ticker("ethbtc@ticker", "2"))
+
+    put_task = asyncio.create_task(queue.put(ticker("ethbtc@ticker", "3")))
+    await asyncio.sleep(0.01)
+
+    assert not put_task.done()
+    assert len(queue) == 2
+
+    assert (await queue.get())["data"]["c"] == "1"
+    await asyncio.wait_for(put_task, timeout=1)
+
+    assert [queue.get_nowait()["data"]["c"] for _ in range(2)] == ["2", "3"]
+    assert queue.metrics.dropped == 0
+    assert queue.metrics.delivered == 3
+
+
+async def test_drop_oldest():
+    queue = StreamQueue(maxsize=2, policy="drop_oldest")
+
+    for price in "123":
+        await queue.put(ticker("ethbtc@ticker", price))
+
+    assert [queue.get_nowait()["data"]["c"] for _ in range(2)] == ["2", "3"]
+    assert queue.metrics.received == 3
+    assert queue.metrics.dropped == 1
+
+
+async def test_conflate_keeps_latest_per_stream():
+    queue = StreamQueue(maxsize=10, policy="conflate")
+
+    await queue.put(ticker("ethbtc@ticker", "1"))
+    await queue.put(ticker("ltcbtc@ticker", "10"))
+    await queue.put(ticker("ethbtc@ticker", "2"))
+    await queue.put({"result": None, "id": 1})
+    await queue.put({"result": None, "id": 1})
+
+    assert len(queue) == 4
+    assert [queue.get_nowait() for _ in range(4)] == [
+        ticker("ethbtc@ticker", "2"),
+        ticker("ltcbtc@ticker", "10"),
+        {"result": None, "id": 1},
+        {"result": None, "id": 1},
+    ]
+    assert queue.metrics.conflated == 1
+
+
+async def test_conflate_drops_oldest_stream_when_full():
+    queue = StreamQueue(maxsize=2, policy="conflate")
+
+    for stream in ["ethbtc@ticker", "ltcbtc@ticker", "bnbbtc@ticker"]:
+        await queue.put(ticker(stream, "1"))
+
+    assert [(await queue.get())["stream"] for _ in range(2)] == ["ltcbtc@ticker", "bnbbtc@ticker"]
+    assert queue.metrics.dropped == 1
+
+
+async def test_metrics():
+    queue = StreamQueue(maxsize=10)
+    queue.rate_window = 0
+
+    for price in "123":
+        await queue.put(ticker("ethbtc@ticker", price))
+
+    await queue.get()
+
+    assert queue.metrics.depth == 2
+    assert queue.metrics.max_depth == 3
+    assert queue.metrics.rate > 0
@@ -0,0 +1,164 @@
+import asyncio
+import json
+from time import monotonic
+from types import SimpleNamespace
+
+from pytest import fixture
+
+from analyst.adapters.market_stream_pool import BinanceMarketStreamPool
+from analyst.adapters.stream_recorder import (
+    ReplayMarketStream,
+    ReplayUserDataStream,
+    StreamRecorderAdapter,
+    StreamReplayer,
+)
+from analyst.controllers.binance import BinanceController
+from analyst.crypto.models import LazyMarketStreamTicker, OutboundAccountPosition
+
+START = 1_660_000_000_000_000
+
+
+@fixture(scope="function")
+def recorder(tmp_path):
+    return StreamRecorderAdapter(dir_path=tmp_path)
+
+
+def forge_ticker(stream, event_time, bid_price):
+    return {
+        "stream": stream,
+        "data": {"e": "24hrTicker", "E": event_time, "s": stream.split("@")[0].upper(), "b": bid_price},
+    }
+
+
+def record(recorder, channel, message, received_at):
+    recorder.record(channel, json.dumps(message), message, received_at=received_at)
+
+
+def test_segments_and_index(recorder, tmp_path):
+    recorder.segment_max_records = 3
+
+    for i in range(7):
+        record(recorder, "market", forge_ticker("ethbtc@ticker", 1000 + i, f"{i}.0"), START + i * 1000)
+
+    recorder.close()
+
+    index = json.loads((tmp_path / "index.json").read_text())
+
+    assert [(segment["start"], segment["end"], segment["count"]) for segment in index["segments"]] == [
+        (START, START + 2000, 3),
+        (START + 3000, START + 5000, 3),
+        (START + 6000, START + 6000, 1),
+    ]
+
+    records = list(StreamReplayer(tmp_path).records())
+
+    assert [record.event_time for record in records] == list(range(1000, 1007))
+    assert json.loads(records[2].raw) == forge_ticker("ethbtc@ticker", 1002, "2.0")
+
+    # Segments out of the range are not read at all
+    (tmp_path / index["segments"][0]["name"]).unlink()
+
+    replayer = StreamReplayer(tmp_path, start=START + 4000, end=START + 6000)
+
+    assert [record.event_time for record in replayer.records()] == [1004, 1005, 1006]
+
+
+def test_truncated_segment_is_read_up_to_the_last_block(recorder, tmp_path):
+    for i in range(100):
+        record(recorder, "market", forge_ticker("ethbtc@ticker", i, "1.0"), START + i)
+
+    # Recorder killed before closing the segment
+    recorder._file.flush()
+
+    assert len(list(StreamReplayer(tmp_path).records())) == 100
+
+    segment_path = tmp_path / recorder.segment["name"]
+    segment_path.write_bytes(segment_path.read_bytes()[:-10])
+
+    assert len(list(StreamReplayer(tmp_path).records())) < 100
+
+
+async def test_replay_through_controller(recorder, tmp_path):
+    for i in range(10):
+        record(recorder, "market", forge_ticker("ethbtc@ticker", i, f"{i}.0"), START + i * 100_000)
+        record(recorder, "market", forge_ticker("bnbbtc@ticker", i, f"{i}.0"), START + i * 100_000 + 1)
+
+    record(
+        recorder,
+        "user_data",
+        {
+            "stream": "key",
+            "data": {"e": "outboundAccountPosition", "E": 10, "u": 1_660_000_000_000, "B": []},
+        },
+        START + 1_000_000,
+    )
+    recorder.close()
+
+    # Recorded at 100ms intervals, replayed 10 times faster
+    replayer = StreamReplayer(tmp_path, speed=10.0)
+    controller = BinanceController(
+        adapters=SimpleNamespace(
+            binance_market_websocket=ReplayMarketStream(replayer),
+            binance_user_data_websocket=ReplayUserDataStream(replayer),
+        )
+    )
+
+    started_at = monotonic()
+
+    tickers = [
+        (stream_name, ticker)
+        async for stream_name, ticker in controller.listen_market_streams(streams=["ethbtc@ticker"])
+    ]
+
+    assert 0.08 < monotonic() - started_at < 0.5
+
+    assert [stream_name for stream_name, _ in tickers] == ["ethbtc@ticker"] * 10
+    assert isinstance(tickers[0][1], LazyMarketStreamTicker)
+    assert [ticker.bid_price for _, ticker in tickers] == [float(i) for i in range(10)]
+
+    async def listen_user_data_stream():
+        async for event in controller.listen_user_data_stream():
+            return event
+
+    event = await asyncio.wait_for(listen_user_data_stream(), timeout=1)
+
+    assert isinstance(event, OutboundAccountPosition)
+    assert event.balances == []
+
+
+async def test_record_from_simulator(settings, simulated_adapter, tmp_path):
+    settings.binance.market_streams_per_connection = 10
+
+    recorder = StreamRecorderAdapter(dir_path=tmp_path)
+
+    pool = BinanceMarketStreamPool(settings=settings.binance)
+    pool.recorder = recorder
+
+    controller = BinanceController(
+        adapters=SimpleNamespace(binance=simulated_adapter, binance_market_websocket=pool)
+    )
+
+    async def listen():
+        received = []
+
+        async for stream_name, ticker in controller.listen_market_streams(streams=["ethbtc@ticker"]):
+            if len(received := received + [ticker]) == 3:
+                return received
+
+    try:
+        received = await asyncio.wait_for(listen(), timeout=2)
+    finally:
+        await pool.close()
+        recorder.close()
+
+    replayer = StreamReplayer(tmp_path, speed=None)
+    replay_controller = BinanceController(
+        adapters=SimpleNamespace(binance_market_websocket=ReplayMarketStream(replayer))
+    )
+
+    replayed = [
+        ticker async for _, ticker in replay_controller.listen_market_streams(streams=["ethbtc@ticker"])
+    ]
+
+    assert replayed[:3] == received
+    assert all(record.event_time for record in replayer.records() if "stream" in json.loads(record.raw))
@@ -174,6 +174,7 @@ async def test_bot_runner_test(runner, controllers, order_manager, monkeypatch):
     def mocked_send(runner: Runner):
         async def mocked(*args, **kwargs):
             strategy = list(runner.strategies.values())[0]
+            mailbox = runner.mailboxes[strategy.id]
 
             balanced_quantity_ticker = MarketStreamTicker(
                 symbol="AMPBTC",
@@ -195,6 +196,7 @@ async def test_bot_runner_test(runner, controllers, order_manager, monkeypatch):
             )
 
             yield "ampbtc@ticker", balanced_quantity_ticker
+            await mailbox.join()
 
             order = runner.order_manager.get_order(strategy.internal_order_id)
             order.executed_quantity = order.requested_quantity / 3
@@ -204,6 +206,7 @@ async def test_bot_runner_test(runner, controllers, order_manager, monkeypatch):
             await strategy.process_order(filled_buy, runner.order_manager)
 
             yield "ampbtc@ticker", low_bid_quantity_ticker
+            await mailbox.join()
 
             filled_sell = await runner.order_manager.fill_order(
                 runner.order_manager.get_order(strategy.internal_order_id)
@@ -212,10 +215,12 @@ async def test_bot_runner_test(runner, controllers, order_manager, monkeypatch):
             await strategy.process_order(filled_sell, runner.order_manager)
 
             yield "ampbtc@ticker", low_bid_quantity_ticker
+            await mailbox.join()
 
             assert not strategy.internal_order_id
 
             yield "ampbtc@ticker", balanced_quantity_ticker
+            await mailbox.join()
 
             assert strategy.internal_order_id
 
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from analyst.bot.bot import Runner
+from analyst.bot.exceptions import StrategyExit
+from analyst.bot.mailbox import TickerMailbox
+from analyst.crypto.order_book import OrderBook
+from tests.mocks.strategies import DummyStrategy
+from tests.utils import forge_stream_ticker
+
+
+class SlowStrategy(DummyStrategy):
+    name = "slow"
+    version = "v0"
+
+    def __init__(self, delay=0.05, **kwargs):
+        super().__init__(**kwargs)
+
+        self.delay = delay
+        self.processed = []
+
+    def get_stream_names(self):
+        return ["ampbtc@ticker", "qlcbtc@ticker"]
+
+    async def process_ticker_data(self, ticker_data, order_manager):
+        await asyncio.sleep(self.delay)
+
+        self.processed.append((ticker_data.symbol, ticker_data.bid_price))
+
+    async def terminate(self, order_manager):
+        pass
+
+
+async def test_mailbox_conflates_per_stream():
+    mailbox = TickerMailbox()
+
+    mailbox.post("ampbtc@ticker", 1)
+    mailbox.post("qlcbtc@ticker", 10)
+    mailbox.post("ampbtc@ticker", 2)
+
+    assert len(mailbox) == 2
+    assert [await mailbox.get(), await mailbox.get()] == [2, 10]
+    assert mailbox.metrics.received == 3
+    assert mailbox.metrics.conflated == 1
+
+
+async def test_mailbox_join_and_close():
+    mailbox = TickerMailbox()
+
+    await asyncio.wait_for(mailbox.join(), timeout=1)
+
+    mailbox.post("ampbtc@ticker", 1)
+    join_task = asyncio.create_task(mailbox.join())
+
+    assert await mailbox.get() == 1
+    await asyncio.sleep(0)
+    assert not join_task.done()
+
+    mailbox.task_done()
+    await asyncio.wait_for(join_task, timeout=1)
+
+    get_task = asyncio.create_task(mailbox.get())
+    await asyncio.sleep(0)
+    mailbox.close()
+
+    assert await asyncio.wait_for(get_task, timeout=1) is None
+
+    mailbox.post("ampbtc@ticker", 2)
+    assert len(mailbox) == 0
+
+
+def get_runner(tickers, unsubscribed=None):
+    async def listen_market_streams(streams=None, on_stale=None):
+        for stream_name, ticker_data in tickers:
+            # Let the strategies run in between, as on a real connection
+            await asyncio.sleep(0)
+
+            yield stream_name, ticker_data
+
+    async def unsubscribe(streams):
+        if unsubscribed is not None:
+            unsubscribed.extend(streams)
+
+    controllers = SimpleNamespace(
+        binance=SimpleNamespace(listen_market_streams=listen_market_streams, unsubscribe=unsubscribe)
+    )
+
+    return Runner(controllers=controllers, order_manager=None)
+
+
+async def test_runner_does_not_wait_on_slow_strategies():
+    tickers = [
+        ("ampbtc@ticker", forge_stream_ticker("AMPBTC", f"0.0000003{i}", f"0.0000002{i}"))
+        for i in range(5)
+    ]
+    runner = get_runner(
+        tickers + [("qlcbtc@ticker", forge_stream_ticker("QLCBTC", "0.0000011", "0.000001"))]
+    )
+    strategy = SlowStrategy.create()
+    other_strategy = SlowStrategy.create()
+
+    runner.setup_strategy(strategy)
+    runner.setup_strategy(other_strategy)
+
+    await asyncio.wait_for(runner.run_market_streams(), timeout=0.03)
+
+    mailbox = runner.mailboxes[strategy.id]
+    await asyncio.wait_for(mailbox.join(), timeout=1)
+
+    # The first ticker is being processed when the others come in, only the latest one is kept
+    assert [symbol for symbol, _ in strategy.processed] == ["AMPBTC", "AMPBTC", "QLCBTC"]
+    assert strategy.processed[1][1] == tickers[-1][1].bid_price
+    assert mailbox.metrics.conflated == 3
+
+    # Strategies have their own lock and are processed concurrently
+    assert strategy.lock is not other_strategy.lock
+    assert other_strategy.processed == strategy.processed
+
+
+async def test_runner_purges_exited_strategy():
+    unsubscribed = []
+    runner = get_runner(
+        [("ampbtc@ticker", forge_stream_ticker("AMPBTC", "0.00000029", "0.00000028"))], unsubscribed
+    )
+    strategy = SlowStrategy.create(delay=0)
+
+    async def process_ticker_data(ticker_data, order_manager):
+        raise StrategyExit()
+
+    strategy.process_ticker_data = process_ticker_data
+
+    runner.setup_strategy(strategy)
+    mailbox = runner.mailboxes[strategy.id]
+
+    await runner.run_market_streams()
+    await asyncio.wait_for(mailbox.task, timeout=1)
+
+    assert mailbox.closed
+    assert strategy.id not in runner.strategies
+    assert strategy.id not in runner.mailboxes
+
+    # Its stream references are released
+    assert unsubscribed == strategy.get_stream_names()
+
+
+async def test_runner_logs_depth_streams(caplog):
+    order_book = OrderBook("AMPBTC")
+    order_book.apply_snapshot(
+        {"lastUpdateId": 1, "bids": [["0.00000031", "10.0"]], "asks": [["0.00000032", "5.0"]]}
+    )
+
+    runner = get_runner(
+        [
+            ("ampbtc@depth@100ms", order_book),
+            ("ampbtc@ticker", forge_stream_ticker("AMPBTC", "0.00000032", "0.00000031")),
+        ]
+    )
+
+    with caplog.at_level(logging.DEBUG, logger="bot"):
+        await asyncio.wait_for(runner.run_market_streams(), timeout=1)
+
+    assert [record.getMessage().split(" ")[0] for record in caplog.records] == ["order", "ticker"]
+
+
+async def test_runner_flags_stale_streams():
+    runner = get_runner([])
+    strategy = SlowStrategy.create()
+
+    runner.setup_strategy(strategy)
+
+    runner.on_market_stream_stale("ampbtc@ticker", True)
+    runner.on_market_stream_stale("btcusdt@ticker", True)
+
+    assert strategy.stale_streams == {"ampbtc@ticker"}
+    assert strategy.has_stale_data
+
+    runner.on_market_stream_stale("ampbtc@ticker", False)
+
+    assert not strategy.has_stale_data
+
+    runner.mailboxes[strategy.id].close()
@@ -220,6 +220,30 @@ async def test_create_order_buy_maker(order_manager):
     )
 
 
+async def test_replace_order(order_manager):
+    order = await order_manager.create_order(
+        symbol="AMPBTC",
+        side=Side.buy,
+        price=Decimal("0.00000028"),
+        quantity=Decimal("1000"),
+        market_making=True,
+    )
+
+    cancelled_order, new_order = await order_manager.replace_order(
+        order, quantity=Decimal("1200"), price=Decimal("0.00000027")
+    )
+
+    assert cancelled_order.internal_id == order.internal_id
+    assert cancelled_order.status == "CANCELLED"
+    assert order_manager.get_order(order.internal_id) is None
+
+    assert new_order.side == "BUY"
+    assert new_order.type == "LIMIT_MAKER"
+    assert new_order.price == Decimal("0.00000027")
+    assert new_order.requested_quantity == Decimal("1200")
+    assert order_manager.get_order(new_order.internal_id) == new_order
+
+
 async def test_create_order_sell_maker(order_manager):
     order = await order_manager.create_order(
         symbol="AMPBTC",
@@ -396,3 +420,72 @@ async def test_get_updated_orders(order_manager, monkeypatch):
     order.status = "CANCELLED"
 
     assert await order_manager.get_updated_orders() == [order]
+
+
+async def test_get_updated_orders_skips_closed_orders(order_manager, monkeypatch):
+    open_order = await order_manager.sell_all_maker("AMPBTC", Decimal("0.00000029"))
+    closed_order = await order_manager.sell_all_maker("AMPBTC", Decimal("0.00000030"))
+
+    closed_order = deepcopy(closed_order)
+    closed_order.status = "FILLED"
+    closed_order.executed_quantity = closed_order.requested_quantity
+
+    await order_manager.update_order(closed_order)
+
+    async def mock_list_open_orders(symbols):
+        return [deepcopy(open_order)]
+
+    fetched_orders = []
+
+    async def mock_get_updated_order(order):
+        fetched_orders.append(order.id)
+
+        return deepcopy(order)
+
+    monkeypatch.setattr(order_manager, "_list_open_orders", mock_list_open_orders)
+    monkeypatch.setattr(order_manager.controllers.binance, "get_updated_order", mock_get_updated_order)
+
+    assert await order_manager.get_updated_orders() == []
+    assert fetched_orders == []
+
+
+async def test_get_updated_orders_reconciliation(order_manager, controllers, monkeypatch):
+    unchanged_order = await order_manager.sell_all_maker("AMPBTC", Decimal("0.00000029"))
+    partially_filled_order = await order_manager.sell_all_maker("AMPBTC", Decimal("0.00000030"))
+    filled_order = await order_manager.sell_all_maker("AMPBTC", Decimal("0.00000031"))
+
+    async def mock_list_open_orders(symbols):
+        assert symbols == {"AMPBTC"}
+
+        order = deepcopy(partially_filled_order)
+        order.status = "PARTIALLY_FILLED"
+        order.executed_quantity = order.requested_quantity / 2
+
+        return [deepcopy(unchanged_order), order]
+
+    fetched_orders = []
+
+    async def mock_get_updated_order(order):
+        fetched_orders.append(order.id)
+
+        order = deepcopy(order)
+        order.status = "FILLED"
+        order.executed_quantity = order.requested_quantity
+
+        return order
+
+    monkeypatch.setattr(order_manager, "_list_open_orders", mock_list_open_orders)
+    monkeypatch.setattr(order_manager.controllers.binance, "get_updated_order", mock_get_updated_order)
+
+    updated_orders = await order_manager.get_updated_orders()
+
+    assert fetched_orders == [filled_order.id]
+    assert {order.internal_id: order.status for order in updated_orders} == {
+        partially_filled_order.internal_id: "PARTIALLY_FILLED",
+        filled_order.internal_id: "FILLED",
+    }
+    assert order_manager.get_order(filled_order.internal_id).is_filled()
+
+    stored_order = await controllers.mongo.get_order_by_id(partially_filled_order.internal_id)
+
+    assert stored_order.executed_quantity == partially_filled_order.requested_quantity / 2
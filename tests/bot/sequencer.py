@@ -0,0 +1,124 @@
+import asyncio
+from datetime import timezone
+
+from analyst.bot.sequencer import UserDataSequencer
+from analyst.crypto.models import OrderFromUserDataStream, OutboundAccountPosition
+
+EVENT_TIME = 1_660_000_000_000
+
+
+def forge_report(order_id, status, event_time, symbol="ETHBTC"):
+    return OrderFromUserDataStream(
+        **{
+            "e": "executionReport",
+            "E": event_time,
+            "s": symbol,
+            "S": "BUY",
+            "o": "LIMIT",
+            "f": "GTC",
+            "q": "1.0",
+            "p": "0.07",
+            "P": "0",
+            "X": status,
+            "i": order_id,
+            "l": "0",
+            "O": EVENT_TIME,
+        }
+    )
+
+
+def forge_account_position(event_time):
+    return OutboundAccountPosition(
+        **{"e": "outboundAccountPosition", "E": event_time, "u": event_time, "B": []}
+    )
+
+
+def get_sequencer(events, delay=0.0, pairing_timeout=0.05):
+    async def on_order(order):
+        events.append(("order", order.id, order.status))
+
+        await asyncio.sleep(delay)
+
+        events.append(("order_done", order.id, order.status))
+
+    def on_balances(account_position):
+        event_time = account_position.event_time.replace(tzinfo=timezone.utc)
+
+        events.append(("balances", int(event_time.timestamp() * 1000)))
+
+    return UserDataSequencer(on_order=on_order, on_balances=on_balances, pairing_timeout=pairing_timeout)
+
+
+async def test_reports_wait_for_their_balances():
+    events = []
+    sequencer = get_sequencer(events, pairing_timeout=1.0)
+    loop = asyncio.get_running_loop()
+
+    sequencer.post(forge_report(1, "FILLED", EVENT_TIME + 10))
+
+    await asyncio.sleep(0.01)
+    assert events == []
+
+    # An older balances update doesn't release the report
+    sequencer.post(forge_account_position(EVENT_TIME))
+    await asyncio.sleep(0.01)
+    assert events == [("balances", EVENT_TIME)]
+
+    started_at = loop.time()
+    sequencer.post(forge_account_position(EVENT_TIME + 10))
+
+    await asyncio.wait_for(sequencer.join(), timeout=1)
+
+    assert loop.time() - started_at < 0.1
+    assert events[1:] == [
+        ("balances", EVENT_TIME + 10),
+        ("order", 1, "FILLED"),
+        ("order_done", 1, "FILLED"),
+    ]
+    assert sequencer.metrics.paired == 1
+    assert not sequencer.queues and not sequencer.workers
+
+
+async def test_reports_without_balances_are_dispatched_after_timeout():
+    events = []
+    sequencer = get_sequencer(events, pairing_timeout=0.05)
+    loop = asyncio.get_running_loop()
+
+    started_at = loop.time()
+    sequencer.post(forge_report(1, "NEW", EVENT_TIME))
+
+    await asyncio.wait_for(sequencer.join(), timeout=1)
+
+    assert 0.04 < loop.time() - started_at < 0.5
+    assert events == [("order", 1, "NEW"), ("order_done", 1, "NEW")]
+    assert sequencer.metrics.timed_out == 1
+
+
+async def test_reports_are_processed_in_order_per_order():
+    events = []
+    sequencer = get_sequencer(events, delay=0.02)
+
+    sequencer.post(forge_report(1, "NEW", EVENT_TIME))
+    sequencer.post(forge_report(2, "NEW", EVENT_TIME))
+    sequencer.post(forge_report(1, "PARTIALLY_FILLED", EVENT_TIME + 1))
+    sequencer.post(forge_report(1, "FILLED", EVENT_TIME + 2))
+    sequencer.post(forge_account_position(EVENT_TIME + 2))
+
+    await asyncio.wait_for(sequencer.join(), timeout=1)
+
+    order_events = [event for event in events if event[1] == 1]
+
+    # One report of an order at a time, in their received order
+    assert order_events == [
+        ("order", 1, "NEW"),
+        ("order_done", 1, "NEW"),
+        ("order", 1, "PARTIALLY_FILLED"),
+        ("order_done", 1, "PARTIALLY_FILLED"),
+        ("order", 1, "FILLED"),
+        ("order_done", 1, "FILLED"),
+    ]
+
+    # Other orders are not held behind it
+    assert events.index(("order", 2, "NEW")) < events.index(("order_done", 1, "NEW"))
+    assert sequencer.metrics.orders == 4
+    assert sequencer.metrics.paired == 4
@@ -5,6 +5,7 @@ from decimal import Decimal
 from freezegun import freeze_time
 from pytest import fixture, mark, raises
 
+from analyst.bot.bot import Runner
 from analyst.bot.exceptions import StrategyHalt
 from analyst.bot.strategies.market_maker import MarketMakerV3
 from analyst.crypto.exceptions import OrderWouldMatch
@@ -61,6 +62,19 @@ async def test_creation(order_manager):
     assert strategy.flags == MarketMakerV3.Flags.no_flags
 
 
+async def test_creation_with_book_ticker(order_manager):
+    strategy = MarketMakerV3.create(
+        symbol="BTCUSDT",
+        quote_quantity=Decimal("10"),
+        interval=Decimal("1000"),
+        book_ticker=True,
+    )
+
+    assert strategy.get_stream_names() == ["btcusdt@bookTicker"]
+    assert strategy.dict()["args"]["book_ticker"] is True
+    assert MarketMakerV3.create(**strategy.dict()["args"]).book_ticker is True
+
+
 async def test_setup(order_manager, controllers):
     strategy = MarketMakerV3.create(
         symbol="BTCUSDT",
@@ -611,3 +625,34 @@ async def test_cleanup_buy_side(order_manager):
     assert len(sell_orders) == 1
     assert set(buy_orders.keys()) == set([Decimal(p) for p in ("15_500", "15_400", "15_300")])
     assert set(sell_orders.keys()) == set([Decimal("15_600")])
+
+
+async def test_process_ticker_data_skipped_on_stale_data(order_manager, controllers):
+    strategy = MarketMakerV3.create(
+        symbol="BTCUSDT",
+        quote_quantity=Decimal("10"),
+        interval=Decimal("100"),
+        max_buy_orders=3,
+    )
+    runner = Runner(controllers=controllers, order_manager=order_manager)
+    runner.setup_strategy(strategy)
+
+    runner.on_market_stream_stale("btcusdt@ticker", True)
+
+    assert strategy.has_stale_data
+
+    await strategy.process_ticker_data(forge_stream_ticker("BTCUSDT", "15_250", "15_237"), order_manager)
+
+    assert strategy.get_buy_orders(order_manager) == {}
+
+    runner.on_market_stream_stale("btcusdt@ticker", False)
+
+    assert not strategy.has_stale_data
+
+    await strategy.process_ticker_data(forge_stream_ticker("BTCUSDT", "15_250", "15_237"), order_manager)
+
+    assert set(strategy.get_buy_orders(order_manager).keys()) == set(
+        [Decimal(p) for p in ("15_200", "15_100", "15_000")]
+    )
+
+    runner.mailboxes[strategy.id].close()
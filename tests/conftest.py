@@ -3,7 +3,7 @@ from os import environ
 
 from pytest import fixture
 
-from analyst.adapters.factory import get_adapters
+from analyst.adapters.factory import close_adapters, get_adapters
 from analyst.bot.order_manager import OrderManager
 from analyst.controllers.factory import get_controllers
 from analyst.repositories.factory import get_repositories
@@ -32,7 +32,11 @@ def settings(monkeypatch):
 
 @fixture(scope="function")
 async def adapters(settings):
-    return await get_adapters(settings=settings)
+    adapters = await get_adapters(settings=settings)
+
+    yield adapters
+
+    await close_adapters(adapters)
 
 
 @fixture(scope="function")
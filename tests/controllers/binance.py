@@ -1,7 +1,10 @@
+import asyncio
 from decimal import Decimal
+from types import SimpleNamespace
 
 from pytest import raises
 
+from analyst.controllers.binance import BinanceController
 from analyst.crypto.exceptions import InvalidPairCoins
 from analyst.crypto.models import CoinAmount
 from tests.mocks.common import mock_account_info, mock_exchange_data_info, mock_pair_prices_info
@@ -122,3 +125,48 @@ async def test_convert_account_coins_to(adapters, binance_controller, monkeypatc
         "ETH": Decimal("11.64144353899883585564610012"),
         "USDT": Decimal("17.85076758300606926097822206"),
     }
+
+
+async def test_order_book_sync_is_capped(settings):
+    settings.binance.order_book_sync_attempts = 3
+    settings.binance.order_book_sync_backoff = 0.01
+
+    snapshots = []
+
+    async def get_order_book(symbol, limit):
+        # Updates keep coming in past every snapshot
+        controller.order_books[symbol].apply_event({"s": symbol, "U": 10, "u": 11, "b": [], "a": []})
+        snapshots.append(symbol)
+
+        return {"lastUpdateId": 1, "bids": [], "asks": []}
+
+    async def unsubscribe(streams):
+        pass
+
+    controller = BinanceController(
+        adapters=SimpleNamespace(
+            binance=SimpleNamespace(settings=settings.binance, get_order_book=get_order_book),
+            binance_market_websocket=SimpleNamespace(subscriptions=set(), unsubscribe=unsubscribe),
+        )
+    )
+
+    controller._on_depth_event({"s": "ETHBTC", "U": 2, "u": 3, "b": [], "a": []})
+    await asyncio.wait_for(controller.order_book_syncs["ETHBTC"], timeout=1)
+
+    assert snapshots == ["ETHBTC"] * 3
+    assert not controller.order_books["ETHBTC"].synced
+    assert not controller.order_book_syncs
+
+    # Syncs of unsubscribed books are cancelled
+    settings.binance.order_book_sync_backoff = 10.0
+
+    controller._on_depth_event({"s": "ETHBTC", "U": 12, "u": 13, "b": [], "a": []})
+    sync = controller.order_book_syncs["ETHBTC"]
+    await asyncio.sleep(0.01)
+
+    await controller.unsubscribe(["ethbtc@depth"])
+    await asyncio.sleep(0)
+
+    assert sync.cancelled()
+    assert not controller.order_book_syncs
+    assert not controller.order_books
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from analyst.crypto.models import LazyBookTicker, LazyMarketStreamTicker, MarketStreamTicker
+
+TICKER_DATA = {
+    "e": "24hrTicker",
+    "E": 1662661031419,
+    "s": "BTCUSDT",
+    "c": "19208.12000000",
+    "b": "19208.12000000",
+    "B": "0.09846000",
+    "a": "19208.74000000",
+    "A": "0.02862000",
+    "n": 4890544,
+}
+
+BOOK_TICKER_DATA = {
+    "u": 400900217,
+    "s": "BTCUSDT",
+    "b": "19208.12000000",
+    "B": "0.09846000",
+    "a": "19208.74000000",
+    "A": "0.02862000",
+}
+
+
+def test_lazy_market_stream_ticker_matches_model():
+    ticker = LazyMarketStreamTicker(TICKER_DATA)
+    model = MarketStreamTicker(**TICKER_DATA)
+
+    assert ticker.symbol == "BTCUSDT"
+    assert ticker.bid_price == Decimal("19208.12")
+    assert ticker.trades == 4890544
+    assert ticker.timestamp == model.timestamp
+    assert ticker.dict() == model.dict()
+    assert ticker.to_model() == model
+    assert ticker == model
+
+
+def test_lazy_market_stream_ticker_memoizes_fields():
+    ticker = LazyMarketStreamTicker(TICKER_DATA)
+
+    assert ticker.ask_price is ticker.ask_price
+    assert not hasattr(ticker, "__dict__")
+
+
+def test_lazy_market_stream_ticker_prices_changed():
+    ticker = LazyMarketStreamTicker(TICKER_DATA)
+
+    assert not ticker.has_ask_bid_prices_changed(LazyMarketStreamTicker(dict(TICKER_DATA)))
+    assert not ticker.has_ask_bid_prices_changed(LazyMarketStreamTicker({**TICKER_DATA, "b": "19208.12"}))
+    assert ticker.has_ask_bid_prices_changed(LazyMarketStreamTicker({**TICKER_DATA, "a": "19208.75"}))
+    assert ticker.has_ask_bid_prices_changed(MarketStreamTicker(**{**TICKER_DATA, "b": "19208.11"}))
+    assert not MarketStreamTicker(**TICKER_DATA).has_ask_bid_prices_changed(ticker)
+
+
+def test_lazy_book_ticker():
+    book_ticker = LazyBookTicker(BOOK_TICKER_DATA)
+
+    assert book_ticker.dict() == {
+        "update_id": 400900217,
+        "symbol": "BTCUSDT",
+        "ask_price": Decimal("19208.74"),
+        "ask_quantity": Decimal("0.02862"),
+        "bid_price": Decimal("19208.12"),
+        "bid_quantity": Decimal("0.09846"),
+    }
+    assert book_ticker == LazyBookTicker(dict(BOOK_TICKER_DATA))
+    assert book_ticker != LazyMarketStreamTicker(TICKER_DATA)
+
+    # Both carry the top of book and can be compared to each other
+    assert not book_ticker.has_ask_bid_prices_changed(LazyMarketStreamTicker(TICKER_DATA))
+    assert book_ticker.has_ask_bid_prices_changed(MarketStreamTicker(**{**TICKER_DATA, "a": "19208.75"}))
@@ -0,0 +1,92 @@
+from numpy.testing import assert_array_equal
+from pytest import raises
+
+from analyst.crypto.exceptions import OrderBookOutOfSync
+from analyst.crypto.order_book import OrderBook, OrderBookSide
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["0.0024", "10"], ["0.0023", "5"], ["0.0022", "20"]],
+    "asks": [["0.0026", "100"], ["0.0027", "50"]],
+}
+
+
+def get_event(first_update_id, last_update_id, bids=(), asks=()):
+    return {
+        "e": "depthUpdate",
+        "s": "BNBBTC",
+        "U": first_update_id,
+        "u": last_update_id,
+        "b": list(bids),
+        "a": list(asks),
+    }
+
+
+def test_order_book_side():
+    bids = OrderBookSide(is_bid=True)
+    asks = OrderBookSide(is_bid=False)
+
+    bids.update(SNAPSHOT["bids"])
+    asks.update(SNAPSHOT["asks"])
+
+    assert bids.best() == (0.0024, 10.0)
+    assert asks.best() == (0.0026, 100.0)
+    assert bids.levels(2) == [(0.0024, 10.0), (0.0023, 5.0)]
+    assert asks.levels() == [(0.0026, 100.0), (0.0027, 50.0)]
+    assert bids.get_quantity(0.0023) == 5.0
+    assert bids.get_quantity(0.0021) == 0.0
+
+    bids.update([["0.0023", "0"], ["0.0025", "1"], ["0.0021", "0"]])
+
+    assert bids.levels() == [(0.0025, 1.0), (0.0024, 10.0), (0.0022, 20.0)]
+
+
+def test_order_book_side_cumulative_depth():
+    bids = OrderBookSide(is_bid=True)
+    asks = OrderBookSide(is_bid=False)
+
+    bids.update(SNAPSHOT["bids"])
+    asks.update(SNAPSHOT["asks"])
+
+    assert bids.cumulative_quantity(0.0023) == 15.0
+    assert asks.cumulative_quantity(0.0027) == 150.0
+    assert bids.price_for_quantity(12) == 0.0023
+    assert bids.price_for_quantity(15) == 0.0023
+    assert bids.price_for_quantity(40) is None
+    assert asks.price_for_quantity(1) == 0.0026
+
+    assert_array_equal(bids.to_numpy(), [[0.0024, 10.0], [0.0023, 5.0], [0.0022, 20.0]])
+    assert_array_equal(asks.to_numpy(1), [[0.0026, 100.0]])
+
+
+def test_order_book_sync():
+    order_book = OrderBook("BNBBTC")
+
+    # Buffered until the snapshot is applied, the first one is already part of it
+    assert not order_book.apply_event(get_event(95, 100, bids=[["0.0024", "0"]]))
+    assert not order_book.apply_event(get_event(101, 102, bids=[["0.0024", "8"]]))
+
+    order_book.apply_snapshot(SNAPSHOT)
+
+    assert order_book.synced
+    assert order_book.last_update_id == 102
+    assert order_book.best_bid() == (0.0024, 8.0)
+    assert order_book.best_ask() == (0.0026, 100.0)
+    assert round(order_book.spread(), 8) == 0.0002
+
+    assert order_book.apply_event(get_event(103, 103, asks=[["0.0026", "0"]]))
+    assert order_book.best_ask() == (0.0027, 50.0)
+
+
+def test_order_book_out_of_sync():
+    order_book = OrderBook("BNBBTC")
+    order_book.apply_snapshot(SNAPSHOT)
+
+    with raises(OrderBookOutOfSync):
+        order_book.apply_event(get_event(102, 103))
+
+    assert not order_book.synced
+    assert not order_book.bids and not order_book.asks
+
+    assert not order_book.apply_event(get_event(104, 105))
+    assert len(order_book.buffer) == 1
@@ -1,7 +1,7 @@
 from copy import deepcopy
 from datetime import datetime
 from logging import getLogger
-from typing import Optional
+from typing import Optional, Set
 
 from analyst.bot.order_manager import OrderManager
 from analyst.bot.strategies.base import Strategy
@@ -35,6 +35,19 @@ class MockedOrderManager(OrderManager):
 
         return order
 
+    async def _replace_order(self, order: Order, **kwargs):
+        cancelled_order = deepcopy(order)
+        cancelled_order.status = "CANCELLED"
+
+        return cancelled_order, await self._create_order(symbol=order.symbol, side=order.side, **kwargs)
+
+    async def _list_open_orders(self, symbols: Set[str]):
+        return [
+            deepcopy(order)
+            for order in self.orders.values()
+            if order.symbol in symbols and order.is_open()
+        ]
+
     async def _create_order(self, **kwargs):
         if "id" not in kwargs:
             kwargs.setdefault("id", self.orders_out)